@@ -9,7 +9,9 @@ https://docs.djangoproject.com/en/4.2/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
+import json
 import os
+from datetime import timedelta
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -26,6 +28,13 @@ DEBUG = True
 
 ALLOWED_HOSTS = []
 
+# Process role. "api" workers only serve the REST API and skip loading the
+# admin, sessions, static files and OpenAPI schema views, which makes them
+# start faster and use less memory. Run migrations, the admin and
+# build_schema from a "full" process.
+APP_ROLE = os.environ.get('APP_ROLE', 'full')
+API_ONLY = APP_ROLE == 'api'
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -43,7 +52,20 @@ INSTALLED_APPS = [
     'playlist',
 ]
 
+if API_ONLY:
+    INSTALLED_APPS = [
+        app for app in INSTALLED_APPS
+        if app not in (
+            'django.contrib.admin',
+            'django.contrib.sessions',
+            'django.contrib.messages',
+            'django.contrib.staticfiles',
+            'drf_spectacular',
+        )
+    ]
+
 MIDDLEWARE = [
+    'core.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -53,6 +75,16 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+if API_ONLY:
+    # The API authenticates with tokens inside DRF, so the session based
+    # middleware has nothing to do.
+    MIDDLEWARE = [
+        'core.profiling.ProfilingMiddleware',
+        'django.middleware.security.SecurityMiddleware',
+        'django.middleware.common.CommonMiddleware',
+        'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    ]
+
 ROOT_URLCONF = 'app.urls'
 
 TEMPLATES = [
@@ -104,6 +136,29 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# New passwords are hashed with PASSWORD_HASHER, the others only verify
+# older hashes. Iterations of the default PBKDF2 hasher can be lowered on
+# small machines or raised on big ones, existing passwords are rehashed
+# on login. Hashing runs on PASSWORD_HASH_WORKERS threads, one per core
+# by default. CI sets the fast MD5PasswordHasher for the test run.
+PASSWORD_HASHER = os.environ.get(
+    'PASSWORD_HASHER',
+    'core.hashers.PBKDF2PasswordHasher',
+)
+PASSWORD_HASH_ITERATIONS = int(os.environ.get('PASSWORD_HASH_ITERATIONS', 0))
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 0))
+
+PASSWORD_HASHERS = [PASSWORD_HASHER] + [
+    hasher for hasher in [
+        'core.hashers.PBKDF2PasswordHasher',
+        'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+        'django.contrib.auth.hashers.Argon2PasswordHasher',
+        'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+        'django.contrib.auth.hashers.ScryptPasswordHasher',
+    ]
+    if hasher != PASSWORD_HASHER
+]
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
 
@@ -124,6 +179,32 @@ MEDIA_URL = '/static/media/'
 MEDIA_ROOT = '/vol/web/media'
 STATIC_ROOT = '/vol/web/static'
 
+# Uploaded media go to the default storage, the local MEDIA_ROOT unless
+# e.g. MEDIA_STORAGE_BACKEND=storages.backends.s3.S3Storage points it at
+# S3 or MinIO, with MEDIA_STORAGE_OPTIONS as JSON.
+STORAGES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'MEDIA_STORAGE_BACKEND',
+            'django.core.files.storage.FileSystemStorage',
+        ),
+        'OPTIONS': json.loads(os.environ.get('MEDIA_STORAGE_OPTIONS', '{}')),
+    },
+    'staticfiles': {
+        'BACKEND': os.environ.get(
+            'STATIC_STORAGE_BACKEND',
+            'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+            else 'core.storage.CompressedManifestStaticFilesStorage',
+        ),
+    },
+}
+
+# Media, and static files outside runserver, are served by core.serving.
+# Behind nginx, set e.g. MEDIA_ACCEL_REDIRECT=/internal/media/ for an
+# `internal` location aliased to MEDIA_ROOT, and nginx sends the files.
+MEDIA_ACCEL_REDIRECT = os.environ.get('MEDIA_ACCEL_REDIRECT', '')
+STATIC_ACCEL_REDIRECT = os.environ.get('STATIC_ACCEL_REDIRECT', '')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -133,8 +214,91 @@ AUTH_USER_MODEL = "core.User"
 
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_THROTTLE_CLASSES': [
+        'core.throttling.TokenBucketThrottle',
+    ],
 }
 
+if API_ONLY:
+    REST_FRAMEWORK.update({
+        'DEFAULT_RENDERER_CLASSES': [
+            'rest_framework.renderers.JSONRenderer',
+        ],
+        'DEFAULT_AUTHENTICATION_CLASSES': [
+            'core.authentication.ExpiringTokenAuthentication',
+        ],
+    })
+
+# API tokens expire this long after login. The time a token was last used
+# is kept in memory, and written after the first request finishing this
+# long after the last write, and at exit, per process.
+AUTH_TOKEN_TTL = timedelta(
+    days=int(os.environ.get('AUTH_TOKEN_TTL_DAYS', 30)),
+)
+AUTH_TOKEN_LAST_USED_FLUSH_SECONDS = 60
+
+# Rate limits and request coalescing keep their state in the cache. Use a
+# cache shared by all processes, e.g. Redis, when running more than one.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+# Token buckets per user, or client IP, and throttle scope. A request
+# takes its cost in tokens, `refill` tokens per second come back up to
+# `capacity`. Views without a scope of their own use 'default'.
+RATE_LIMITS = {
+    'default': {'capacity': 300, 'refill': 5},
+    'playlists': {'capacity': 300, 'refill': 5},
+}
+# Listing playlists costs a token plus one per this many playlists.
+PLAYLIST_LIST_COST_UNIT = 100
+# Most playlists returned by /api/playlist/playlists/<id>/similar/.
+SIMILAR_PLAYLISTS_LIMIT = 20
+# Songs of a library are compared with this many neighbours when looking
+# for duplicates, and match from this similarity of their names.
+DUPLICATE_SONGS_WINDOW = 5
+DUPLICATE_SONGS_THRESHOLD = 0.9
+
+# prune_changes removes entries older than CHANGES_RETENTION_DAYS, clients
+# with older cursors sync again from scratch.
+CHANGES_RETENTION_DAYS = int(os.environ.get('CHANGES_RETENTION_DAYS', 30))
+
 SPECTACULAR_SETTINGS = {
     "COMPONENT_SPLIT_REQUEST": True,
 }
+
+# Pre-generated OpenAPI schema written by `manage.py build_schema`.
+# When unset or missing the schema is generated on first request instead.
+SCHEMA_CACHE_FILE = os.environ.get('SCHEMA_CACHE_FILE')
+# Generate the schema while starting up and refuse to start if that fails.
+SCHEMA_FAIL_ON_ERROR = bool(int(os.environ.get('SCHEMA_FAIL_ON_ERROR', 0)))
+# API versions a schema is served and cached for, besides the default one.
+SCHEMA_VERSIONS = [
+    version for version in os.environ.get('SCHEMA_VERSIONS', '').split(',')
+    if version
+]
+
+# Requests are profiled when sent with an X-Profile token from
+# /api/profiles/token/, valid this many seconds, or picked at this rate.
+PROFILING_TOKEN_MAX_AGE = 3600
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', 0))
+# Profiled queries slower than this are run again with EXPLAIN.
+PROFILING_EXPLAIN_MS = 20
+PROFILING_MAX_QUERIES = 500
+PROFILING_TOP_FUNCTIONS = 50
+
+# Queries slower than this many ms are grouped by fingerprint, with their
+# plan, and added to the SlowQuery table. Off unless SLOW_QUERY_MS is set.
+SLOW_QUERY_MS = os.environ.get('SLOW_QUERY_MS', '')
+SLOW_QUERY_MS = float(SLOW_QUERY_MS) if SLOW_QUERY_MS else None
+SLOW_QUERY_EXPLAIN_ANALYZE = bool(
+    int(os.environ.get('SLOW_QUERY_EXPLAIN_ANALYZE', 0)),
+)
+SLOW_QUERY_MAX_FINGERPRINTS = 200
+SLOW_QUERY_FLUSH_SECONDS = 60
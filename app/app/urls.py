@@ -14,26 +14,60 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
-from django.contrib import admin
-from django.urls import path, include
-from django.conf.urls.static import static
+import re
+
+from django.apps import apps
+from django.urls import path, include, re_path
 from django.conf import settings
 
-urlpatterns = [
-    path('admin/', admin.site.urls),
-    path('api/schema', SpectacularAPIView.as_view(), name="api-schema"),
-    path(
-        "api/docs",
-        SpectacularSwaggerView.as_view(url_name="api-schema"),
-        name="api-docs",
-    ),
+from core import serving
+
+urlpatterns = []
+
+# Only wire up (and import) the admin and schema views when their apps are
+# installed, API-only workers skip them entirely.
+if apps.is_installed('django.contrib.admin'):
+    from django.contrib import admin
+
+    urlpatterns += [
+        path('admin/', admin.site.urls),
+    ]
+
+if apps.is_installed('drf_spectacular'):
+    from drf_spectacular.views import SpectacularSwaggerView
+
+    from core.schema import CachedSpectacularAPIView
+
+    urlpatterns += [
+        path(
+            'api/schema',
+            CachedSpectacularAPIView.as_view(),
+            name="api-schema",
+        ),
+        path(
+            "api/docs",
+            SpectacularSwaggerView.as_view(url_name="api-schema"),
+            name="api-docs",
+        ),
+    ]
+
+urlpatterns += [
+    path('api/', include('core.urls')),
     path('api/user/', include('user.urls')),
     path('api/playlist/', include('playlist.urls')),
 ]
 
-if settings.DEBUG:
-    urlpatterns += static(
-        settings.MEDIA_URL,
-        document_root=settings.MEDIA_ROOT,
-    )
+
+def _files_path(url, view, name):
+    return re_path(rf'^{re.escape(url.lstrip("/"))}(?P<path>.+)$', view,
+                   name=name)
+
+
+urlpatterns += [
+    _files_path(settings.MEDIA_URL, serving.serve_media, 'media'),
+]
+
+if apps.is_installed('django.contrib.staticfiles'):
+    urlpatterns += [
+        _files_path(settings.STATIC_URL, serving.serve_static, 'static'),
+    ]
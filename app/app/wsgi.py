@@ -14,3 +14,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
 application = get_wsgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if settings.SCHEMA_FAIL_ON_ERROR and not settings.API_ONLY:
+    from core.schema import warm_schema_cache
+
+    warm_schema_cache()
@@ -1,9 +1,115 @@
+import json
+
 from django.contrib import admin
+from django.contrib.admin.views.main import IGNORED_PARAMS, ChangeList
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.db import connections
 from django.utils.translation import gettext_lazy as _
 
 from . import models
 
+# Lists are counted exactly up to this many rows, bigger ones estimated.
+EXACT_COUNT_LIMIT = 10000
+CURSOR_VAR = 'id__lt'
+
+
+def estimated_count(queryset, filtered=True):
+    """Return the number of rows of queryset, estimated for big ones.
+
+    Unfiltered querysets take the table's reltuples from pg_class, kept
+    by VACUUM and ANALYZE. Otherwise at most EXACT_COUNT_LIMIT rows are
+    counted, and past that Postgres' planner estimate is used, which
+    scales reltuples by the selectivity of the filters. Either costs the
+    same for any table size.
+    """
+    queryset = queryset.order_by()
+    connection = connections[queryset.db]
+    if not filtered and connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table],
+            )
+            reltuples = cursor.fetchone()[0]
+        # -1 until the table is first analyzed.
+        if reltuples >= EXACT_COUNT_LIMIT:
+            return int(reltuples)
+    count = queryset[:EXACT_COUNT_LIMIT].count()
+    if count < EXACT_COUNT_LIMIT or connection.vendor != 'postgresql':
+        return count
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return max(count, int(plan[0]['Plan']['Plan Rows']))
+
+
+class KeysetChangeList(ChangeList):
+    """Change list paged by primary key, newest first.
+
+    The next page is the rows with a lower id than the last one shown,
+    so every page is read from the primary key index as fast as the
+    first, and the count is estimated instead of counting every row.
+    """
+    keyset_pagination = True
+
+    def get_ordering(self, request, queryset):
+        return ['-pk']
+
+    def is_filtered(self):
+        """Return whether a search or filter is applied, not the cursor.
+
+        The admin's own queryset doesn't count, so the estimate of an
+        unfiltered list includes the soft deleted rows not purged yet.
+        """
+        lookups = set(self.params) - set(IGNORED_PARAMS) - {CURSOR_VAR}
+        return bool(self.query or lookups)
+
+    def get_results(self, request):
+        rows = list(self.queryset[:self.list_per_page + 1])
+        self.result_list = rows[:self.list_per_page]
+        if self.is_filtered():
+            self.result_count = estimated_count(self.queryset)
+        else:
+            self.result_count = estimated_count(
+                self.root_queryset,
+                filtered=False,
+            )
+        self.show_full_result_count = False
+        self.show_admin_actions = True
+        self.full_result_count = None
+        self.can_show_all = False
+        self.multi_page = False
+        self.paginator = self.model_admin.get_paginator(
+            request,
+            self.queryset,
+            self.list_per_page,
+        )
+        self.next_page_url = None
+        if len(rows) > self.list_per_page:
+            self.next_page_url = self.get_query_string({
+                CURSOR_VAR: self.result_list[-1].pk,
+            })
+        self.first_page_url = None
+        if CURSOR_VAR in self.params:
+            self.first_page_url = self.get_query_string(remove=[CURSOR_VAR])
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Admin for tables too big to count or to page by offset.
+
+    Columns aren't sortable, pages follow the primary key. Search fields
+    should be prefix or exact lookups backed by an index.
+    """
+    sortable_by = ()
+    show_full_result_count = False
+    list_per_page = 100
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
 
 class UserAdmin(BaseUserAdmin):
     # define the admin pages for users
@@ -41,7 +147,67 @@ class UserAdmin(BaseUserAdmin):
     )
 
 
+class PlaylistTagInline(admin.TabularInline):
+    """Tags of a playlist, stored with the user by PlaylistTag.save()."""
+    model = models.PlaylistTag
+    fields = ['tag']
+    raw_id_fields = ['tag']
+    extra = 0
+
+
+@admin.register(models.Playlist)
+class PlaylistAdmin(LargeTableAdmin):
+    list_display = ['id', 'title', 'user', 'general_genre', 'time_minutes']
+    list_select_related = ['user']
+    raw_id_fields = ['user']
+    inlines = [PlaylistTagInline]
+    search_fields = ['title__startswith', 'user__email__exact']
+    search_help_text = _('Title prefix, or the exact email of the user.')
+
+
+@admin.register(models.Tag)
+class TagAdmin(LargeTableAdmin):
+    list_display = ['id', 'name', 'user', 'playlist_count']
+    list_select_related = ['user']
+    raw_id_fields = ['user']
+    search_fields = ['name__startswith', 'user__email__exact']
+    search_help_text = _('Name prefix, or the exact email of the user.')
+
+
+@admin.register(models.Song)
+class SongAdmin(LargeTableAdmin):
+    list_display = ['id', 'name', 'artist', 'user', 'playlist_count']
+    list_select_related = ['user', 'track__artist']
+    raw_id_fields = ['user', 'track']
+    search_fields = ['track__name__startswith', 'user__email__exact']
+    search_help_text = _('Name prefix, or the exact email of the user.')
+
+
+@admin.register(models.SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    list_display = [
+        'fingerprint',
+        'tables',
+        'count',
+        'total_ms',
+        'max_ms',
+        'full_scan',
+        'last_seen_at',
+    ]
+    list_filter = ['full_scan']
+    search_fields = ['tables', 'fingerprint']
+    ordering = ['-total_ms']
+    readonly_fields = [
+        field.name for field in models.SlowQuery._meta.fields
+    ]
+
+
 admin.site.register(models.User, UserAdmin)
-admin.site.register(models.Playlist)
-admin.site.register(models.Tag)
-admin.site.register(models.Song)
+admin.site.register(models.Artist)
+admin.site.register(models.Track)
+admin.site.register(models.LibraryStats)
+admin.site.register(models.GenreStats)
+admin.site.register(models.Job)
+admin.site.register(models.AuthToken)
+admin.site.register(models.MediaBlob)
+admin.site.register(models.ProfileRecord)
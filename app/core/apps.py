@@ -1,6 +1,29 @@
+import atexit
+
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db.backends.signals import connection_created
+from django.utils.module_loading import autodiscover_modules
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from core import signals  # noqa: F401
+
+        # Registers the @task() functions of every app.
+        autodiscover_modules('tasks')
+
+        from core import authentication
+
+        request_finished.connect(authentication.flush_if_due)
+        atexit.register(authentication.flush_last_used)
+
+        if settings.SLOW_QUERY_MS is not None:
+            from core import slow_queries
+
+            connection_created.connect(slow_queries.install)
+            request_finished.connect(slow_queries.flush_if_due)
@@ -0,0 +1,86 @@
+"""
+Authentication with expiring, per device API tokens.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from core.models import AuthToken
+
+_last_used = {}
+_last_used_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+def record_use(token_id, when):
+    """Remember a token was used, to be written by the next flush.
+
+    Uses are buffered per process instead of a write per authenticated
+    request, see flush_if_due().
+    """
+    with _last_used_lock:
+        _last_used[token_id] = when
+
+
+def flush_if_due(**kwargs):
+    """Flush every AUTH_TOKEN_LAST_USED_FLUSH_SECONDS.
+
+    Connected to request_finished, so the write happens after the
+    response is sent. Whatever is left is flushed at process exit.
+    """
+    if (not _last_used
+            or time.monotonic() - _last_flush
+            < settings.AUTH_TOKEN_LAST_USED_FLUSH_SECONDS):
+        return
+    flush_last_used()
+
+
+def flush_last_used():
+    """Write the buffered last use times and return how many there were."""
+    global _last_flush
+    with _last_used_lock:
+        pending = dict(_last_used)
+        _last_used.clear()
+        _last_flush = time.monotonic()
+    if pending:
+        AuthToken.objects.bulk_update(
+            [
+                AuthToken(pk=token_id, last_used_at=when)
+                for token_id, when in pending.items()
+            ],
+            ['last_used_at'],
+        )
+    return len(pending)
+
+
+class ExpiringTokenAuthentication(TokenAuthentication):
+    """Token authentication with AuthToken, rejecting expired tokens.
+
+    Clients send ``Authorization: Token <key>`` as before.
+    """
+    model = AuthToken
+
+    def authenticate_credentials(self, key):
+        now = timezone.now()
+        try:
+            token = AuthToken.objects.select_related('user').get(
+                key=key,
+                expires_at__gt=now,
+            )
+        except AuthToken.DoesNotExist:
+            raise exceptions.AuthenticationFailed(
+                _('Invalid or expired token.')
+            )
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+
+        record_use(token.pk, now)
+        return (token.user, token)
@@ -0,0 +1,47 @@
+"""
+Share the result of identical requests that run at the same time.
+"""
+import hashlib
+import time
+import uuid
+
+from django.core.cache import cache
+
+_MISSING = object()
+
+
+def coalesce(key, compute, timeout=30, poll_interval=0.05, result_ttl=10):
+    """Return compute(), running it once for concurrent callers of key.
+
+    The first caller takes a lock in the cache and computes the result,
+    callers arriving meanwhile wait for it and get the same result. Once
+    the lock is gone the next caller computes a fresh one, so nothing
+    older than a running computation is served. If the first caller
+    fails or takes longer than timeout the others compute themselves.
+    The result has to be picklable unless the cache is local memory.
+    """
+    lock_key = 'coalesce:' + hashlib.sha1(key.encode()).hexdigest()
+    token = uuid.uuid4().hex
+    if cache.add(lock_key, token, timeout):
+        try:
+            result = compute()
+            cache.set(f'{lock_key}:{token}', result, result_ttl)
+            return result
+        finally:
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+
+    leader = cache.get(lock_key)
+    deadline = time.monotonic() + timeout
+    while leader is not None and time.monotonic() < deadline:
+        # The result is stored before the lock is released, read them
+        # in the opposite order so a finished result is never missed.
+        held = cache.get(lock_key) == leader
+        result = cache.get(f'{lock_key}:{leader}', _MISSING)
+        if result is not _MISSING:
+            return result
+        if not held:
+            # The leader failed, or its lock expired.
+            break
+        time.sleep(poll_interval)
+    return compute()
@@ -0,0 +1,105 @@
+"""
+Detection of duplicate songs in a user's library.
+
+Songs whose tracks share a match key (see core.models.match_key) are
+duplicates. Names still differing after that, like typos, are found by
+comparing each song with its neighbours once the songs are sorted by
+artist and name, and once more by reversed name for differences at the
+start. That costs O(n log n) rather than comparing every pair.
+"""
+import re
+from difflib import SequenceMatcher
+from itertools import groupby
+
+from django.conf import settings
+
+from core.models import Song, match_name
+
+
+class _Groups:
+    """Union-find over song ids."""
+
+    def __init__(self, ids):
+        self.parent = {song_id: song_id for song_id in ids}
+
+    def find(self, song_id):
+        while self.parent[song_id] != song_id:
+            self.parent[song_id] = self.parent[self.parent[song_id]]
+            song_id = self.parent[song_id]
+        return song_id
+
+    def union(self, first, second):
+        self.parent[self.find(first)] = self.find(second)
+
+
+# Roman numerals up to 399, higher ones don't number songs and would
+# match words like "mix" or "dim".
+_ROMAN_RE = re.compile(r'^(?=[clxvi])c{0,3}(x[cl]|l?x{0,3})(i[xv]|v?i{0,3})$')
+
+
+def _numbers(name):
+    # Digits and roman numerals, "Part I" and "Part II" are two songs.
+    return {
+        word for word in re.findall(r'\w+', name)
+        if word.isdigit() or _ROMAN_RE.match(word)
+    }
+
+
+def _similar(first, second, threshold):
+    if _numbers(first) != _numbers(second):
+        return False
+    matcher = SequenceMatcher(None, first, second)
+    # quick_ratio() is an upper bound of ratio(), and cheaper.
+    return (
+        matcher.quick_ratio() >= threshold
+        and matcher.ratio() >= threshold
+    )
+
+
+def find_duplicates(user):
+    """Return groups of songs of user that look like the same song.
+
+    Each group is a list of songs, the one to keep first: the song on
+    the most playlists, then the oldest one.
+    """
+    songs = list(
+        Song.objects.filter(user=user).select_related('track__artist')
+    )
+    groups = _Groups(song.pk for song in songs)
+
+    by_key = sorted(songs, key=lambda song: song.track.match_key)
+    for _, same in groupby(by_key, key=lambda song: song.track.match_key):
+        same = list(same)
+        for song in same[1:]:
+            groups.union(same[0].pk, song.pk)
+
+    window = settings.DUPLICATE_SONGS_WINDOW
+    threshold = settings.DUPLICATE_SONGS_THRESHOLD
+    names = {song.pk: match_name(song.name) for song in songs}
+    artists = {
+        song.pk: song.track.artist.key if song.track.artist else ''
+        for song in songs
+    }
+    for reverse in (False, True):
+        ordered = sorted(songs, key=lambda song: (
+            artists[song.pk],
+            names[song.pk][::-1] if reverse else names[song.pk],
+        ))
+        for index, song in enumerate(ordered):
+            for other in ordered[index + 1:index + 1 + window]:
+                if artists[other.pk] != artists[song.pk]:
+                    break
+                if _similar(names[song.pk], names[other.pk], threshold):
+                    groups.union(song.pk, other.pk)
+
+    members = {}
+    for song in songs:
+        members.setdefault(groups.find(song.pk), []).append(song)
+    return sorted(
+        (
+            sorted(group, key=lambda song: (-song.playlist_count, song.pk))
+            for group in members.values()
+            if len(group) > 1
+        ),
+        key=lambda group: group[0].pk,
+    )
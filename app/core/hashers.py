@@ -0,0 +1,53 @@
+"""
+Password hashers with a configurable cost, run in a bounded pool.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def run_hashing(func, *args):
+    """Run func(*args) in the password hashing pool and return the result.
+
+    The pool has settings.PASSWORD_HASH_WORKERS threads, so a burst of
+    logins queues for a core instead of every request thread hashing at
+    once. hashlib releases the GIL while hashing, so the threads serving
+    other requests keep running meanwhile.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(
+                    max_workers=getattr(
+                        settings,
+                        'PASSWORD_HASH_WORKERS',
+                        None,
+                    ) or os.cpu_count(),
+                    thread_name_prefix='password-hash',
+                )
+    return _pool.submit(func, *args).result()
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    """PBKDF2 with settings.PASSWORD_HASH_ITERATIONS, hashing in the pool.
+
+    Passwords hashed with another iteration count still verify and are
+    rehashed on the next login.
+    """
+
+    @property
+    def iterations(self):
+        return (
+            getattr(settings, 'PASSWORD_HASH_ITERATIONS', None)
+            or hashers.PBKDF2PasswordHasher.iterations
+        )
+
+    def encode(self, password, salt, iterations=None):
+        return run_hashing(super().encode, password, salt, iterations)
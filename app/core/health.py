@@ -0,0 +1,22 @@
+"""
+Lightweight health checks.
+"""
+from psycopg2 import OperationalError as Psycopg2OpError
+
+from django.db import connections
+from django.db.utils import OperationalError
+
+
+def check_database(alias='default'):
+    """Return True if the database behind `alias` answers a query.
+
+    Unlike the system checks framework this only opens a connection and
+    runs ``SELECT 1``, so it is cheap enough for probes and polling.
+    """
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+    except (Psycopg2OpError, OperationalError):
+        return False
+    return True
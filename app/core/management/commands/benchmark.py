@@ -0,0 +1,206 @@
+"""
+Django command to benchmark hot queries and logins.
+"""
+import os
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import authenticate, get_user_model
+from django.contrib.auth.hashers import check_password, get_hasher
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core.models import (
+    Playlist,
+    PlaylistSong,
+    Song,
+    Tag,
+    Track,
+    match_key,
+    track_key,
+)
+
+BATCH_SIZE = 5000
+
+
+class Command(BaseCommand):
+    """Time queries against a generated library that is rolled back."""
+    SUITES = ['filters', 'logins']
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'suite',
+            nargs='?',
+            choices=self.SUITES,
+            default='filters',
+        )
+        parser.add_argument('--playlists', type=int, default=10000)
+        parser.add_argument('--tags', type=int, default=100)
+        parser.add_argument('--songs', type=int, default=1000)
+        parser.add_argument('--tags-per-playlist', type=int, default=5)
+        parser.add_argument('--songs-per-playlist', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--logins', type=int, default=200)
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=os.cpu_count(),
+            help='Concurrent logins, like request threads of a server.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            getattr(self, '_bench_{}'.format(options['suite']))(rng, options)
+            transaction.set_rollback(True)
+
+    def _create_library(self, rng, options):
+        self.stdout.write('Generating {} playlists...'.format(
+            options['playlists']))
+        user = get_user_model().objects.create_user(
+            email='benchmark@example.invalid',
+        )
+        tags = Tag.objects.bulk_create(
+            [
+                Tag(user=user, name=f'Tag {index}')
+                for index in range(options['tags'])
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        names = [
+            f'Benchmark song {index}' for index in range(options['songs'])
+        ]
+        Track.objects.bulk_create(
+            [
+                Track(
+                    name=name,
+                    key=track_key(name, ''),
+                    match_key=match_key(name, ''),
+                )
+                for name in names
+            ],
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        songs = Song.objects.bulk_create(
+            [
+                Song(user=user, track=track)
+                for track in Track.objects.filter(
+                    key__in=[track_key(name, '') for name in names],
+                )
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        playlists = Playlist.objects.bulk_create(
+            [
+                Playlist(
+                    user=user,
+                    title=f'Playlist {index}',
+                    time_minutes=rng.randint(10, 120),
+                )
+                for index in range(options['playlists'])
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        Playlist.tags.through.objects.bulk_create(
+            [
+                Playlist.tags.through(playlist=playlist, tag=tag)
+                for playlist in playlists
+                for tag in rng.sample(tags, options['tags_per_playlist'])
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        PlaylistSong.objects.bulk_create(
+            [
+                PlaylistSong(
+                    playlist=playlist,
+                    song=song,
+                    position=position * PlaylistSong.POSITION_GAP,
+                )
+                for playlist in playlists
+                for position, song in enumerate(
+                    rng.sample(songs, options['songs_per_playlist']),
+                    start=1,
+                )
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        return user
+
+    def _time(self, name, build_queryset, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            rows = len(list(build_queryset()))
+            timings.append((time.perf_counter() - start) * 1000)
+        self.stdout.write('{:<28} {:>10.2f} ms {:>8} rows'.format(
+            name,
+            statistics.median(timings),
+            rows,
+        ))
+
+    def _bench_filters(self, rng, options):
+        user = self._create_library(rng, options)
+        playlists = Playlist.objects.filter(user=user)
+        # Ids taken from one playlist, so that match=all has results.
+        sample = rng.choice(list(playlists.values_list('id', flat=True)))
+        tag_ids = list(Playlist.tags.through.objects.filter(
+            playlist_id=sample,
+        ).values_list('tag_id', flat=True)[:2])
+        song_ids = list(PlaylistSong.objects.filter(
+            playlist_id=sample,
+        ).values_list('song_id', flat=True)[:2])
+
+        cases = [
+            ('tags, match=any', lambda: playlists.with_tags(tag_ids)),
+            ('tags, match=all', lambda: playlists.with_tags(tag_ids, True)),
+            ('songs, match=any', lambda: playlists.with_songs(song_ids)),
+            ('songs, match=all', lambda: playlists.with_songs(song_ids, True)),
+            ('tags, join + distinct', lambda: playlists.filter(
+                tags__id__in=tag_ids,
+            ).distinct()),
+            ('songs, join + distinct', lambda: playlists.filter(
+                songs__id__in=song_ids,
+            ).distinct()),
+        ]
+        for name, build_queryset in cases:
+            self._time(
+                name,
+                lambda: build_queryset().order_by('-id').values_list('id'),
+                options['repeat'],
+            )
+
+    def _bench_logins(self, rng, options):
+        password = 'benchmark-{}'.format(rng.random())
+        user = get_user_model().objects.create_user(
+            email='benchmark@example.invalid',
+            password=password,
+        )
+        if authenticate(username=user.email, password=password) is None:
+            raise CommandError('Login failed.')
+        hasher = get_hasher()
+        self.stdout.write('{}, {} iterations, {} hash workers'.format(
+            hasher.algorithm,
+            getattr(hasher, 'iterations', '-'),
+            settings.PASSWORD_HASH_WORKERS or os.cpu_count(),
+        ))
+
+        # Only the password check runs in the threads, their connections
+        # can't see the uncommitted user. It is most of a login's cost.
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['threads']) as pool:
+            list(pool.map(
+                lambda _: check_password(password, user.password),
+                range(options['logins']),
+            ))
+        rate = options['logins'] / (time.perf_counter() - start)
+        self.stdout.write('{:<28} {:>10.1f} /s {:>8.1f} /s per core'.format(
+            'logins',
+            rate,
+            rate / os.cpu_count(),
+        ))
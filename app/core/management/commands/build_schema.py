@@ -0,0 +1,44 @@
+"""
+Django command to pre-generate the OpenAPI schema.
+"""
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.schema import generate_schema, render_schema_json
+
+
+class Command(BaseCommand):
+    """Generate the schema once per deploy for /api/schema to serve."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--file',
+            default=getattr(settings, 'SCHEMA_CACHE_FILE', None),
+            help='Where to write the schema, defaults to SCHEMA_CACHE_FILE.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        if settings.API_ONLY:
+            raise CommandError(
+                'The schema is not served with APP_ROLE=api, build it from '
+                'a full process.'
+            )
+        path = options['file']
+        if not path:
+            raise CommandError(
+                'No output file given and SCHEMA_CACHE_FILE is not set.'
+            )
+
+        self.stdout.write('Generating OpenAPI schema...')
+        content = render_schema_json(generate_schema())
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + '.tmp')
+        tmp_path.write_bytes(content)
+        tmp_path.replace(path)
+
+        self.stdout.write(self.style.SUCCESS(f'Schema written to {path}'))
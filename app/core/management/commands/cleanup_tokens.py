@@ -0,0 +1,47 @@
+"""
+Django command to delete expired API tokens.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import AuthToken
+
+
+class Command(BaseCommand):
+    """Delete expired tokens in chunks, keeping each delete short."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Tokens deleted per query.',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0,
+            help='Seconds to pause between chunks.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        expired = AuthToken.objects.filter(expires_at__lte=timezone.now())
+        deleted = 0
+        while True:
+            pks = list(
+                expired.order_by('expires_at').values_list('pk', flat=True)[
+                    :options['batch_size']
+                ]
+            )
+            if not pks:
+                break
+            deleted += AuthToken.objects.filter(pk__in=pks).delete()[0]
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{deleted} expired tokens deleted.'
+        ))
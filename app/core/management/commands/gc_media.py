@@ -0,0 +1,118 @@
+"""
+Django command to delete media files nothing refers to.
+"""
+import itertools
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import MediaBlob, Playlist
+
+UPLOADS_DIR = 'uploads/playlist'
+BLOBS_DIR = 'blobs'
+
+
+class Command(BaseCommand):
+    """Delete blobs without references, and optionally stray files.
+
+    Blobs are only deleted after being unreferenced for --grace seconds,
+    so an upload that is not saved yet keeps its file.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace',
+            type=float,
+            default=3600,
+            help='Seconds a file has to be unreferenced before deleting.',
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--scan-storage',
+            action='store_true',
+            help='Also list the storage for files without a blob, like '
+                 'images uploaded before blobs or lost upload races.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        self.storage = Playlist._meta.get_field('image').storage
+        cutoff = timezone.now() - timedelta(seconds=options['grace'])
+        deleted = self._delete_orphan_blobs(cutoff, options['batch_size'])
+        if options['scan_storage']:
+            deleted += self._delete_stray_files(cutoff, options['batch_size'])
+
+        self.stdout.write(self.style.SUCCESS(f'{deleted} files deleted.'))
+
+    def _delete_files(self, names):
+        # Only once the rows are gone for good.
+        transaction.on_commit(
+            lambda: [self.storage.delete(name) for name in names]
+        )
+
+    def _delete_orphan_blobs(self, cutoff, batch_size):
+        deleted = 0
+        last_pk = 0
+        while True:
+            with transaction.atomic():
+                # Locked, so a new upload touching one of these blobs
+                # waits and then finds it gone.
+                blobs = list(MediaBlob.objects.select_for_update().filter(
+                    ref_count__lte=0,
+                    ref_changed_at__lt=cutoff,
+                    pk__gt=last_pk,
+                ).order_by('pk')[:batch_size])
+                if not blobs:
+                    break
+                last_pk = blobs[-1].pk
+                # Double check, in case a count went wrong.
+                used = set(Playlist.all_objects.filter(
+                    image__in=[blob.name for blob in blobs],
+                ).values_list('image', flat=True))
+                orphans = [blob for blob in blobs if blob.name not in used]
+                MediaBlob.objects.filter(
+                    pk__in=[blob.pk for blob in orphans],
+                ).delete()
+                self._delete_files([blob.name for blob in orphans])
+            deleted += len(orphans)
+            self.stdout.write(f'Deleted {deleted} unreferenced blobs...')
+        return deleted
+
+    def _walk(self, path):
+        try:
+            directories, files = self.storage.listdir(path)
+        except FileNotFoundError:
+            return
+        for name in files:
+            yield f'{path}/{name}'
+        for directory in directories:
+            yield from self._walk(f'{path}/{directory}')
+
+    def _delete_stray_files(self, cutoff, batch_size):
+        deleted = 0
+        for directory in (UPLOADS_DIR, BLOBS_DIR):
+            files = self._walk(directory)
+            while names := list(itertools.islice(files, batch_size)):
+                known = set(MediaBlob.objects.filter(
+                    name__in=names,
+                ).values_list('name', flat=True))
+                known.update(Playlist.all_objects.filter(
+                    image__in=names,
+                ).values_list('image', flat=True))
+                stray = [
+                    name for name in names
+                    if name not in known and self._older_than(name, cutoff)
+                ]
+                for name in stray:
+                    self.storage.delete(name)
+                deleted += len(stray)
+        return deleted
+
+    def _older_than(self, name, cutoff):
+        try:
+            return self.storage.get_modified_time(name) < cutoff
+        except NotImplementedError:
+            # Can't tell if an upload is still being saved, keep it.
+            return False
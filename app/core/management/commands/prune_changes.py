@@ -0,0 +1,71 @@
+"""
+Django command to delete old entries of the change log.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from core.models import ChangeFeed, ChangeLog
+
+
+class Command(BaseCommand):
+    """Delete change log entries past their retention, in chunks.
+
+    Each user's feed keeps the highest seq deleted, the changes feed
+    expires cursors below it.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.CHANGES_RETENTION_DAYS,
+            help='Keep entries of this many days.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Entries deleted per query.',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0,
+            help='Seconds to pause between chunks.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        expired = ChangeLog.objects.filter(
+            created_at__lt=timezone.now() - timedelta(days=options['days']),
+        )
+        deleted = 0
+        while True:
+            pks = list(
+                expired.order_by('id').values_list('pk', flat=True)[
+                    :options['batch_size']
+                ]
+            )
+            if not pks:
+                break
+            chunk = ChangeLog.objects.filter(pk__in=pks)
+            with transaction.atomic():
+                pruned = chunk.values('user').annotate(seq=Max('seq'))
+                for row in pruned.order_by('user'):
+                    ChangeFeed.objects.filter(
+                        user=row['user'],
+                        pruned_seq__lt=row['seq'],
+                    ).update(pruned_seq=row['seq'])
+                deleted += chunk.delete()[0]
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{deleted} old changes deleted.'
+        ))
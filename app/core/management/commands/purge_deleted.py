@@ -0,0 +1,96 @@
+"""
+Django command to purge soft deleted rows.
+"""
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core.models import Playlist, PlaylistSong, Song, Tag
+
+
+class Command(BaseCommand):
+    """Delete soft deleted rows for good, in bounded batches.
+
+    Each step finds its rows from ``deleted_at`` alone, so a run that was
+    interrupted carries on where it stopped when started again.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows changed per transaction.',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0,
+            help='Seconds to pause between batches.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        self.batch_size = options['batch_size']
+        self.sleep = options['sleep']
+        now = timezone.now()
+        tag_links = Playlist.tags.through.objects
+
+        # Rows of deleted users are hidden first, so deleting them below
+        # skips the bookkeeping for objects that are already gone.
+        for model in (Playlist, Tag, Song):
+            self._in_batches(
+                f'Hiding {model._meta.verbose_name_plural} of deleted users',
+                model.all_objects.filter(
+                    user__deleted_at__isnull=False,
+                    deleted_at__isnull=True,
+                ),
+                lambda batch: batch.update(deleted_at=now),
+            )
+        self._in_batches(
+            'Deleting playlist songs',
+            PlaylistSong.objects.filter(
+                Q(playlist__deleted_at__isnull=False)
+                | Q(song__deleted_at__isnull=False)
+            ),
+            lambda batch: batch.delete(),
+        )
+        self._in_batches(
+            'Deleting playlist tags',
+            tag_links.filter(
+                Q(playlist__deleted_at__isnull=False)
+                | Q(tag__deleted_at__isnull=False)
+            ),
+            lambda batch: batch.delete(),
+        )
+        for model in (Playlist, Tag, Song, get_user_model()):
+            self._in_batches(
+                f'Deleting {model._meta.verbose_name_plural}',
+                model._base_manager.filter(deleted_at__isnull=False),
+                lambda batch: batch.delete(),
+            )
+
+        self.stdout.write(self.style.SUCCESS('Purge complete!'))
+
+    def _in_batches(self, label, queryset, apply):
+        """Apply to batches of queryset until no rows are left."""
+        done = 0
+        while True:
+            pks = list(
+                queryset.order_by('pk').values_list('pk', flat=True)[
+                    :self.batch_size
+                ]
+            )
+            if not pks:
+                break
+            with transaction.atomic():
+                apply(queryset.model._base_manager.filter(pk__in=pks))
+            done += len(pks)
+            self.stdout.write(f'{label}: {done}')
+            if self.sleep:
+                time.sleep(self.sleep)
+        return done
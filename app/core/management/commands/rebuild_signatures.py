@@ -0,0 +1,55 @@
+"""
+Django command to recompute the playlist signatures.
+"""
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from core.models import Playlist
+from core.similarity import update_signatures
+
+
+class Command(BaseCommand):
+    """Recompute the MinHash signatures used to find similar playlists."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            action='append',
+            dest='emails',
+            help='Only rebuild the playlists of this user, can be repeated.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Playlists updated per transaction.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        playlists = Playlist.objects.order_by('pk')
+        if options['emails']:
+            playlists = playlists.filter(
+                user__in=get_user_model().objects.filter(
+                    email__in=options['emails'],
+                ),
+            )
+
+        self.stdout.write('Rebuilding playlist signatures...')
+        last_pk = 0
+        count = 0
+        while True:
+            batch = list(
+                playlists.filter(pk__gt=last_pk).values_list(
+                    'pk',
+                    flat=True,
+                )[:options['batch_size']]
+            )
+            if not batch:
+                break
+            update_signatures(batch)
+            last_pk = batch[-1]
+            count += len(batch)
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt the signatures of {count} playlists.'
+        ))
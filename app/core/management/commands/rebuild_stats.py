@@ -0,0 +1,45 @@
+"""
+Django command to recompute the library statistics.
+"""
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from core import tasks
+from core.stats import rebuild_stats
+from core.tasks import enqueue
+
+
+class Command(BaseCommand):
+    """Recount playlist and tag stats from scratch, in bulk."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            action='append',
+            dest='emails',
+            help='Only rebuild the stats of this user, can be repeated.',
+        )
+        parser.add_argument(
+            '--background',
+            action='store_true',
+            help='Enqueue the rebuild for run_workers instead.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        user_ids = None
+        if options['emails']:
+            user_ids = list(
+                get_user_model().objects.filter(
+                    email__in=options['emails'],
+                ).values_list('id', flat=True)
+            )
+
+        if options['background']:
+            job = enqueue(tasks.rebuild_stats, user_ids=user_ids)
+            self.stdout.write(self.style.SUCCESS(f'Enqueued job {job.id}.'))
+            return
+
+        self.stdout.write('Rebuilding library stats...')
+        rebuild_stats(user_ids)
+        self.stdout.write(self.style.SUCCESS('Library stats rebuilt!'))
@@ -0,0 +1,111 @@
+"""
+Django command to run background jobs.
+"""
+import multiprocessing
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from datetime import timedelta
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+
+# Spawned processes unpickle these by reference before Django is set
+# up, so models are only imported once they run.
+
+def _setup_process():
+    django.setup()
+
+
+def _execute_job(job_id):
+    from core.tasks import execute_job
+
+    execute_job(job_id)
+
+
+class Command(BaseCommand):
+    """Claim due jobs and run them in a pool of threads or processes."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--mode',
+            choices=['thread', 'process'],
+            default='thread',
+            help='Run jobs in threads, or in processes for CPU bound work.',
+        )
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument(
+            '--visibility-timeout',
+            type=float,
+            default=300,
+            help='Seconds before a job that did not finish is run again.',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1,
+            help='Seconds to wait when there are no jobs.',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once no jobs are due instead of polling.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        from core.tasks import claim_jobs
+
+        concurrency = options['concurrency']
+        timeout = timedelta(seconds=options['visibility_timeout'])
+        if options['mode'] == 'process':
+            # Fresh processes, so no database connection is shared with
+            # this one.
+            pool = ProcessPoolExecutor(
+                max_workers=concurrency,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_setup_process,
+            )
+        else:
+            pool = ThreadPoolExecutor(max_workers=concurrency)
+
+        self.stdout.write(
+            f'Running jobs in {concurrency} {options["mode"]} workers...'
+        )
+        in_flight = set()
+        processed = 0
+        try:
+            while True:
+                free = concurrency - len(in_flight)
+                jobs = claim_jobs(free, timeout) if free else []
+                for job in jobs:
+                    in_flight.add(pool.submit(_execute_job, job.pk))
+                if not in_flight:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+                finished, in_flight = wait(
+                    in_flight,
+                    timeout=options['poll_interval'],
+                    return_when=FIRST_COMPLETED,
+                )
+                for future in finished:
+                    processed += 1
+                    if future.exception():
+                        self.stderr.write(
+                            f'Worker crashed: {future.exception()!r}'
+                        )
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping, waiting for running jobs...')
+        finally:
+            pool.shutdown(wait=True)
+            connections.close_all()
+
+        self.stdout.write(self.style.SUCCESS(f'{processed} jobs run.'))
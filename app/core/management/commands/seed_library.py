@@ -0,0 +1,172 @@
+"""
+Django command to generate synthetic user libraries.
+"""
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+# Spawned processes unpickle these by reference before Django is set
+# up, so models are only imported once they run.
+
+def _setup_process():
+    django.setup()
+
+
+def _seed_users_in_worker(*args):
+    from core.seeding import seed_users
+
+    try:
+        return seed_users(*args)
+    finally:
+        connections.close_all()
+
+
+def _distribution(spec):
+    from core.seeding import Distribution
+
+    return Distribution(spec)
+
+
+class Command(BaseCommand):
+    """Add users with generated playlists, tags and songs.
+
+    The data only depends on --seed and the distributions, not on the
+    number of processes. Counts take N, uniform:LOW:HIGH or exp:MEAN.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument(
+            '--playlists',
+            type=_distribution,
+            default='exp:50',
+            help='Playlists per user.',
+        )
+        parser.add_argument(
+            '--tags',
+            type=_distribution,
+            default='uniform:5:30',
+            help='Tags per user.',
+        )
+        parser.add_argument(
+            '--songs',
+            type=_distribution,
+            default='exp:500',
+            help='Songs per user, taken from the catalog.',
+        )
+        parser.add_argument(
+            '--tags-per-playlist',
+            type=_distribution,
+            default='uniform:0:5',
+        )
+        parser.add_argument(
+            '--songs-per-playlist',
+            type=_distribution,
+            default='exp:20',
+        )
+        parser.add_argument(
+            '--catalog',
+            type=int,
+            default=100000,
+            help='Tracks in the shared catalog.',
+        )
+        parser.add_argument('--artists', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=os.cpu_count(),
+            help='Worker processes, 0 to seed in this process.',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=50,
+            help='Users added per transaction.',
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        from django.contrib.auth import get_user_model
+        from core.seeding import create_catalog, seed_email, seed_users
+
+        seed = options['seed']
+        if get_user_model().objects.filter(
+            email__in=[seed_email(seed, 0), seed_email(seed, 1)],
+        ).exists():
+            raise CommandError(
+                f'Seed {seed} was added already, pick another --seed.'
+            )
+        if options['catalog'] < 1 or options['artists'] < 1:
+            raise CommandError('--catalog and --artists must be positive.')
+
+        start = time.perf_counter()
+        self.stdout.write('Adding the catalog...')
+        catalog = create_catalog(
+            options['catalog'],
+            options['artists'],
+            options['batch_size'],
+        )
+        distributions = {
+            name: options[name] for name in [
+                'playlists',
+                'tags',
+                'songs',
+                'tags_per_playlist',
+                'songs_per_playlist',
+            ]
+        }
+        chunks = [
+            (
+                seed,
+                first,
+                min(first + options['chunk_size'], options['users']),
+                catalog,
+                distributions,
+                options['batch_size'],
+            )
+            for first in range(0, options['users'], options['chunk_size'])
+        ]
+
+        totals = {}
+        if options['processes']:
+            # The workers need the committed catalog, in their own
+            # connections.
+            connections.close_all()
+            with ProcessPoolExecutor(
+                max_workers=options['processes'],
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_setup_process,
+            ) as pool:
+                futures = [
+                    pool.submit(_seed_users_in_worker, *chunk)
+                    for chunk in chunks
+                ]
+                for future in as_completed(futures):
+                    self._add(totals, future.result())
+        else:
+            for chunk in chunks:
+                self._add(totals, seed_users(*chunk))
+
+        elapsed = time.perf_counter() - start
+        rows = sum(totals.values())
+        self.stdout.write(', '.join(
+            f'{count} {name}' for name, count in totals.items()
+        ))
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded in {elapsed:.1f} s, {rows / elapsed:.0f} rows/s.'
+        ))
+
+    def _add(self, totals, counts):
+        for name, count in counts.items():
+            totals[name] = totals.get(name, 0) + count
+        self.stdout.write(
+            f'{totals["users"]} users, {totals["links"]} links...'
+        )
@@ -0,0 +1,126 @@
+"""
+Django command to profile process startup.
+"""
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter so nothing is imported yet. Reports how long
+# each startup phase took and the peak RSS once the URLconf is loaded.
+PROFILE_SCRIPT = """
+import json, resource, sys, time
+start = time.perf_counter()
+import django
+django.setup()
+setup_done = time.perf_counter()
+from django.urls import get_resolver
+get_resolver().url_patterns
+urls_done = time.perf_counter()
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform == 'darwin':
+    rss //= 1024
+print(json.dumps({
+    'setup_ms': (setup_done - start) * 1000,
+    'urlconf_ms': (urls_done - setup_done) * 1000,
+    'total_ms': (urls_done - start) * 1000,
+    'max_rss_kb': rss,
+}))
+"""
+
+# Heavy libraries worth reporting even though they are not Django apps.
+EXTRA_PACKAGES = ['PIL', 'psycopg2', 'yaml', 'jsonschema', 'uritemplate']
+
+
+def parse_importtime(output):
+    """Parse ``-X importtime`` output into ``{module: self_us}``."""
+    timings = {}
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        module = fields[2].strip()
+        timings[module] = timings.get(module, 0) + int(fields[0])
+    return timings
+
+
+def group_by_package(timings, packages):
+    """Sum module timings under the longest matching package prefix."""
+    packages = sorted(packages, key=len, reverse=True)
+    totals = {}
+    for module, self_us in timings.items():
+        for package in packages:
+            if module == package or module.startswith(package + '.'):
+                break
+        else:
+            package = module.split('.')[0]
+        count, total = totals.get(package, (0, 0))
+        totals[package] = (count + 1, total + self_us)
+    return totals
+
+
+class Command(BaseCommand):
+    """Report where startup time goes, per installed app."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--role',
+            choices=['full', 'api'],
+            help='Profile this APP_ROLE instead of the current one.',
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=15,
+            help='Number of packages to list.',
+        )
+
+    def handle(self, *args, **options):
+        """Entrypoint for command."""
+        env = dict(os.environ)
+        env['DJANGO_SETTINGS_MODULE'] = settings.SETTINGS_MODULE
+        if options['role']:
+            env['APP_ROLE'] = options['role']
+
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', PROFILE_SCRIPT],
+            env=env,
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            raise CommandError(f'Startup failed:\n{result.stderr}')
+
+        phases = json.loads(result.stdout.strip().splitlines()[-1])
+        timings = parse_importtime(result.stderr)
+        totals = group_by_package(
+            timings,
+            list(settings.INSTALLED_APPS) + EXTRA_PACKAGES,
+        )
+
+        self.stdout.write(
+            'Role: {}'.format(options['role'] or settings.APP_ROLE)
+        )
+        self.stdout.write('django.setup()   {:8.1f} ms'.format(
+            phases['setup_ms']))
+        self.stdout.write('URLconf          {:8.1f} ms'.format(
+            phases['urlconf_ms']))
+        self.stdout.write('Total            {:8.1f} ms'.format(
+            phases['total_ms']))
+        self.stdout.write('Peak RSS         {:8.1f} MB'.format(
+            phases['max_rss_kb'] / 1024))
+        self.stdout.write('')
+        self.stdout.write(
+            '{:<40} {:>10} {:>8}'.format('Package', 'Import ms', 'Modules')
+        )
+        ranked = sorted(totals.items(), key=lambda item: -item[1][1])
+        for package, (count, self_us) in ranked[:options['top']]:
+            self.stdout.write(
+                '{:<40} {:>10.1f} {:>8}'.format(package, self_us / 1000, count)
+            )
@@ -1,25 +1,95 @@
+import random
 import time
+from concurrent.futures import ThreadPoolExecutor
 
-from psycopg2 import OperationalError as Psycopg2OpError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils.connection import ConnectionDoesNotExist
 
-from django.db.utils import OperationalError
-from django.core.management.base import BaseCommand
+from core.health import check_database
 
 
 class Command(BaseCommand):
     """Django command to wait for database."""
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database',
+            action='append',
+            dest='databases',
+            help='Database alias to wait for, may be repeated. '
+                 'Defaults to "default".',
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=60,
+            help='Give up after this many seconds.',
+        )
+        parser.add_argument(
+            '--initial-delay',
+            type=float,
+            default=0.1,
+            help='Seconds to wait after the first failed attempt.',
+        )
+        parser.add_argument(
+            '--max-delay',
+            type=float,
+            default=5,
+            help='Upper bound for the delay between attempts.',
+        )
+
+    def _wait_for(self, alias, deadline, initial_delay, max_delay):
+        """Poll one database with exponential backoff and full jitter."""
+        attempt = 0
+        try:
+            while not check_database(alias):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                delay = min(max_delay, initial_delay * 2 ** attempt)
+                delay = min(random.uniform(0, delay), remaining)
+                self.stdout.write(
+                    f'Database "{alias}" unavailable, '
+                    f'waiting {delay:.2f} seconds...'
+                )
+                time.sleep(delay)
+                attempt += 1
+        finally:
+            connections[alias].close()
+        return True
+
     def handle(self, *args, **options):
 
         """Entrypoint for command."""
-        self.stdout.write('Waiting for database...')
-        db_up = False
-        while db_up is False:
+        aliases = options['databases'] or ['default']
+        for alias in aliases:
             try:
-                self.check(databases=['default'])
-                db_up = True
-            except (Psycopg2OpError, OperationalError):
-                self.stdout.write('Database unavailable, waiting 1 second...')
-                time.sleep(1)
+                connections[alias]
+            except ConnectionDoesNotExist:
+                raise CommandError(f'Unknown database "{alias}".')
+        deadline = time.monotonic() + options['timeout']
+        self.stdout.write('Waiting for database...')
+
+        with ThreadPoolExecutor(max_workers=len(aliases)) as executor:
+            results = executor.map(
+                lambda alias: self._wait_for(
+                    alias,
+                    deadline,
+                    options['initial_delay'],
+                    options['max_delay'],
+                ),
+                aliases,
+            )
+            unavailable = [
+                alias for alias, up in zip(aliases, results) if not up
+            ]
+
+        if unavailable:
+            raise CommandError(
+                'Timed out waiting for database: {}'.format(
+                    ', '.join(unavailable)
+                )
+            )
 
         self.stdout.write(self.style.SUCCESS('Database available!'))
@@ -0,0 +1,55 @@
+# Generated by Django 4.2.6 on 2026-10-19 02:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_playlist_image'),
+    ]
+
+    operations = [
+        # Reuse the table Django created for the implicit through model,
+        # only the model state changes here.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='PlaylistSong',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('playlist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.playlist')),
+                        ('song', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.song')),
+                    ],
+                    options={
+                        'db_table': 'core_playlist_songs',
+                        'unique_together': {('playlist', 'song')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='playlist',
+                    name='songs',
+                    field=models.ManyToManyField(through='core.PlaylistSong', to='core.song'),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name='playlistsong',
+            name='position',
+            field=models.BigIntegerField(default=0),
+        ),
+        # Keep the existing songs in the order they were added.
+        migrations.RunSQL(
+            sql='UPDATE core_playlist_songs SET position = id * 65536',
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AlterModelOptions(
+            name='playlistsong',
+            options={'ordering': ['position', 'id']},
+        ),
+        migrations.AddIndex(
+            model_name='playlistsong',
+            index=models.Index(fields=['playlist', 'position'], name='core_playlistsong_position'),
+        ),
+    ]
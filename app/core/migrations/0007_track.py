@@ -0,0 +1,124 @@
+# Generated by Django 4.2.6 on 2026-10-19 03:05
+
+import hashlib
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+import django.db.models.deletion
+
+BATCH_SIZE = 1000
+
+
+# Copies of core.models.normalize_text and track_key as they were when
+# this migration was written, so later changes there can't alter it.
+def normalize_text(value):
+    return ' '.join(value.split()).casefold()
+
+
+def track_key(name, artist):
+    normalized = f'{normalize_text(name)}\x1f{normalize_text(artist)}'
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+def link_songs_to_tracks(apps, schema_editor):
+    """Point every song at a catalog track, a batch of songs at a time."""
+    Song = apps.get_model('core', 'Song')
+    Track = apps.get_model('core', 'Track')
+
+    last_id = 0
+    while True:
+        songs = list(
+            Song.objects.filter(id__gt=last_id)
+            .order_by('id')
+            .only('id', 'name', 'artist')[:BATCH_SIZE]
+        )
+        if not songs:
+            break
+        last_id = songs[-1].id
+
+        keys = {}
+        for song in songs:
+            song.key = track_key(song.name, song.artist)
+            keys.setdefault(song.key, song)
+        Track.objects.bulk_create(
+            [
+                Track(name=song.name, artist=song.artist, key=key)
+                for key, song in keys.items()
+            ],
+            ignore_conflicts=True,
+        )
+        track_ids = dict(
+            Track.objects.filter(key__in=keys).values_list('key', 'id')
+        )
+        for song in songs:
+            song.track_id = track_ids[song.key]
+        Song.objects.bulk_update(songs, ['track'])
+
+
+def collapse_duplicate_songs(apps, schema_editor):
+    """Merge songs of a user that now point at the same track.
+
+    Playlist links of the duplicates are re-pointed at the song that is
+    kept, unless the playlist already contains it.
+    """
+    Song = apps.get_model('core', 'Song')
+    PlaylistSong = apps.get_model('core', 'PlaylistSong')
+
+    while True:
+        groups = list(
+            Song.objects.values('user_id', 'track_id')
+            .annotate(keep_id=Min('id'), songs=Count('id'))
+            .filter(songs__gt=1)
+            .order_by('keep_id')[:BATCH_SIZE]
+        )
+        if not groups:
+            break
+        for group in groups:
+            duplicate_ids = list(
+                Song.objects.filter(
+                    user_id=group['user_id'],
+                    track_id=group['track_id'],
+                ).exclude(id=group['keep_id']).values_list('id', flat=True)
+            )
+            for duplicate_id in duplicate_ids:
+                PlaylistSong.objects.filter(song_id=duplicate_id).exclude(
+                    playlist_id__in=PlaylistSong.objects.filter(
+                        song_id=group['keep_id'],
+                    ).values('playlist_id'),
+                ).update(song_id=group['keep_id'])
+            PlaylistSong.objects.filter(song_id__in=duplicate_ids).delete()
+            Song.objects.filter(id__in=duplicate_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_playlistsong'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Track',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('artist', models.CharField(blank=True, max_length=255)),
+                ('key', models.CharField(max_length=64, unique=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='song',
+            name='track',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, to='core.track'),
+        ),
+        migrations.RunPython(
+            link_songs_to_tracks,
+            migrations.RunPython.noop,
+            elidable=True,
+        ),
+        migrations.RunPython(
+            collapse_duplicate_songs,
+            migrations.RunPython.noop,
+            elidable=True,
+        ),
+    ]
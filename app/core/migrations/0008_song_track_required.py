@@ -0,0 +1,36 @@
+# Generated by Django 4.2.6 on 2026-10-19 03:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    """Drop the per-user copies of song names once songs use the catalog.
+
+    Kept apart from 0007 so the schema changes don't run in the same
+    transaction as its data migration.
+    """
+
+    dependencies = [
+        ('core', '0007_track'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='song',
+            name='track',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='core.track'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='song',
+            unique_together={('user', 'track')},
+        ),
+        migrations.RemoveField(
+            model_name='song',
+            name='artist',
+        ),
+        migrations.RemoveField(
+            model_name='song',
+            name='name',
+        ),
+    ]
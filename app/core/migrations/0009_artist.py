@@ -0,0 +1,74 @@
+# Generated by Django 4.2.6 on 2026-10-19 05:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+BATCH_SIZE = 1000
+
+
+# Copy of core.models.normalize_text as it was when this migration was
+# written, so later changes there can't alter it.
+def normalize_text(value):
+    return ' '.join(value.split()).casefold()
+
+
+def link_tracks_to_artists(apps, schema_editor):
+    """Point every track at a catalog artist, a batch of tracks at a time."""
+    Track = apps.get_model('core', 'Track')
+    Artist = apps.get_model('core', 'Artist')
+
+    last_id = 0
+    while True:
+        tracks = list(
+            Track.objects.filter(id__gt=last_id)
+            .order_by('id')
+            .only('id', 'artist')[:BATCH_SIZE]
+        )
+        if not tracks:
+            break
+        last_id = tracks[-1].id
+
+        names = {}
+        for track in tracks:
+            track.artist_key = normalize_text(track.artist)
+            if track.artist_key:
+                names.setdefault(track.artist_key, track.artist.strip())
+        Artist.objects.bulk_create(
+            [Artist(name=name, key=key) for key, name in names.items()],
+            ignore_conflicts=True,
+        )
+        artist_ids = dict(
+            Artist.objects.filter(key__in=names).values_list('key', 'id')
+        )
+        linked = [track for track in tracks if track.artist_key]
+        for track in linked:
+            track.artist_ref_id = artist_ids[track.artist_key]
+        Track.objects.bulk_update(linked, ['artist_ref'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_song_track_required'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Artist',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('key', models.CharField(max_length=255, unique=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='track',
+            name='artist_ref',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='tracks', to='core.artist'),
+        ),
+        migrations.RunPython(
+            link_tracks_to_artists,
+            migrations.RunPython.noop,
+            elidable=True,
+        ),
+    ]
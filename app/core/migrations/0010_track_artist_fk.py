@@ -0,0 +1,22 @@
+# Generated by Django 4.2.6 on 2026-10-19 05:12
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_artist'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='track',
+            name='artist',
+        ),
+        migrations.RenameField(
+            model_name='track',
+            old_name='artist_ref',
+            new_name='artist',
+        ),
+    ]
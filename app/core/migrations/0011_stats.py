@@ -0,0 +1,101 @@
+# Generated by Django 4.2.6 on 2026-10-19 02:36
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def build_stats(apps, schema_editor):
+    """Count the existing playlists and tag links."""
+    Playlist = apps.get_model('core', 'Playlist')
+    Tag = apps.get_model('core', 'Tag')
+    LibraryStats = apps.get_model('core', 'LibraryStats')
+    GenreStats = apps.get_model('core', 'GenreStats')
+
+    playlists = Playlist.objects.order_by()
+    totals = {
+        'playlist_count': Count('id'),
+        'total_minutes': Coalesce(Sum('time_minutes'), 0),
+    }
+    LibraryStats.objects.bulk_create(
+        [
+            LibraryStats(**row)
+            for row in playlists.values('user_id').annotate(**totals)
+        ],
+        batch_size=1000,
+    )
+    GenreStats.objects.bulk_create(
+        [
+            GenreStats(
+                user_id=row['user_id'],
+                genre=row['general_genre'],
+                playlist_count=row['playlist_count'],
+                total_minutes=row['total_minutes'],
+            )
+            for row in playlists.values(
+                'user_id',
+                'general_genre',
+            ).annotate(**totals)
+        ],
+        batch_size=1000,
+    )
+    tag_links = Playlist.tags.through.objects.filter(
+        tag_id=OuterRef('pk'),
+    ).order_by().values('tag_id').annotate(count=Count('playlist_id'))
+    Tag.objects.update(playlist_count=Coalesce(
+        Subquery(tag_links.values('count')),
+        0,
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_track_artist_fk'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GenreStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('genre', models.CharField(blank=True, max_length=255)),
+                ('playlist_count', models.IntegerField(default=0)),
+                ('total_minutes', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LibraryStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('playlist_count', models.IntegerField(default=0)),
+                ('total_minutes', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='playlist_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['user', '-playlist_count'], name='core_tag_usage'),
+        ),
+        migrations.AddField(
+            model_name='librarystats',
+            name='user',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='library_stats', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='genrestats',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='genre_stats', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterUniqueTogether(
+            name='genrestats',
+            unique_together={('user', 'genre')},
+        ),
+        migrations.RunPython(build_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.6 on 2026-10-19 02:42
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_song_links(apps, schema_editor):
+    """Count the playlists each song is on."""
+    Song = apps.get_model('core', 'Song')
+    PlaylistSong = apps.get_model('core', 'PlaylistSong')
+
+    links = PlaylistSong.objects.filter(
+        song_id=OuterRef('pk'),
+    ).order_by().values('song_id').annotate(count=Count('playlist_id'))
+    Song.objects.update(playlist_count=Coalesce(
+        Subquery(links.values('count')),
+        0,
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='song',
+            name='playlist_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(count_song_links, migrations.RunPython.noop),
+    ]
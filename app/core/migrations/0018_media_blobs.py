@@ -0,0 +1,35 @@
+# Generated by Django 4.2.6 on 2026-10-19 03:15
+
+import core.models
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_admin_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='playlist',
+            name='image',
+            field=core.models.ContentAddressedImageField(null=True, upload_to=core.models.playlist_image_file_path),
+        ),
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(max_length=64, unique=True)),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('size', models.BigIntegerField()),
+                ('ref_count', models.IntegerField(default=0)),
+                ('ref_changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('ref_count__lte', 0)), fields=['ref_changed_at'], name='core_mediablob_orphans')],
+            },
+        ),
+    ]
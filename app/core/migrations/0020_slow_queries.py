@@ -0,0 +1,35 @@
+# Generated by Django 4.2.6 on 2026-10-19 03:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_profile_records'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(max_length=64, unique=True)),
+                ('fingerprint', models.TextField()),
+                ('tables', models.CharField(blank=True, max_length=255)),
+                ('count', models.BigIntegerField(default=0)),
+                ('total_ms', models.FloatField(default=0)),
+                ('max_ms', models.FloatField(default=0)),
+                ('sample_sql', models.TextField()),
+                ('sample_params', models.TextField(blank=True)),
+                ('sites', models.JSONField(default=dict)),
+                ('explain', models.TextField(blank=True)),
+                ('full_scan', models.BooleanField(default=False)),
+                ('first_seen_at', models.DateTimeField(auto_now_add=True)),
+                ('last_seen_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'slow queries',
+            },
+        ),
+    ]
@@ -0,0 +1,96 @@
+# Generated by Django 4.2.6 on 2026-10-19 03:30
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def user_field(null):
+    return models.ForeignKey(
+        db_index=False,
+        null=null,
+        on_delete=django.db.models.deletion.CASCADE,
+        related_name='+',
+        to=settings.AUTH_USER_MODEL,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0020_slow_queries'),
+    ]
+
+    operations = [
+        # Reuse the table Django created for the implicit through model,
+        # only the model state changes here.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='PlaylistTag',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('playlist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.playlist')),
+                        ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.tag')),
+                    ],
+                    options={
+                        'db_table': 'core_playlist_tags',
+                        'unique_together': {('playlist', 'tag')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='playlist',
+                    name='tags',
+                    field=models.ManyToManyField(through='core.PlaylistTag', to='core.tag'),
+                ),
+            ],
+        ),
+        # Links are stored with the user owning their playlist, the key
+        # 0022 partitions the tables by on Postgres.
+        migrations.AddField(
+            model_name='playlistsong',
+            name='user',
+            field=user_field(null=True),
+        ),
+        migrations.AddField(
+            model_name='playlisttag',
+            name='user',
+            field=user_field(null=True),
+        ),
+        migrations.RunSQL(
+            sql=[
+                f'UPDATE {table} SET user_id = ('
+                f'SELECT core_playlist.user_id FROM core_playlist '
+                f'WHERE core_playlist.id = {table}.playlist_id)'
+                for table in ['core_playlist_songs', 'core_playlist_tags']
+            ],
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AlterField(
+            model_name='playlistsong',
+            name='user',
+            field=user_field(null=False),
+        ),
+        migrations.AlterField(
+            model_name='playlisttag',
+            name='user',
+            field=user_field(null=False),
+        ),
+        migrations.AlterUniqueTogether(
+            name='playlistsong',
+            unique_together=set(),
+        ),
+        migrations.AlterUniqueTogether(
+            name='playlisttag',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='playlistsong',
+            constraint=models.UniqueConstraint(fields=('user', 'playlist', 'song'), name='core_playlistsong_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='playlisttag',
+            constraint=models.UniqueConstraint(fields=('user', 'playlist', 'tag'), name='core_playlisttag_unique'),
+        ),
+    ]
@@ -0,0 +1,115 @@
+# Generated by Django 4.2.6 on 2026-10-19 03:31
+
+from django.db import migrations
+
+# Hash partitions of each link table, by user.
+PARTITIONS = 16
+
+# Indexes and constraints of the link tables as of 0021, rebuilt on the
+# new tables. Written out rather than generated, so the SQL stays the
+# same whatever Django version runs the migration.
+LINK_TABLES = {
+    'core_playlist_songs': [
+        'ALTER TABLE "core_playlist_songs" '
+        'ADD CONSTRAINT "core_playlistsong_unique" '
+        'UNIQUE ("user_id", "playlist_id", "song_id")',
+        'CREATE INDEX "core_playlistsong_position" '
+        'ON "core_playlist_songs" ("playlist_id", "position")',
+        'CREATE INDEX "core_playlist_songs_playlist_id_51154659" '
+        'ON "core_playlist_songs" ("playlist_id")',
+        'CREATE INDEX "core_playlist_songs_song_id_e41602e2" '
+        'ON "core_playlist_songs" ("song_id")',
+        'ALTER TABLE "core_playlist_songs" '
+        'ADD CONSTRAINT "core_playlist_songs_playlist_id_51154659_fk_core_playlist_id" '
+        'FOREIGN KEY ("playlist_id") REFERENCES "core_playlist" ("id") '
+        'DEFERRABLE INITIALLY DEFERRED',
+        'ALTER TABLE "core_playlist_songs" '
+        'ADD CONSTRAINT "core_playlist_songs_user_id_496ca528_fk_core_user_id" '
+        'FOREIGN KEY ("user_id") REFERENCES "core_user" ("id") '
+        'DEFERRABLE INITIALLY DEFERRED',
+        'ALTER TABLE "core_playlist_songs" '
+        'ADD CONSTRAINT "core_playlist_songs_song_id_e41602e2_fk_core_song_id" '
+        'FOREIGN KEY ("song_id") REFERENCES "core_song" ("id") '
+        'DEFERRABLE INITIALLY DEFERRED',
+    ],
+    'core_playlist_tags': [
+        'ALTER TABLE "core_playlist_tags" '
+        'ADD CONSTRAINT "core_playlisttag_unique" '
+        'UNIQUE ("user_id", "playlist_id", "tag_id")',
+        'CREATE INDEX "core_playlist_tags_playlist_id_9c32fe19" '
+        'ON "core_playlist_tags" ("playlist_id")',
+        'CREATE INDEX "core_playlist_tags_tag_id_7fc934e2" '
+        'ON "core_playlist_tags" ("tag_id")',
+        'ALTER TABLE "core_playlist_tags" '
+        'ADD CONSTRAINT "core_playlist_tags_playlist_id_9c32fe19_fk_core_playlist_id" '
+        'FOREIGN KEY ("playlist_id") REFERENCES "core_playlist" ("id") '
+        'DEFERRABLE INITIALLY DEFERRED',
+        'ALTER TABLE "core_playlist_tags" '
+        'ADD CONSTRAINT "core_playlist_tags_user_id_b7478299_fk_core_user_id" '
+        'FOREIGN KEY ("user_id") REFERENCES "core_user" ("id") '
+        'DEFERRABLE INITIALLY DEFERRED',
+        'ALTER TABLE "core_playlist_tags" '
+        'ADD CONSTRAINT "core_playlist_tags_tag_id_7fc934e2_fk_core_tag_id" '
+        'FOREIGN KEY ("tag_id") REFERENCES "core_tag" ("id") '
+        'DEFERRABLE INITIALLY DEFERRED',
+    ],
+}
+
+
+def rebuild_sql(table, partitions):
+    """Return the SQL copying table into a new one, partitioned or not.
+
+    Rows are copied with INSERT ... SELECT while the old table is locked,
+    so run this when the link tables can be blocked for a while.
+    """
+    old = f'{table}_old'
+    sequence = f'{table}_id_seq'
+    partition_by = ' PARTITION BY HASH ("user_id")' if partitions else ''
+    # Unique keys of a partitioned table must include the partition key.
+    primary_key = '"user_id", "id"' if partitions else '"id"'
+    return [
+        f'ALTER TABLE "{table}" RENAME TO "{old}"',
+        f'CREATE TABLE "{table}" (LIKE "{old}"){partition_by}',
+        *(
+            f'CREATE TABLE "{table}_p{remainder}" '
+            f'PARTITION OF "{table}" FOR VALUES WITH '
+            f'(MODULUS {partitions}, REMAINDER {remainder})'
+            for remainder in range(partitions)
+        ),
+        f'INSERT INTO "{table}" SELECT * FROM "{old}"',
+        # Also drops the sequence of the old ids.
+        f'DROP TABLE "{old}"',
+        # Partitioned tables can't have identity columns before Postgres
+        # 17, ids come from a sequence owned by the column instead.
+        f'CREATE SEQUENCE "{sequence}" OWNED BY "{table}"."id"',
+        f"SELECT setval('\"{sequence}\"', COALESCE(MAX(\"id\"), 0) + 1, false) "
+        f'FROM "{table}"',
+        f'ALTER TABLE "{table}" ALTER COLUMN "id" '
+        f"SET DEFAULT nextval('\"{sequence}\"')",
+        f'ALTER TABLE "{table}" ADD PRIMARY KEY ({primary_key})',
+        *LINK_TABLES[table],
+    ]
+
+
+def partition(apps, schema_editor, partitions=PARTITIONS):
+    """Hash partition the playlist link tables by user, on Postgres."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table in LINK_TABLES:
+        for sql in rebuild_sql(table, partitions):
+            schema_editor.execute(sql, params=None)
+
+
+def unpartition(apps, schema_editor):
+    partition(apps, schema_editor, partitions=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_playlist_links_user'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition, unpartition),
+    ]
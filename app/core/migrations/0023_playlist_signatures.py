@@ -0,0 +1,44 @@
+# Generated by Django 4.2.6 on 2026-10-19 03:36
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def queue_rebuild(apps, schema_editor):
+    """Queue signing the existing playlists, see core.similarity."""
+    Playlist = apps.get_model('core', 'Playlist')
+    Job = apps.get_model('core', 'Job')
+    if Playlist.objects.exists():
+        Job.objects.create(name='core.rebuild_signatures')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_partition_playlist_links'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlaylistSignature',
+            fields=[
+                ('playlist', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='signature', serialize=False, to='core.playlist')),
+                ('minhash', models.BinaryField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PlaylistBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.BigIntegerField()),
+                ('playlist', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.playlist')),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'key'], name='core_playlistbucket_lookup')],
+            },
+        ),
+        migrations.RunPython(queue_rebuild, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,86 @@
+# Generated by Django 4.2.6 on 2026-10-19 03:52
+
+import hashlib
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+# Copies of the core.models helpers as they were when this migration was
+# written, so later changes there can't alter it.
+VERSION_WORDS = frozenset([
+    'album', 'bonus', 'clean', 'deluxe', 'digital', 'edit', 'edition',
+    'explicit', 'mono', 'radio', 'remaster', 'remastered', 'single',
+    'stereo', 'version',
+])
+_SUFFIX_RE = re.compile(r'\s*(?:[(\[]([^()\[\]]*)[)\]]|\s-\s([^-]*))$')
+
+
+def normalize_text(value):
+    return ' '.join(value.split()).casefold()
+
+
+def match_name(name):
+    name = ''.join(
+        char for char in unicodedata.normalize('NFKD', name)
+        if not unicodedata.combining(char)
+    )
+    while True:
+        suffix = _SUFFIX_RE.search(name)
+        if suffix is None:
+            break
+        words = re.findall(r'\w+', (suffix[1] or suffix[2]).casefold())
+        if not VERSION_WORDS.intersection(words):
+            break
+        name = name[:suffix.start()]
+    name = re.sub(r"['\u2019]", '', name.replace('&', ' and '))
+    return normalize_text(re.sub(r'[^\w\s]|_', ' ', name))
+
+
+def match_key(name, artist):
+    normalized = f'{match_name(name)}\x1f{normalize_text(artist)}'
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+def fill_match_keys(apps, schema_editor):
+    """Compute the match key of every track, a batch at a time."""
+    Track = apps.get_model('core', 'Track')
+
+    last_id = 0
+    while True:
+        tracks = list(
+            Track.objects.filter(id__gt=last_id)
+            .select_related('artist')
+            .order_by('id')
+            .only('id', 'name', 'artist__name')[:BATCH_SIZE]
+        )
+        if not tracks:
+            break
+        last_id = tracks[-1].id
+
+        for track in tracks:
+            track.match_key = match_key(
+                track.name,
+                track.artist.name if track.artist else '',
+            )
+        Track.objects.bulk_update(tracks, ['match_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_playlist_signatures'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='track',
+            name='match_key',
+            field=models.CharField(db_index=True, default='', max_length=64),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_match_keys, migrations.RunPython.noop),
+    ]
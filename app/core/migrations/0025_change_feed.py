@@ -0,0 +1,74 @@
+# Generated by Django 4.2.6 on 2026-10-19 04:22
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+BATCH_SIZE = 1000
+
+
+def start_feeds(apps, schema_editor):
+    """Number the entries by id and start every feed after the last id.
+
+    Cursors handed out so far are ids of the shared log, so each user's
+    sequence carries on from the highest of them and expires where the
+    log was pruned to.
+    """
+    ChangeLog = apps.get_model('core', 'ChangeLog')
+    ChangeFeed = apps.get_model('core', 'ChangeFeed')
+    User = apps.get_model('core', 'User')
+    ids = ChangeLog.objects.aggregate(
+        first=models.Min('id'),
+        last=models.Max('id'),
+    )
+    if ids['last'] is None:
+        return
+    ChangeLog.objects.update(seq=models.F('id'))
+    user_ids = User.objects.order_by('id').values_list('id', flat=True)
+    after = 0
+    while True:
+        batch = list(user_ids.filter(id__gt=after)[:BATCH_SIZE])
+        if not batch:
+            break
+        ChangeFeed.objects.bulk_create([
+            ChangeFeed(
+                user_id=user_id,
+                last_seq=ids['last'],
+                pruned_seq=ids['first'] - 1,
+            )
+            for user_id in batch
+        ])
+        after = batch[-1]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_track_match_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeFeed',
+            fields=[
+                ('user', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='+', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('last_seq', models.BigIntegerField(default=0)),
+                ('pruned_seq', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name='changelog',
+            name='core_changelog_cursor',
+        ),
+        migrations.AddField(
+            model_name='changelog',
+            name='seq',
+            field=models.BigIntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.RunPython(start_feeds, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='changelog',
+            constraint=models.UniqueConstraint(fields=('user', 'seq'), name='core_changelog_cursor'),
+        ),
+    ]
@@ -1,8 +1,14 @@
+import hashlib
+import re
+import secrets
+import unicodedata
 import uuid
 import os
 
 from django.conf import settings
-from django.db import models
+from django.db import connection, models, transaction
+from django.dispatch import Signal
+from django.utils import timezone
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
@@ -18,6 +24,133 @@ def playlist_image_file_path(instance, filename):
     return os.path.join('uploads', 'playlist', filename)
 
 
+def blob_file_path(digest, filename):
+    """Generate the storage path of a file with content hash digest."""
+    ext = os.path.splitext(filename)[1].lower()
+
+    return os.path.join('blobs', digest[:2], f'{digest}{ext}')
+
+
+def normalize_text(value):
+    """Casefold and collapse whitespace so spelling variants compare equal."""
+    return ' '.join(value.split()).casefold()
+
+
+def track_key(name, artist):
+    """Return the catalog key of a song name and artist."""
+    normalized = f'{normalize_text(name)}\x1f{normalize_text(artist)}'
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+# Words of a title suffix marking another release of the same recording,
+# like "(Remastered)" or "- 2011 Mono Version".
+VERSION_WORDS = frozenset([
+    'album', 'bonus', 'clean', 'deluxe', 'digital', 'edit', 'edition',
+    'explicit', 'mono', 'radio', 'remaster', 'remastered', 'single',
+    'stereo', 'version',
+])
+_SUFFIX_RE = re.compile(r'\s*(?:[(\[]([^()\[\]]*)[)\]]|\s-\s([^-]*))$')
+
+
+def match_name(name):
+    """Reduce a song name to what tells songs apart.
+
+    Accents, punctuation and release suffixes are dropped, so "Don't
+    Stop (Remastered)" and "Dont Stop" match.
+    """
+    name = ''.join(
+        char for char in unicodedata.normalize('NFKD', name)
+        if not unicodedata.combining(char)
+    )
+    while True:
+        suffix = _SUFFIX_RE.search(name)
+        if suffix is None:
+            break
+        words = re.findall(r'\w+', (suffix[1] or suffix[2]).casefold())
+        if not VERSION_WORDS.intersection(words):
+            break
+        name = name[:suffix.start()]
+    name = re.sub(r"['\u2019]", '', name.replace('&', ' and '))
+    return normalize_text(re.sub(r'[^\w\s]|_', ' ', name))
+
+
+def match_key(name, artist):
+    """Return the key songs that are likely the same one share."""
+    normalized = f'{match_name(name)}\x1f{normalize_text(artist)}'
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+# Sent after an object was soft deleted, with `instance`.
+soft_deleted = Signal()
+
+
+class AliveManager(models.Manager):
+    """Manager hiding soft deleted rows."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
+class SoftDeleteModel(models.Model):
+    """Model whose rows are hidden when deleted and purged later.
+
+    ``objects`` hides deleted rows, ``all_objects`` returns every row.
+    The purge_deleted command removes deleted rows in batches.
+    """
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        # Only soft_delete() sets deleted_at. The stored row stays locked
+        # until the save commits, and a save of an instance loaded before
+        # the row was deleted is skipped rather than bringing it back.
+        with transaction.atomic():
+            if not self._state.adding:
+                stored = type(self)._base_manager.select_for_update().filter(
+                    pk=self.pk,
+                ).values_list('deleted_at', flat=True)
+                if stored and stored[0] is not None:
+                    return
+                if kwargs.get('update_fields') is None:
+                    deferred = self.get_deferred_fields()
+                    kwargs['update_fields'] = [
+                        field.attname for field in self._meta.concrete_fields
+                        if not field.primary_key
+                        and field.attname not in deferred
+                        and field.name != 'deleted_at'
+                    ]
+            super().save(*args, **kwargs)
+
+    def soft_delete(self):
+        """Hide the object from now on, without touching related rows."""
+        if self.deleted_at is not None:
+            return
+        self.deleted_at = timezone.now()
+        type(self)._base_manager.filter(pk=self.pk).update(
+            deleted_at=self.deleted_at,
+        )
+        soft_deleted.send(sender=type(self), instance=self)
+
+
+class ContentAddressedImageField(models.ImageField):
+    """Image field storing each distinct image once, as a MediaBlob.
+
+    New files are named by their content hash, uploading an image that
+    is stored already just points at the existing file. References are
+    counted by core.signals.
+    """
+
+    def pre_save(self, model_instance, add):
+        file = getattr(model_instance, self.attname)
+        if file and not file._committed:
+            blob = MediaBlob.objects.store(file.file, file.name, self.storage)
+            file.name = blob.name
+            file._committed = True
+        return super().pre_save(model_instance, add)
+
+
 class UserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
         if not email:
@@ -42,13 +175,96 @@ class User(AbstractBaseUser, PermissionsMixin):
     name = models.CharField(max_length=255)
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=True)
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
 
     objects = UserManager()
 
     USERNAME_FIELD = "email"
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['deleted_at'],
+                condition=models.Q(deleted_at__isnull=False),
+                name='core_user_deleted',
+            ),
+        ]
+
+    def soft_delete(self):
+        """Deactivate the user now, purge_deleted removes its data."""
+        self.is_active = False
+        self.deleted_at = timezone.now()
+        self.save(update_fields=['is_active', 'deleted_at'])
+
+
+class PlaylistQuerySet(models.QuerySet):
+    def _linked_to(self, through, field, ids, match_all, user):
+        # Filters on a subquery of the link table rather than joining it,
+        # so playlists are never repeated and no DISTINCT is needed.
+        ids = set(ids)
+        links = through.objects.filter(**{f'{field}__in': ids})
+        if user is not None:
+            links = links.filter(user=user)
+        if match_all:
+            return self.filter(pk__in=links.order_by().values(
+                'playlist_id',
+            ).annotate(
+                matched=models.Count(field),
+            ).filter(matched=len(ids)).values('playlist_id'))
+        return self.filter(pk__in=links.values('playlist_id'))
+
+    def with_tags(self, tag_ids, match_all=False, user=None):
+        """Playlists with any, or with all, of the tags.
 
-class Playlist(models.Model):
+        Pass the user owning the playlists to read only their links.
+        """
+        return self._linked_to(
+            self.model.tags.through,
+            'tag_id',
+            tag_ids,
+            match_all,
+            user,
+        )
+
+    def with_songs(self, song_ids, match_all=False, user=None):
+        """Playlists with any, or with all, of the songs."""
+        return self._linked_to(
+            self.model.songs.through,
+            'song_id',
+            song_ids,
+            match_all,
+            user,
+        )
+
+    def prefetch_links(self, user_id):
+        """Prefetch the tag and song links of playlists of user_id.
+
+        The link rows are prefetched rather than the tags and songs, so
+        the user filter applies to the link table itself and Postgres
+        only reads that user's partition of it.
+        """
+        return self.prefetch_related(
+            models.Prefetch(
+                'playlisttag_set',
+                queryset=PlaylistTag.objects.filter(
+                    user_id=user_id,
+                    tag__deleted_at__isnull=True,
+                ).select_related('tag').order_by('id'),
+            ),
+            models.Prefetch(
+                'playlistsong_set',
+                queryset=PlaylistSong.objects.filter(
+                    user_id=user_id,
+                    song__deleted_at__isnull=True,
+                ).select_related('song__track__artist').order_by(
+                    'position',
+                    'id',
+                ),
+            ),
+        )
+
+
+class Playlist(SoftDeleteModel):
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -58,34 +274,925 @@ class Playlist(models.Model):
     time_minutes = models.IntegerField()
     general_genre = models.CharField(max_length=255, blank=True)
     link = models.CharField(max_length=255, blank=True)
-    tags = models.ManyToManyField("Tag")
-    songs = models.ManyToManyField("Song")
-    image = models.ImageField(null=True, upload_to=playlist_image_file_path)
+    tags = models.ManyToManyField("Tag", through="PlaylistTag")
+    songs = models.ManyToManyField("Song", through="PlaylistSong")
+    image = ContentAddressedImageField(
+        null=True,
+        upload_to=playlist_image_file_path,
+    )
+
+    objects = AliveManager.from_queryset(PlaylistQuerySet)()
+    all_objects = PlaylistQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['deleted_at'],
+                condition=models.Q(deleted_at__isnull=False),
+                name='core_playlist_deleted',
+            ),
+            # Prefix searches in the admin. The operator class only
+            # applies to Postgres, where LIKE needs it to use an index.
+            models.Index(
+                fields=['title'],
+                opclasses=['varchar_pattern_ops'],
+                name='core_playlist_title_prefix',
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
+    def _prefetched(self, name):
+        return name in getattr(self, '_prefetched_objects_cache', {})
+
+    @property
+    def linked_tags(self):
+        """Tags of the playlist, from its links of the playlist's user."""
+        if self._prefetched('playlisttag_set'):
+            return [link.tag for link in self.playlisttag_set.all()]
+        # One filter() call, so both conditions apply to the same join.
+        return Tag.objects.filter(
+            playlisttag__user_id=self.user_id,
+            playlisttag__playlist=self,
+        ).order_by('playlisttag__id')
+
+    @property
+    def ordered_songs(self):
+        """Songs of the playlist, in playlist order."""
+        if self._prefetched('playlistsong_set'):
+            return [link.song for link in self.playlistsong_set.all()]
+        return Song.objects.filter(
+            playlistsong__user_id=self.user_id,
+            playlistsong__playlist=self,
+        ).select_related('track__artist').order_by(
+            'playlistsong__position',
+            'playlistsong__id',
+        )
+
+    @property
+    def song_links(self):
+        """The PlaylistSong rows of the playlist."""
+        return PlaylistSong.objects.filter(user_id=self.user_id, playlist=self)
+
+    def copy_links_from(self, source_ids):
+        """Add the tags and songs of playlists `source_ids` to this one.
+
+        Each relation is copied with a single INSERT ... SELECT, so the
+        cost does not depend on the size of the playlists. Links this
+        playlist already has are skipped and copied songs keep their
+        order, after the songs already in this playlist.
+        """
+        source_ids = list(source_ids)
+        if not source_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(source_ids))
+        # Offsets each source past the previous one, so merged playlists
+        # are appended one after the other.
+        source_offset = 'CASE src.playlist_id {} END'.format(' '.join(
+            f'WHEN %s THEN {index << 40}' for index in range(len(source_ids))
+        ))
+        source_user_ids = list(
+            Playlist.all_objects.filter(pk__in=source_ids)
+            .values_list('user_id', flat=True).distinct()
+        )
+        if not source_user_ids:
+            return
+        users = ', '.join(['%s'] * len(source_user_ids))
+        qn = connection.ops.quote_name
+        tags_table = qn(self.tags.through._meta.db_table)
+        songs_table = qn(PlaylistSong._meta.db_table)
+        new_tag_ids = set(
+            Tag.objects.filter(playlist__in=source_ids)
+            .exclude(playlist=self)
+            .values_list('pk', flat=True)
+        )
+        new_song_ids = set(
+            Song.objects.filter(playlist__in=source_ids)
+            .exclude(playlist=self)
+            .values_list('pk', flat=True)
+        )
+        with connection.cursor() as cursor:
+            # Every link table lookup has the user, see prefetch_links().
+            cursor.execute(
+                f'INSERT INTO {tags_table} (playlist_id, tag_id, user_id) '
+                f'SELECT DISTINCT %s, src.tag_id, %s FROM {tags_table} src '
+                f'WHERE src.user_id IN ({users}) '
+                f'AND src.playlist_id IN ({placeholders}) '
+                f'AND NOT EXISTS ('
+                f'SELECT 1 FROM {tags_table} dst '
+                f'WHERE dst.user_id = %s AND dst.playlist_id = %s '
+                f'AND dst.tag_id = src.tag_id)',
+                [
+                    self.pk, self.user_id, *source_user_ids, *source_ids,
+                    self.user_id, self.pk,
+                ],
+            )
+            cursor.execute(
+                f'INSERT INTO {songs_table} '
+                f'(playlist_id, song_id, user_id, position) '
+                f'SELECT %s, src.song_id, %s, '
+                f'MIN({source_offset} + src.position) + COALESCE(('
+                f'SELECT MAX(last.position) FROM {songs_table} last '
+                f'WHERE last.user_id = %s AND last.playlist_id = %s), 0) '
+                f'FROM {songs_table} src '
+                f'WHERE src.user_id IN ({users}) '
+                f'AND src.playlist_id IN ({placeholders}) '
+                f'AND NOT EXISTS ('
+                f'SELECT 1 FROM {songs_table} dst '
+                f'WHERE dst.user_id = %s AND dst.playlist_id = %s '
+                f'AND dst.song_id = src.song_id) '
+                f'GROUP BY src.song_id',
+                [
+                    self.pk, self.user_id, *source_ids, self.user_id,
+                    self.pk, *source_user_ids, *source_ids, self.user_id,
+                    self.pk,
+                ],
+            )
+        # The raw INSERTs bypass the related managers, tell the receivers
+        # counting links about the new ones.
+        for through, model, pk_set in [
+            (self.tags.through, Tag, new_tag_ids),
+            (PlaylistSong, Song, new_song_ids),
+        ]:
+            if pk_set:
+                models.signals.m2m_changed.send(
+                    sender=through,
+                    instance=self,
+                    action='post_add',
+                    reverse=False,
+                    model=model,
+                    pk_set=pk_set,
+                    using=self._state.db,
+                )
+
+    def next_song_position(self):
+        """Return the position after the last song of the playlist."""
+        last = self.song_links.aggregate(
+            last=models.Max('position'),
+        )['last']
+        return (last or 0) + PlaylistSong.POSITION_GAP
+
+    def move_song(self, song_id, before=None, after=None):
+        """Move a song next to another one, or to the end of the playlist.
+
+        Positions are spaced out by ``PlaylistSong.POSITION_GAP`` so a move
+        is a single-row update to a position between the new neighbours.
+        Only when two neighbours have run out of room in between is the
+        playlist renumbered.
+        """
+        links = self.song_links.exclude(song_id=song_id)
+        if before is None and after is None:
+            position = self.next_song_position()
+        else:
+            anchor = links.get(song_id=before if after is None else after)
+            if after is None:
+                neighbour = links.filter(
+                    models.Q(position__lt=anchor.position)
+                    | models.Q(position=anchor.position, id__lt=anchor.id)
+                ).order_by('-position', '-id').first()
+                low = neighbour.position if neighbour else 0
+                high = anchor.position
+            else:
+                neighbour = links.filter(
+                    models.Q(position__gt=anchor.position)
+                    | models.Q(position=anchor.position, id__gt=anchor.id)
+                ).order_by('position', 'id').first()
+                low = anchor.position
+                high = (
+                    neighbour.position if neighbour
+                    else low + 2 * PlaylistSong.POSITION_GAP
+                )
+            if high - low < 2:
+                self.renumber_songs()
+                return self.move_song(song_id, before=before, after=after)
+            position = (low + high) // 2
+
+        updated = self.song_links.filter(song_id=song_id).update(
+            position=position,
+        )
+        if not updated:
+            raise PlaylistSong.DoesNotExist
+        ChangeLog.objects.record(self.user_id, 'playlist', [self.pk])
+
+    def renumber_songs(self):
+        """Spread the song positions evenly again."""
+        links = list(self.song_links.order_by('position', 'id'))
+        for index, link in enumerate(links, start=1):
+            link.position = index * PlaylistSong.POSITION_GAP
+        PlaylistSong.objects.bulk_update(links, ['position'])
+
+    def duplicate(self, **overrides):
+        """Create and return a copy of this playlist and its links."""
+        fields = {
+            field.attname: getattr(self, field.attname)
+            for field in self._meta.concrete_fields
+            if not field.primary_key
+        }
+        fields.update(overrides)
+        with transaction.atomic():
+            copy = Playlist.objects.create(**fields)
+            copy.copy_links_from([self.pk])
+
+        return copy
 
-class Tag(models.Model):
+    def merge(self, source_ids, delete_sources=False):
+        """Merge the tags and songs of playlists `source_ids` into this one."""
+        with transaction.atomic():
+            self.copy_links_from(source_ids)
+            if delete_sources:
+                for source in Playlist.objects.filter(pk__in=source_ids):
+                    source.soft_delete()
+
+
+class PlaylistLinkQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        """Create links, taking the users missing from their playlists.
+
+        Related managers add links with bulk_create, this way
+        ``playlist.tags.add(tag)`` works without passing the user.
+        """
+        objs = list(objs)
+        missing = set()
+        for link in objs:
+            if link.user_id is not None:
+                continue
+            if type(link).playlist.is_cached(link):
+                link.user_id = link.playlist.user_id
+            else:
+                missing.add(link.playlist_id)
+        if missing:
+            users = dict(Playlist.all_objects.filter(
+                pk__in=missing,
+            ).values_list('pk', 'user_id'))
+            for link in objs:
+                if link.user_id is None:
+                    link.user_id = users.get(link.playlist_id)
+        return super().bulk_create(objs, *args, **kwargs)
+
+
+class PlaylistLink(models.Model):
+    """Link of a playlist, stored with the user owning the playlist.
+
+    The user is the key the link tables are hash partitioned by on
+    Postgres, see migration 0022. Queries filtering on it only read one
+    partition.
+    """
+    playlist = models.ForeignKey(Playlist, on_delete=models.CASCADE)
+    # Indexed by the unique constraint of each link table.
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+',
+        db_index=False,
+    )
+
+    objects = PlaylistLinkQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if self.user_id is None:
+            self.user_id = self.playlist.user_id
+        super().save(*args, **kwargs)
+
+
+class PlaylistTag(PlaylistLink):
+    """Tag of a playlist."""
+    tag = models.ForeignKey("Tag", on_delete=models.CASCADE)
+
+    class Meta:
+        db_table = 'core_playlist_tags'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'playlist', 'tag'],
+                name='core_playlisttag_unique',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.playlist_id}:{self.tag_id}'
+
+
+class PlaylistSong(PlaylistLink):
+    """Song in a playlist, at a position."""
+    # Room left between neighbours so that moving a song only updates
+    # its own row.
+    POSITION_GAP = 1 << 16
+
+    song = models.ForeignKey("Song", on_delete=models.CASCADE)
+    position = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'core_playlist_songs'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'playlist', 'song'],
+                name='core_playlistsong_unique',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['playlist', 'position'],
+                name='core_playlistsong_position',
+            ),
+        ]
+        ordering = ['position', 'id']
+
+    def __str__(self):
+        return f'{self.playlist_id}:{self.song_id}@{self.position}'
+
+
+class PlaylistSignature(models.Model):
+    """MinHash signature of the songs and tags of a playlist.
+
+    Kept up to date by core.signals, see core.similarity.
+    """
+    playlist = models.OneToOneField(
+        Playlist,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='signature',
+    )
+    minhash = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'Signature of {self.playlist_id}'
+
+
+class PlaylistBucket(models.Model):
+    """LSH bucket of one band of a playlist signature.
+
+    Playlists of a user sharing a key are candidates for similar ones.
+    """
+    playlist = models.ForeignKey(
+        Playlist,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+',
+        db_index=False,
+    )
+    key = models.BigIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'key'],
+                name='core_playlistbucket_lookup',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.playlist_id}:{self.key}'
+
+
+class Tag(SoftDeleteModel):
     """Tag for filtering playlists."""
     name = models.CharField(max_length=255)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    # Number of playlists with the tag, kept up to date by core.signals.
+    playlist_count = models.IntegerField(default=0)
+
+    objects = AliveManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', '-playlist_count'],
+                name='core_tag_usage',
+            ),
+            models.Index(
+                fields=['deleted_at'],
+                condition=models.Q(deleted_at__isnull=False),
+                name='core_tag_deleted',
+            ),
+            models.Index(
+                fields=['name'],
+                opclasses=['varchar_pattern_ops'],
+                name='core_tag_name_prefix',
+            ),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class LibraryStats(models.Model):
+    """Playlist totals of a user, kept up to date by core.signals."""
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='library_stats',
+    )
+    playlist_count = models.IntegerField(default=0)
+    total_minutes = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.user_id}: {self.playlist_count} playlists'
+
+
+class GenreStats(models.Model):
+    """Playlist totals of a user for one genre."""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='genre_stats',
+    )
+    genre = models.CharField(max_length=255, blank=True)
+    playlist_count = models.IntegerField(default=0)
+    total_minutes = models.BigIntegerField(default=0)
+
+    class Meta:
+        unique_together = [('user', 'genre')]
+
+    def __str__(self):
+        return f'{self.user_id}: {self.genre or "-"}'
+
+
+class ArtistManager(models.Manager):
+    def resolve(self, name):
+        """Return the artist called name, adding it if new.
+
+        Returns None for a blank name.
+        """
+        key = normalize_text(name)
+        if not key:
+            return None
+        artist, created = self.get_or_create(
+            key=key,
+            defaults={'name': name.strip()},
+        )
+
+        return artist
+
+
+class Artist(models.Model):
+    """Artist in the shared catalog."""
+    name = models.CharField(max_length=255)
+    key = models.CharField(max_length=255, unique=True)
+
+    objects = ArtistManager()
+
+    def __str__(self):
+        return self.name
+
+
+class TrackManager(models.Manager):
+    def resolve(self, name, artist=''):
+        """Return the catalog track for name and artist, adding it if new."""
+        key = track_key(name, artist)
+        track = self.filter(key=key).first()
+        if track is None:
+            track, created = self.get_or_create(
+                key=key,
+                defaults={
+                    'name': name,
+                    'artist': Artist.objects.resolve(artist),
+                    'match_key': match_key(name, artist),
+                },
+            )
+
+        return track
+
+
+class Track(models.Model):
+    """Song in the shared catalog, stored once per name and artist."""
+    name = models.CharField(max_length=255)
+    artist = models.ForeignKey(
+        Artist,
+        null=True,
+        blank=True,
+        on_delete=models.PROTECT,
+        related_name='tracks',
+    )
+    key = models.CharField(max_length=64, unique=True)
+    # Shared by tracks that are likely the same song, see match_key().
+    match_key = models.CharField(max_length=64, db_index=True)
+
+    objects = TrackManager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['name'],
+                opclasses=['varchar_pattern_ops'],
+                name='core_track_name_prefix',
+            ),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class SongQuerySet(models.QuerySet):
+    def _resolve_track(self, kwargs):
+        if 'name' in kwargs:
+            kwargs['track'] = Track.objects.resolve(
+                kwargs.pop('name'),
+                kwargs.pop('artist', ''),
+            )
+        return kwargs
+
+    def create(self, **kwargs):
+        """Create a song, `name` and `artist` are looked up in the catalog."""
+        return super().create(**self._resolve_track(kwargs))
+
+    def get_or_create(self, defaults=None, **kwargs):
+        """Get or create a song, `name` and `artist` as for `create`."""
+        return super().get_or_create(defaults, **self._resolve_track(kwargs))
+
+
+class Song(SoftDeleteModel):
+    """Song in a user's library, pointing at the shared catalog."""
+    track = models.ForeignKey(Track, on_delete=models.PROTECT)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+    # Number of playlists with the song, kept up to date by core.signals.
+    playlist_count = models.IntegerField(default=0)
+
+    objects = AliveManager.from_queryset(SongQuerySet)()
+    all_objects = SongQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            # Deleted songs wait for the purge, the song can be re-added
+            # in the meantime.
+            models.UniqueConstraint(
+                fields=['user', 'track'],
+                condition=models.Q(deleted_at__isnull=True),
+                name='core_song_unique_track',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['deleted_at'],
+                condition=models.Q(deleted_at__isnull=False),
+                name='core_song_deleted',
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
+    @property
+    def name(self):
+        return self.track.name
+
+    @property
+    def artist(self):
+        artist = self.track.artist
+        return artist.name if artist else ''
+
+    def merge(self, duplicate_ids):
+        """Merge songs `duplicate_ids` of the same user into this one.
+
+        Playlist links of the duplicates are moved to this song with one
+        UPDATE, playlists that already have it just lose the duplicates.
+        The duplicates are hidden afterwards.
+        """
+        with transaction.atomic():
+            duplicates = list(Song.objects.filter(
+                user_id=self.user_id,
+                pk__in=set(duplicate_ids) - {self.pk},
+            ))
+            links = PlaylistSong.objects.filter(
+                user_id=self.user_id,
+                song_id__in=[duplicate.pk for duplicate in duplicates],
+            )
+            playlist_ids = {duplicate.pk: set() for duplicate in duplicates}
+            for song_id, playlist_id in links.values_list(
+                'song_id',
+                'playlist_id',
+            ):
+                playlist_ids[song_id].add(playlist_id)
+            # The first link of a duplicate in each playlist without this
+            # song, the one keeping its place.
+            moved = dict(
+                links.exclude(
+                    playlist_id__in=PlaylistSong.objects.filter(
+                        user_id=self.user_id,
+                        song=self,
+                    ).values('playlist_id'),
+                ).order_by().values('playlist_id').annotate(
+                    first=models.Min('id'),
+                ).values_list('playlist_id', 'first')
+            )
+
+            # The bulk queries skip the related managers, tell the
+            # receivers counting and logging links about the changes.
+            for duplicate in duplicates:
+                self._send_links_changed(
+                    'pre_remove',
+                    duplicate,
+                    playlist_ids[duplicate.pk],
+                )
+            PlaylistSong.objects.filter(
+                user_id=self.user_id,
+                id__in=moved.values(),
+            ).update(song=self)
+            links.delete()
+            for duplicate in duplicates:
+                self._send_links_changed(
+                    'post_remove',
+                    duplicate,
+                    playlist_ids[duplicate.pk],
+                )
+                duplicate.soft_delete()
+            self._send_links_changed('post_add', self, set(moved))
+
+    def _send_links_changed(self, action, song, pk_set):
+        if pk_set:
+            models.signals.m2m_changed.send(
+                sender=PlaylistSong,
+                instance=song,
+                action=action,
+                reverse=True,
+                model=Playlist,
+                pk_set=pk_set,
+                using=self._state.db,
+            )
+
+
+class ChangeLogManager(models.Manager):
+    def record(self, user_id, kind, object_ids, action='upsert'):
+        """Log that objects `object_ids` of kind were changed.
+
+        The entries take the next sequence numbers of the user's feed.
+        Its row stays locked until the transaction commits, so entries
+        of a user become visible in sequence order.
+        """
+        object_ids = list(object_ids)
+        if not object_ids:
+            return
+        with transaction.atomic():
+            feed, _ = ChangeFeed.objects.select_for_update().get_or_create(
+                user_id=user_id,
+            )
+            first = feed.last_seq + 1
+            feed.last_seq += len(object_ids)
+            feed.save(update_fields=['last_seq'])
+            self.bulk_create([
+                self.model(
+                    user_id=user_id,
+                    seq=seq,
+                    kind=kind,
+                    object_id=object_id,
+                    action=action,
+                )
+                for seq, object_id in enumerate(object_ids, start=first)
+            ])
+
+
+class ChangeFeed(models.Model):
+    """Change log sequence of a user, and how far it was pruned."""
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        primary_key=True,
+        related_name='+',
+    )
+    last_seq = models.BigIntegerField(default=0)
+    # Entries up to here may have been removed by prune_changes.
+    pruned_seq = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f'{self.user_id}: {self.last_seq}'
+
+
+class ChangeLog(models.Model):
+    """Change to a playlist, tag or song, for clients to sync from.
+
+    The seq, numbering the entries of each user, is the sync cursor.
+    Entries are written by core.signals, deletes are kept as tombstones.
+    """
+    UPSERT = 'upsert'
+    DELETE = 'delete'
+
+    # Entries are logged while a user's rows are being deleted, so the
+    # user is not a constraint. They are removed after the user instead.
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+    )
+    seq = models.BigIntegerField()
+    kind = models.CharField(max_length=16)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=6, default=UPSERT)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = ChangeLogManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'seq'],
+                name='core_changelog_cursor',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.seq}: {self.action} {self.kind} {self.object_id}'
+
+
+class Job(models.Model):
+    """Unit of background work, run by the run_workers command."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
 
-class Song(models.Model):
-    """Song for playlist"""
     name = models.CharField(max_length=255)
-    artist = models.CharField(max_length=255)
+    kwargs = models.JSONField(default=dict, blank=True)
+    # Enqueueing again with the same key returns the job while it is
+    # pending, and queues it again once it has finished.
+    key = models.CharField(max_length=255, unique=True, null=True, blank=True)
+    status = models.CharField(max_length=8, default=QUEUED)
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=3)
+    # When a queued job may run, or when a running one is given up on
+    # and becomes visible to other workers again.
+    run_after = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['run_after', 'id'],
+                condition=models.Q(status__in=['queued', 'running']),
+                name='core_job_pending',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.id} ({self.status})'
+
+
+class AuthTokenManager(models.Manager):
+    def issue(self, user, name=''):
+        """Create and return a new token for one of user's devices."""
+        return self.create(
+            user=user,
+            name=name,
+            key=secrets.token_hex(20),
+            expires_at=timezone.now() + settings.AUTH_TOKEN_TTL,
+        )
+
+
+class AuthToken(models.Model):
+    """API token of one device, valid until it expires or is revoked."""
+    key = models.CharField(max_length=40, unique=True)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
+        related_name='auth_tokens',
     )
+    name = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+    # Written in batches by core.authentication, so it can lag behind.
+    last_used_at = models.DateTimeField(null=True, blank=True)
+
+    objects = AuthTokenManager()
+
+    def __str__(self):
+        return self.name or f'Token #{self.id}'
+
+
+class MediaBlobManager(models.Manager):
+    def store(self, file, filename, storage):
+        """Return the blob with the content of file, saving it if new."""
+        digest = hashlib.sha256()
+        size = 0
+        file.seek(0)
+        for chunk in file.chunks():
+            digest.update(chunk)
+            size += len(chunk)
+        digest = digest.hexdigest()
+
+        blob = self.filter(digest=digest).first()
+        # Touched so gc_media leaves it alone until it is referenced. If
+        # the collector got it first, it is stored again below.
+        if blob is not None and not self.filter(pk=blob.pk).update(
+            ref_changed_at=timezone.now(),
+        ):
+            blob = None
+        if blob is None:
+            name = blob_file_path(digest, filename)
+            if not storage.exists(name):
+                file.seek(0)
+                name = storage.save(name, file)
+            # A concurrent upload of the same file may win, the file
+            # this one saved is then removed by gc_media --scan-storage.
+            blob, created = self.get_or_create(
+                digest=digest,
+                defaults={'name': name, 'size': size},
+            )
+
+        return blob
+
+    def add_ref(self, name, delta):
+        """Add delta to the references of the blob stored as name."""
+        if name:
+            self.filter(name=name).update(
+                ref_count=models.F('ref_count') + delta,
+                ref_changed_at=timezone.now(),
+            )
+
+
+class MediaBlob(models.Model):
+    """File stored once per content, shared by the rows pointing at it."""
+    digest = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=255, unique=True)
+    size = models.BigIntegerField()
+    # Rows pointing at the file, kept up to date by core.signals.
+    ref_count = models.IntegerField(default=0)
+    ref_changed_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = MediaBlobManager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['ref_changed_at'],
+                condition=models.Q(ref_count__lte=0),
+                name='core_mediablob_orphans',
+            ),
+        ]
 
     def __str__(self):
         return self.name
+
+
+class ProfileRecord(models.Model):
+    """Profile of one request, recorded by core.profiling."""
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name='+',
+    )
+    method = models.CharField(max_length=10)
+    path = models.TextField()
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    query_count = models.PositiveIntegerField()
+    query_ms = models.FloatField()
+    # [{'alias', 'sql', 'params', 'many', 'ms', 'explain'}], explain only
+    # for slow ones.
+    queries = models.JSONField(default=list)
+    # {'Serializer.field': {'calls', 'ms'}}
+    fields = models.JSONField(default=dict)
+    # cProfile stats of the slowest functions, as printed by pstats.
+    stats = models.TextField(blank=True)
+
+    def __str__(self):
+        return f'{self.method} {self.path} ({self.duration_ms:.0f} ms)'
+
+
+class SlowQuery(models.Model):
+    """Queries slower than settings.SLOW_QUERY_MS, per fingerprint.
+
+    Written by core.slow_queries, which aggregates them in memory first.
+    """
+    digest = models.CharField(max_length=64, unique=True)
+    fingerprint = models.TextField()
+    tables = models.CharField(max_length=255, blank=True)
+    count = models.BigIntegerField(default=0)
+    total_ms = models.FloatField(default=0)
+    max_ms = models.FloatField(default=0)
+    # The slowest run seen.
+    sample_sql = models.TextField()
+    sample_params = models.TextField(blank=True)
+    # {'View.action / Serializer / file:line in function': count}
+    sites = models.JSONField(default=dict)
+    explain = models.TextField(blank=True)
+    # The plan reads a whole table, likely an index is missing.
+    full_scan = models.BooleanField(default=False)
+    first_seen_at = models.DateTimeField(auto_now_add=True)
+    last_seen_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'slow queries'
+
+    def __str__(self):
+        return self.fingerprint[:100]
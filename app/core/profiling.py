@@ -0,0 +1,202 @@
+"""
+Opt-in profiling of single requests, stored as ProfileRecord.
+
+A request is profiled when it carries an X-Profile header with a token
+from issue_token(), or is picked by settings.PROFILING_SAMPLE_RATE.
+Other requests only pay for checking the header.
+"""
+import contextvars
+import cProfile
+import io
+import pstats
+import random
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core import signing
+from django.db import connections
+from rest_framework.fields import SkipField
+from rest_framework.relations import PKOnlyObject
+
+from core.models import ProfileRecord
+from core.slow_queries import explain
+
+HEADER = 'X-Profile'
+SALT = 'core.profiling'
+
+_current = contextvars.ContextVar('profile', default=None)
+
+
+def issue_token(user):
+    """Return a token profiling requests sent with it, for a while."""
+    return signing.dumps({'by': user.pk}, salt=SALT)
+
+
+def current():
+    """Return the Profile of the request being handled, if profiled."""
+    return _current.get()
+
+
+def _requested(request):
+    token = request.META.get(f'HTTP_{HEADER.upper().replace("-", "_")}')
+    if token:
+        try:
+            signing.loads(
+                token,
+                salt=SALT,
+                max_age=settings.PROFILING_TOKEN_MAX_AGE,
+            )
+        except signing.BadSignature:
+            return False
+        return True
+    rate = settings.PROFILING_SAMPLE_RATE
+    return rate > 0 and random.random() < rate
+
+
+class Profile:
+    """What one request spent its time on."""
+
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+        self.queries = []
+        self.query_count = 0
+        self.query_seconds = 0.0
+        self.fields = {}
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        """Time a query, as a database execute wrapper."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.query_count += 1
+            self.query_seconds += elapsed
+            if len(self.queries) < settings.PROFILING_MAX_QUERIES:
+                self.queries.append({
+                    'alias': context['connection'].alias,
+                    'sql': sql,
+                    'params': params,
+                    'many': many,
+                    'ms': elapsed * 1000,
+                })
+
+    def add_field_time(self, name, seconds):
+        timing = self.fields.setdefault(name, {'calls': 0, 'ms': 0.0})
+        timing['calls'] += 1
+        timing['ms'] += seconds * 1000
+
+    @contextmanager
+    def capture(self):
+        """Profile the code and queries run inside the block."""
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(self))
+            start = time.perf_counter()
+            self.profiler.enable()
+            try:
+                yield self
+            finally:
+                self.profiler.disable()
+                self.seconds = time.perf_counter() - start
+
+    def explain_slow_queries(self):
+        """Add the plan of slow SELECT queries, run again with EXPLAIN."""
+        for query in self.queries:
+            if (query['ms'] < settings.PROFILING_EXPLAIN_MS
+                    or query['many']
+                    or not query['sql'].lstrip().upper().startswith('SELECT')):
+                continue
+            query['explain'] = explain(
+                connections[query['alias']],
+                query['sql'],
+                query['params'],
+            )
+
+    def stats_text(self):
+        out = io.StringIO()
+        pstats.Stats(self.profiler, stream=out).sort_stats(
+            'cumulative',
+        ).print_stats(settings.PROFILING_TOP_FUNCTIONS)
+        return out.getvalue()
+
+    def save(self, request, response):
+        """Store the profile and return its ProfileRecord."""
+        self.explain_slow_queries()
+        user = getattr(request, 'user', None)
+        return ProfileRecord.objects.create(
+            user=user if user is not None and user.is_authenticated else None,
+            method=request.method,
+            path=request.get_full_path(),
+            status_code=response.status_code,
+            duration_ms=self.seconds * 1000,
+            query_count=self.query_count,
+            query_ms=self.query_seconds * 1000,
+            queries=[
+                {**query, 'params': repr(query['params'])}
+                for query in self.queries
+            ],
+            fields=self.fields,
+            stats=self.stats_text(),
+        )
+
+
+class ProfilingMiddleware:
+    """Profile requests asking for it, answering with X-Profile-Id.
+
+    Goes first in MIDDLEWARE so the whole request is measured.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not _requested(request):
+            return self.get_response(request)
+
+        profile = Profile()
+        token = _current.set(profile)
+        try:
+            with profile.capture():
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        record = profile.save(request, response)
+        response[f'{HEADER}-Id'] = str(record.pk)
+        return response
+
+
+class ProfiledFieldsMixin:
+    """Serializer mixin timing each field of profiled requests.
+
+    Nested serializers are included in the time of their field.
+    """
+
+    def to_representation(self, instance):
+        profile = current()
+        if profile is None:
+            return super().to_representation(instance)
+
+        # Serializer.to_representation, with a timer around each field.
+        ret = {}
+        for field in self._readable_fields:
+            start = time.perf_counter()
+            try:
+                attribute = field.get_attribute(instance)
+            except SkipField:
+                continue
+            if isinstance(attribute, PKOnlyObject):
+                check_for_none = attribute.pk
+            else:
+                check_for_none = attribute
+            if check_for_none is None:
+                ret[field.field_name] = None
+            else:
+                ret[field.field_name] = field.to_representation(attribute)
+            profile.add_field_time(
+                f'{type(self).__name__}.{field.field_name}',
+                time.perf_counter() - start,
+            )
+        return ret
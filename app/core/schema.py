@@ -0,0 +1,150 @@
+"""
+Cached OpenAPI schema for the API docs.
+"""
+import gzip
+import hashlib
+import json
+import threading
+from collections import namedtuple
+from pathlib import Path
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.translation import get_language
+from drf_spectacular.renderers import OpenApiJsonRenderer
+from drf_spectacular.settings import spectacular_settings
+from drf_spectacular.views import SpectacularAPIView
+from rest_framework.exceptions import NotFound
+
+SchemaDocument = namedtuple(
+    'SchemaDocument',
+    ['content', 'gzipped', 'etag', 'content_type'],
+)
+
+_schemas = {}
+_documents = {}
+_lock = threading.Lock()
+
+
+def generate_schema(api_version=None):
+    """Introspect the API and return the OpenAPI schema as a dict."""
+    generator_class = spectacular_settings.DEFAULT_GENERATOR_CLASS
+    generator = generator_class(api_version=api_version)
+    return generator.get_schema(request=None, public=True)
+
+
+def render_schema_json(schema):
+    """Render a schema dict the same way the JSON endpoint does."""
+    return OpenApiJsonRenderer().render(schema)
+
+
+def _load_prebuilt_schema():
+    path = getattr(settings, 'SCHEMA_CACHE_FILE', None)
+    if not path or not Path(path).exists():
+        return None
+    with open(path, 'rb') as schema_file:
+        return json.load(schema_file)
+
+
+def get_schema(api_version=None, lang=None):
+    """Return the schema dict, generating it at most once per process."""
+    key = (api_version, lang)
+    schema = _schemas.get(key)
+    if schema is None:
+        with _lock:
+            schema = _schemas.get(key)
+            if schema is None:
+                if api_version is None and lang is None:
+                    schema = _load_prebuilt_schema()
+                if schema is None:
+                    schema = generate_schema(api_version)
+                _schemas[key] = schema
+    return schema
+
+
+def get_document(renderer, media_type, api_version=None, lang=None):
+    """Return the rendered, compressed and tagged schema document."""
+    key = (api_version, lang, media_type)
+    document = _documents.get(key)
+    if document is None:
+        schema = get_schema(api_version, lang)
+        content = renderer.render(schema, media_type)
+        content_type = media_type
+        if renderer.charset:
+            content_type = f'{media_type}; charset={renderer.charset}'
+        document = SchemaDocument(
+            content=content,
+            gzipped=gzip.compress(content, mtime=0),
+            etag='"%s"' % hashlib.sha256(content).hexdigest()[:32],
+            content_type=content_type,
+        )
+        _documents[key] = document
+    return document
+
+
+def clear_schema_cache():
+    """Forget every cached schema and rendered document."""
+    with _lock:
+        _schemas.clear()
+        _documents.clear()
+
+
+def warm_schema_cache():
+    """Build the default schema now so errors surface at startup.
+
+    Called from the WSGI/ASGI entrypoints when ``SCHEMA_FAIL_ON_ERROR`` is
+    set, any error propagates so the process fails to start instead of
+    serving a broken ``/api/schema``.
+    """
+    get_schema()
+
+
+class CachedSpectacularAPIView(SpectacularAPIView):
+    """Serve the OpenAPI schema from memory with ETag and gzip support.
+
+    Only versions in SCHEMA_VERSIONS are served, so the cache can't grow
+    with every version a client asks for.
+    """
+
+    def _get_schema_response(self, request):
+        version = (
+            self.api_version
+            or request.version
+            or self._get_version_parameter(request)
+        )
+        if version and version not in settings.SCHEMA_VERSIONS:
+            raise NotFound('Unknown API version.')
+        lang = get_language() if request.GET.get('lang') else None
+        document = get_document(
+            request.accepted_renderer,
+            request.accepted_media_type,
+            api_version=version,
+            lang=lang,
+        )
+
+        accepts_gzip = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if accepts_gzip:
+            etag = document.etag[:-1] + '-gzip"'
+            response = HttpResponse(
+                document.gzipped,
+                content_type=document.content_type,
+            )
+            response['Content-Encoding'] = 'gzip'
+        else:
+            etag = document.etag
+            response = HttpResponse(
+                document.content,
+                content_type=document.content_type,
+            )
+        response['ETag'] = etag
+        response['Content-Disposition'] = 'inline; filename="{}"'.format(
+            self._get_filename(request, version)
+        )
+        patch_vary_headers(response, ['Accept', 'Accept-Encoding'])
+
+        return get_conditional_response(
+            request,
+            etag=etag,
+            response=response,
+        )
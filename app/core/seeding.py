@@ -0,0 +1,218 @@
+"""
+Synthetic libraries for load testing, generated by seed_library.
+"""
+import random
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from core import similarity, stats
+from core.models import (
+    Artist,
+    Playlist,
+    PlaylistSong,
+    Song,
+    Tag,
+    Track,
+    normalize_text,
+    match_key,
+    track_key,
+)
+
+GENRES = ['', 'rock', 'pop', 'jazz', 'hip hop', 'electronic', 'classical']
+TRACK_PREFIX = 'Seed track '
+ARTIST_PREFIX = 'Seed artist '
+
+
+class Distribution:
+    """Random count, parsed from 'N', 'uniform:LOW:HIGH' or 'exp:MEAN'.
+
+    Exponential counts give the long tail of real libraries, most are
+    small and a few are much bigger than the mean.
+    """
+
+    def __init__(self, spec):
+        self.spec = spec
+        kind, *args = spec.split(':')
+        try:
+            args = [float(arg) for arg in args]
+            if not args:
+                self.kind, self.args = 'fixed', [int(kind)]
+            elif kind == 'uniform' and len(args) == 2:
+                self.kind, self.args = kind, [int(arg) for arg in args]
+            elif kind == 'exp' and len(args) == 1 and args[0] > 0:
+                self.kind, self.args = kind, args
+            else:
+                raise ValueError
+        except ValueError:
+            raise ValueError(
+                f'{spec!r} is not N, uniform:LOW:HIGH or exp:MEAN.'
+            )
+        if min(self.args) < 0:
+            raise ValueError(f'{spec!r} has a negative count.')
+
+    def __repr__(self):
+        return self.spec
+
+    def sample(self, rng):
+        if self.kind == 'uniform':
+            return rng.randint(*self.args)
+        if self.kind == 'exp':
+            return int(rng.expovariate(1 / self.args[0]))
+        return self.args[0]
+
+
+def seed_email(seed, index):
+    return f'seed-{seed}-{index}@example.invalid'
+
+
+def create_catalog(tracks, artists, batch_size):
+    """Add the shared catalog and return its track ids in order.
+
+    Tracks already added by an earlier run are reused.
+    """
+    artist_names = [f'{ARTIST_PREFIX}{index}' for index in range(artists)]
+    Artist.objects.bulk_create(
+        [Artist(name=name, key=normalize_text(name)) for name in artist_names],
+        batch_size=batch_size,
+        ignore_conflicts=True,
+    )
+    artist_ids = dict(Artist.objects.filter(
+        name__startswith=ARTIST_PREFIX,
+    ).values_list('name', 'id'))
+
+    keys = [
+        track_key(f'{TRACK_PREFIX}{index}', artist_names[index % artists])
+        for index in range(tracks)
+    ]
+    Track.objects.bulk_create(
+        [
+            Track(
+                name=f'{TRACK_PREFIX}{index}',
+                artist_id=artist_ids[artist_names[index % artists]],
+                key=key,
+                match_key=match_key(
+                    f'{TRACK_PREFIX}{index}',
+                    artist_names[index % artists],
+                ),
+            )
+            for index, key in enumerate(keys)
+        ],
+        batch_size=batch_size,
+        ignore_conflicts=True,
+    )
+    track_ids = dict(Track.objects.filter(
+        name__startswith=TRACK_PREFIX,
+    ).values_list('key', 'id'))
+    return [track_ids[key] for key in keys]
+
+
+def seed_users(seed, first, last, catalog, options, batch_size):
+    """Add users first to last - 1 with their libraries, return row counts.
+
+    Each user's library is drawn from a generator seeded with the seed
+    and the user's index, so it doesn't depend on how users are split
+    between processes.
+    """
+    password = make_password(None)
+    with transaction.atomic():
+        users = get_user_model().objects.bulk_create(
+            [
+                get_user_model()(
+                    email=seed_email(seed, index),
+                    name=f'Seed user {index}',
+                    password=password,
+                    is_staff=False,
+                )
+                for index in range(first, last)
+            ],
+            batch_size=batch_size,
+        )
+        playlists, tags, songs, tag_links, song_links = [], [], [], [], []
+        for index, user in zip(range(first, last), users):
+            rng = random.Random(f'{seed}-{index}')
+            user_tags = [
+                Tag(user=user, name=f'Tag {number}')
+                for number in range(options['tags'].sample(rng))
+            ]
+            user_songs = [
+                Song(user=user, track_id=track_id)
+                for track_id in rng.sample(
+                    catalog,
+                    min(options['songs'].sample(rng), len(catalog)),
+                )
+            ]
+            for number in range(options['playlists'].sample(rng)):
+                playlist = Playlist(
+                    user=user,
+                    title=f'Playlist {number}',
+                    time_minutes=rng.randint(5, 300),
+                    general_genre=rng.choice(GENRES),
+                )
+                playlists.append(playlist)
+                tag_links.extend(
+                    (playlist, tag) for tag in rng.sample(
+                        user_tags,
+                        min(
+                            options['tags_per_playlist'].sample(rng),
+                            len(user_tags),
+                        ),
+                    )
+                )
+                song_links.extend(
+                    (playlist, song, position) for position, song in enumerate(
+                        rng.sample(
+                            user_songs,
+                            min(
+                                options['songs_per_playlist'].sample(rng),
+                                len(user_songs),
+                            ),
+                        ),
+                        start=1,
+                    )
+                )
+            tags.extend(user_tags)
+            songs.extend(user_songs)
+
+        # bulk_create sets the ids used by the links below.
+        Tag.objects.bulk_create(tags, batch_size=batch_size)
+        Song.objects.bulk_create(songs, batch_size=batch_size)
+        Playlist.objects.bulk_create(playlists, batch_size=batch_size)
+        Playlist.tags.through.objects.bulk_create(
+            [
+                Playlist.tags.through(
+                    playlist_id=playlist.pk,
+                    tag_id=tag.pk,
+                    user_id=playlist.user_id,
+                )
+                for playlist, tag in tag_links
+            ],
+            batch_size=batch_size,
+        )
+        PlaylistSong.objects.bulk_create(
+            [
+                PlaylistSong(
+                    playlist_id=playlist.pk,
+                    song_id=song.pk,
+                    user_id=playlist.user_id,
+                    position=position * PlaylistSong.POSITION_GAP,
+                )
+                for playlist, song, position in song_links
+            ],
+            batch_size=batch_size,
+        )
+        # bulk_create skips the signals keeping the stats and signatures.
+        stats.rebuild_stats([user.pk for user in users])
+        for start in range(0, len(playlists), batch_size):
+            similarity.update_signatures(
+                playlist.pk for playlist in playlists[start:start + batch_size]
+            )
+
+    return {
+        'users': len(users),
+        'playlists': len(playlists),
+        'tags': len(tags),
+        'songs': len(songs),
+        'links': len(tag_links) + len(song_links),
+    }
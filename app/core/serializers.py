@@ -0,0 +1,44 @@
+"""
+Serializers for request profiles.
+"""
+from rest_framework import serializers
+
+from core.models import ProfileRecord
+
+
+class ProfileRecordSerializer(serializers.ModelSerializer):
+    """Summary of a profiled request."""
+
+    class Meta:
+        model = ProfileRecord
+        fields = [
+            'id',
+            'created_at',
+            'user',
+            'method',
+            'path',
+            'status_code',
+            'duration_ms',
+            'query_count',
+            'query_ms',
+        ]
+        read_only_fields = fields
+
+
+class ProfileRecordDetailSerializer(ProfileRecordSerializer):
+    """Profiled request with its queries, field timings and stats."""
+
+    class Meta(ProfileRecordSerializer.Meta):
+        fields = ProfileRecordSerializer.Meta.fields + [
+            'queries',
+            'fields',
+            'stats',
+        ]
+        read_only_fields = fields
+
+
+class ProfileTokenSerializer(serializers.Serializer):
+    """Token to send as the X-Profile header."""
+    header = serializers.CharField()
+    token = serializers.CharField()
+    expires_in = serializers.IntegerField()
@@ -0,0 +1,218 @@
+"""
+Views serving media and static files with caching headers and ranges.
+"""
+import mimetypes
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    StreamingHttpResponse,
+)
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+# Files whose content never changes under the same name.
+IMMUTABLE = 'public, max-age=31536000, immutable'
+# Anything else is checked with the ETag on every use.
+REVALIDATE = 'no-cache'
+
+BLOB_RE = re.compile(r'^blobs/[0-9a-f]{2}/(?P<digest>[0-9a-f]{64})\.\w*$')
+# Names given by ManifestStaticFilesStorage, like app.0123456789ab.css.
+HASHED_STATIC_RE = re.compile(r'\.[0-9a-f]{12}\.\w+$')
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+def parse_range(header, size):
+    """Return the first and last byte of a single byte range.
+
+    Returns None when the whole file should be sent, for no range, an
+    invalid one or several ranges. Raises ValueError when the range is
+    outside the file.
+    """
+    match = RANGE_RE.match(header.replace(' ', ''))
+    if not match or match.group(1) == match.group(2) == '':
+        return None
+    first, last = match.groups()
+    if first == '':
+        # The last `last` bytes.
+        if int(last) == 0 or size == 0:
+            raise ValueError(header)
+        return max(size - int(last), 0), size - 1
+    first = int(first)
+    if last and int(last) < first:
+        return None
+    if first >= size:
+        raise ValueError(header)
+    return first, min(int(last), size - 1) if last else size - 1
+
+
+def _read_range(file, first, last):
+    with file:
+        file.seek(first)
+        remaining = last - first + 1
+        while remaining > 0:
+            chunk = file.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _modified_time(storage, name):
+    try:
+        return int(storage.get_modified_time(name).timestamp())
+    except NotImplementedError:
+        return None
+
+
+def serve_file(request, storage, name, cache_control, etag=None,
+               accel_redirect='', content_type=None, encoding=None):
+    """Return a response sending name from storage.
+
+    Answers If-None-Match and If-Modified-Since with 304 and a single
+    byte range with 206. Whole files go out as a FileResponse, which
+    WSGI servers with wsgi.file_wrapper, like gunicorn, send with
+    sendfile(). With accel_redirect, the front proxy is told to send the
+    file from that location instead.
+    """
+    if not name or not storage.exists(name):
+        raise Http404(f'{name} not found.')
+    size = storage.size(name)
+    last_modified = _modified_time(storage, name)
+    if etag is None:
+        etag = f'"{size:x}-{last_modified or 0:x}"'
+    if content_type is None:
+        content_type = (
+            mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        )
+
+    headers = HttpResponse()
+    headers['Cache-Control'] = cache_control
+    headers['ETag'] = etag
+    if last_modified is not None:
+        headers['Last-Modified'] = http_date(last_modified)
+    if encoding:
+        headers['Content-Encoding'] = encoding
+        patch_vary_headers(headers, ['Accept-Encoding'])
+    conditional = get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=last_modified,
+        response=headers,
+    )
+    if conditional is not headers:
+        return conditional
+
+    if accel_redirect:
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = accel_redirect + quote(name)
+    else:
+        response = _file_response(request, storage, name, size, etag,
+                                  last_modified, content_type)
+    for header, value in headers.items():
+        if header != 'Content-Type':
+            response[header] = value
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def _file_response(request, storage, name, size, etag, last_modified,
+                   content_type):
+    byte_range = request.META.get('HTTP_RANGE', '')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range and if_range != etag and (
+        last_modified is None
+        or parse_http_date_safe(if_range) != last_modified
+    ):
+        # Changed since the client got the start of it, send it all.
+        byte_range = ''
+    try:
+        byte_range = parse_range(byte_range, size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if byte_range is None:
+        return FileResponse(
+            storage.open(name, 'rb'),
+            content_type=content_type,
+        )
+    first, last = byte_range
+    response = StreamingHttpResponse(
+        _read_range(storage.open(name, 'rb'), first, last),
+        status=206,
+        content_type=content_type,
+    )
+    response['Content-Range'] = f'bytes {first}-{last}/{size}'
+    response['Content-Length'] = last - first + 1
+    return response
+
+
+def _clean_path(path):
+    name = posixpath.normpath(path).lstrip('/')
+    if name in ('', '.') or name.startswith('..'):
+        raise Http404(f'{path} not found.')
+    return name
+
+
+@require_safe
+def serve_media(request, path):
+    """Serve an uploaded file from the default storage.
+
+    Media names are never reused, blobs are named after their content
+    and other uploads get random names, so they are cached for good.
+    """
+    name = _clean_path(path)
+    match = BLOB_RE.match(name)
+    return serve_file(
+        request,
+        default_storage,
+        name,
+        IMMUTABLE,
+        etag=f'"{match["digest"]}"' if match else None,
+        accel_redirect=settings.MEDIA_ACCEL_REDIRECT,
+    )
+
+
+@require_safe
+def serve_static(request, path):
+    """Serve a collected static file, gzipped when there is a copy.
+
+    Only names with a content hash, from the manifest storage, are
+    cached for good. Behind a proxy, its gzip_static sends the copies.
+    """
+    from django.contrib.staticfiles.storage import staticfiles_storage
+
+    name = _clean_path(path)
+    cache_control = IMMUTABLE if HASHED_STATIC_RE.search(name) else REVALIDATE
+    content_type = mimetypes.guess_type(name)[0]
+    accepts_gzip = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+    if (accepts_gzip and not settings.STATIC_ACCEL_REDIRECT
+            and staticfiles_storage.exists(f'{name}.gz')):
+        return serve_file(
+            request,
+            staticfiles_storage,
+            f'{name}.gz',
+            cache_control,
+            content_type=content_type,
+            encoding='gzip',
+        )
+    response = serve_file(
+        request,
+        staticfiles_storage,
+        name,
+        cache_control,
+        accel_redirect=settings.STATIC_ACCEL_REDIRECT,
+        content_type=content_type,
+    )
+    patch_vary_headers(response, ['Accept-Encoding'])
+    return response
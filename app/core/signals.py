@@ -0,0 +1,293 @@
+"""
+Signal handlers keeping the library statistics, change log, media
+references and playlist signatures up to date.
+"""
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from core.models import (
+    ChangeFeed,
+    ChangeLog,
+    MediaBlob,
+    Playlist,
+    PlaylistBucket,
+    PlaylistSong,
+    PlaylistTag,
+    Song,
+    Tag,
+    User,
+    soft_deleted,
+)
+from core import similarity, stats
+
+
+def _playlist_stats(playlist):
+    return (playlist.user_id, playlist.general_genre, playlist.time_minutes)
+
+
+@receiver(pre_save, sender=Playlist)
+def remember_playlist_stats(sender, instance, raw, **kwargs):
+    """Load the stored values the stats and references were counted with.
+
+    The row stays locked until the save commits, so a concurrent save
+    waits and then reads the values this one stored. Saves of deleted
+    playlists never get here, SoftDeleteModel.save() skips them.
+    """
+    instance._stats_before = None
+    instance._image_before = None
+    if raw or instance.pk is None:
+        return
+    stored = Playlist.all_objects.select_for_update().filter(
+        pk=instance.pk,
+    ).values_list('user_id', 'general_genre', 'time_minutes', 'image').first()
+    if stored is not None:
+        instance._stats_before = stored[:3]
+        instance._image_before = stored[3] or ''
+
+
+@receiver(post_save, sender=Playlist)
+def count_saved_playlist(sender, instance, created, raw, **kwargs):
+    """Add a new playlist to the stats, or apply changes of an old one."""
+    if raw:
+        return
+    before = getattr(instance, '_stats_before', None)
+    if created or before is None:
+        stats.count_playlist(*_playlist_stats(instance))
+    else:
+        stats.change_playlist(before, _playlist_stats(instance))
+
+
+@receiver(post_save, sender=Playlist)
+def move_playlist_links(sender, instance, created, raw, **kwargs):
+    """File the links of a playlist that changed owner under the new one.
+
+    Runs in the transaction of Playlist.save(). The old owner's clients
+    see the playlist as deleted.
+    """
+    before = getattr(instance, '_stats_before', None)
+    if raw or created or before is None or before[0] == instance.user_id:
+        return
+    for model in (PlaylistTag, PlaylistSong, PlaylistBucket):
+        model.objects.filter(
+            user_id=before[0],
+            playlist_id=instance.pk,
+        ).update(user_id=instance.user_id)
+    ChangeLog.objects.record(
+        before[0],
+        'playlist',
+        [instance.pk],
+        action=ChangeLog.DELETE,
+    )
+
+
+@receiver(post_save, sender=Playlist)
+def count_image_refs(sender, instance, created, raw, **kwargs):
+    """Keep MediaBlob.ref_count in step with the playlist images."""
+    if raw:
+        return
+    name = instance.image.name or ''
+    before = getattr(instance, '_image_before', None)
+    if created:
+        MediaBlob.objects.add_ref(name, 1)
+    elif before is not None and before != name:
+        MediaBlob.objects.add_ref(before, -1)
+        MediaBlob.objects.add_ref(name, 1)
+
+
+@receiver(post_delete, sender=Playlist)
+def uncount_image_ref(sender, instance, **kwargs):
+    """Release the image of a deleted playlist, soft deleted ones too."""
+    MediaBlob.objects.add_ref(instance.image.name, -1)
+
+
+def _uncount_playlist_links(playlist):
+    stats.count_links(Tag.objects.filter(playlist=playlist), -1)
+    stats.count_links(Song.objects.filter(playlist=playlist), -1)
+
+
+# Soft deleted objects are taken out of the stats and logged when they
+# are hidden, the delete handlers skip them when they are purged.
+
+@receiver(pre_delete, sender=Playlist)
+def uncount_playlist_links(sender, instance, **kwargs):
+    """Links are deleted without m2m_changed, uncount them here."""
+    if instance.deleted_at is None:
+        _uncount_playlist_links(instance)
+
+
+@receiver(post_delete, sender=Playlist)
+def uncount_deleted_playlist(sender, instance, **kwargs):
+    """Remove a deleted playlist from the stats."""
+    if instance.deleted_at is None:
+        stats.count_playlist(*_playlist_stats(instance), sign=-1)
+
+
+@receiver(soft_deleted, sender=Playlist)
+def uncount_soft_deleted_playlist(sender, instance, **kwargs):
+    """Remove a hidden playlist and its links from the stats."""
+    _uncount_playlist_links(instance)
+    stats.count_playlist(*_playlist_stats(instance), sign=-1)
+
+
+def _count_links(model, sender, instance, action, reverse, pk_set):
+    """Keep model.playlist_count in step with the playlist links.
+
+    Removals are counted before the links go, so only links that
+    actually exist are uncounted. Added ids only include new links.
+    """
+    if reverse:
+        rows = model.objects.filter(pk=instance.pk)
+        if action == 'post_add':
+            stats.count_links(rows, len(pk_set))
+        elif action == 'pre_remove':
+            removed = sender.objects.filter(
+                **{f'{model._meta.model_name}_id': instance.pk},
+                playlist_id__in=pk_set,
+            ).count()
+            stats.count_links(rows, -removed)
+        elif action == 'pre_clear':
+            rows.update(playlist_count=0)
+    else:
+        rows = model.objects.filter(playlist=instance)
+        if action == 'post_add':
+            stats.count_links(model.objects.filter(pk__in=pk_set), 1)
+        elif action == 'pre_remove':
+            stats.count_links(rows.filter(pk__in=pk_set), -1)
+        elif action == 'pre_clear':
+            stats.count_links(rows, -1)
+
+
+@receiver(m2m_changed, sender=Playlist.tags.through)
+def count_tag_links(sender, instance, action, reverse, pk_set, **kwargs):
+    """Keep Tag.playlist_count up to date."""
+    _count_links(Tag, sender, instance, action, reverse, pk_set)
+
+
+@receiver(m2m_changed, sender=PlaylistSong)
+def count_song_links(sender, instance, action, reverse, pk_set, **kwargs):
+    """Keep Song.playlist_count up to date."""
+    _count_links(Song, sender, instance, action, reverse, pk_set)
+
+
+@receiver(post_save, sender=Playlist)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Song)
+def log_saved(sender, instance, raw, **kwargs):
+    """Log a created or updated playlist, tag or song."""
+    if raw:
+        return
+    ChangeLog.objects.record(
+        instance.user_id,
+        sender._meta.model_name,
+        [instance.pk],
+    )
+
+
+def _log_unlinked_playlists(instance):
+    ChangeLog.objects.record(
+        instance.user_id,
+        'playlist',
+        instance.playlist_set.values_list('pk', flat=True),
+    )
+
+
+def _log_tombstone(instance):
+    ChangeLog.objects.record(
+        instance.user_id,
+        instance._meta.model_name,
+        [instance.pk],
+        action=ChangeLog.DELETE,
+    )
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Song)
+def log_unlinked_playlists(sender, instance, **kwargs):
+    """Log the playlists losing a link to a deleted tag or song."""
+    if instance.deleted_at is None:
+        _log_unlinked_playlists(instance)
+
+
+@receiver(post_delete, sender=Playlist)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Song)
+def log_deleted(sender, instance, **kwargs):
+    """Keep a tombstone of a deleted playlist, tag or song."""
+    if instance.deleted_at is None:
+        _log_tombstone(instance)
+
+
+@receiver(soft_deleted, sender=Playlist)
+@receiver(soft_deleted, sender=Tag)
+@receiver(soft_deleted, sender=Song)
+def log_soft_deleted(sender, instance, **kwargs):
+    """Log a hidden playlist, tag or song like a deleted one."""
+    if sender is not Playlist:
+        _log_unlinked_playlists(instance)
+    _log_tombstone(instance)
+
+
+@receiver(m2m_changed, sender=Playlist.tags.through)
+@receiver(m2m_changed, sender=PlaylistSong)
+def log_links(sender, instance, action, reverse, pk_set, **kwargs):
+    """Log the playlists whose tags or songs changed."""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            ChangeLog.objects.record(instance.user_id, 'playlist', [
+                instance.pk,
+            ])
+        return
+    if action == 'pre_clear':
+        # The playlists are gone after the clear, find them now.
+        pk_set = set(
+            sender.objects.filter(
+                **{f'{instance._meta.model_name}_id': instance.pk},
+            ).values_list('playlist_id', flat=True)
+        )
+    elif action not in ('post_add', 'post_remove'):
+        return
+    ChangeLog.objects.record(instance.user_id, 'playlist', pk_set)
+
+
+@receiver(post_delete, sender=User)
+def delete_change_log(sender, instance, **kwargs):
+    """Drop the change log of a deleted user, tombstones included."""
+    ChangeLog.objects.filter(user_id=instance.pk).delete()
+    ChangeFeed.objects.filter(user_id=instance.pk).delete()
+
+
+@receiver(m2m_changed, sender=Playlist.tags.through)
+@receiver(m2m_changed, sender=PlaylistSong)
+def update_link_signatures(sender, instance, action, reverse, pk_set,
+                           **kwargs):
+    """Recompute the signatures of the playlists whose links changed."""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            similarity.schedule_update([instance.pk])
+        return
+    if action == 'pre_clear':
+        pk_set = set(
+            sender.objects.filter(
+                **{f'{instance._meta.model_name}_id': instance.pk},
+            ).values_list('playlist_id', flat=True)
+        )
+    elif action not in ('post_add', 'post_remove'):
+        return
+    similarity.schedule_update(pk_set)
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Song)
+@receiver(soft_deleted, sender=Tag)
+@receiver(soft_deleted, sender=Song)
+def update_unlinked_signatures(sender, instance, **kwargs):
+    """Recompute the signatures of playlists losing a tag or song."""
+    similarity.schedule_update(
+        instance.playlist_set.values_list('pk', flat=True),
+    )
@@ -0,0 +1,211 @@
+"""
+MinHash signatures of playlists, for finding similar ones.
+
+The songs and tags of a playlist are a set. NUM_HASHES hash functions
+give its MinHash signature, the share of equal values between two
+signatures estimates the Jaccard similarity of their sets. Each of the
+BANDS bands of a signature is stored as a PlaylistBucket key, so the
+candidates similar() ranks are the playlists sharing a key, found with
+an index instead of comparing every playlist of the user.
+"""
+import hashlib
+from collections import defaultdict
+
+import numpy as np
+from django.db import transaction
+
+from core.models import (
+    Job,
+    Playlist,
+    PlaylistBucket,
+    PlaylistSignature,
+    PlaylistSong,
+    PlaylistTag,
+)
+from core.tasks import enqueue, task
+
+NUM_HASHES = 128
+BANDS = 32
+# Values are at most 31 bits, so a * x + b fits in 64 bits.
+PRIME = np.uint64((1 << 31) - 1)
+DTYPE = np.dtype('<u4')
+
+
+def _coefficients(name):
+    # Taken from a hash rather than a random generator, so signatures
+    # stay comparable across processes and NumPy versions.
+    digests = [
+        hashlib.blake2b(f'{name}:{index}'.encode(), digest_size=8).digest()
+        for index in range(NUM_HASHES)
+    ]
+    return np.array([
+        int.from_bytes(digest, 'big') % (int(PRIME) - 1) + 1
+        for digest in digests
+    ], dtype=np.uint64)
+
+
+_A = _coefficients('a')
+_B = _coefficients('b')
+
+
+def signature(song_ids, tag_ids):
+    """Return the MinHash signature of a playlist, None when empty."""
+    # Songs and tags are told apart by the lowest bit.
+    items = np.concatenate([
+        np.asarray(song_ids, dtype=np.uint64) * np.uint64(2),
+        np.asarray(tag_ids, dtype=np.uint64) * np.uint64(2) + np.uint64(1),
+    ]) % PRIME
+    if not items.size:
+        return None
+    # One row per hash function, one column per item.
+    hashes = (_A[:, None] * items[None, :] + _B[:, None]) % PRIME
+    return hashes.min(axis=1).astype(DTYPE)
+
+
+def bucket_keys(minhash):
+    """Return the LSH key of each band of a signature."""
+    return [
+        int.from_bytes(
+            hashlib.blake2b(
+                bytes([index]) + band.tobytes(),
+                digest_size=8,
+            ).digest(),
+            'big',
+            signed=True,
+        )
+        for index, band in enumerate(minhash.reshape(BANDS, -1))
+    ]
+
+
+def _load(minhash):
+    return np.frombuffer(minhash, dtype=DTYPE)
+
+
+def update_signatures(playlist_ids):
+    """Recompute the signatures and buckets of playlists playlist_ids.
+
+    Playlists that are gone, hidden or empty lose their signature.
+    """
+    playlist_ids = set(playlist_ids)
+    users = dict(
+        Playlist.objects.filter(pk__in=playlist_ids).values_list(
+            'pk',
+            'user_id',
+        )
+    )
+    items = defaultdict(lambda: ([], []))
+    for index, (through, field) in enumerate([
+        (PlaylistSong, 'song'),
+        (PlaylistTag, 'tag'),
+    ]):
+        links = through.objects.filter(
+            user_id__in=set(users.values()),
+            playlist_id__in=users,
+            **{f'{field}__deleted_at__isnull': True},
+        ).values_list('playlist_id', f'{field}_id')
+        for playlist_id, item_id in links:
+            items[playlist_id][index].append(item_id)
+
+    signatures = []
+    buckets = []
+    for playlist_id, (song_ids, tag_ids) in items.items():
+        minhash = signature(song_ids, tag_ids)
+        signatures.append(PlaylistSignature(
+            playlist_id=playlist_id,
+            minhash=minhash.tobytes(),
+        ))
+        buckets.extend(
+            PlaylistBucket(
+                playlist_id=playlist_id,
+                user_id=users[playlist_id],
+                key=key,
+            )
+            for key in bucket_keys(minhash)
+        )
+    with transaction.atomic():
+        PlaylistBucket.objects.filter(playlist_id__in=playlist_ids).delete()
+        PlaylistSignature.objects.filter(
+            playlist_id__in=playlist_ids,
+        ).delete()
+        PlaylistSignature.objects.bulk_create(signatures)
+        PlaylistBucket.objects.bulk_create(buckets)
+
+
+def _job_key(playlist_id):
+    return f'playlist-signature:{playlist_id}'
+
+
+def schedule_update(playlist_ids):
+    """Queue a job updating the signature of each of playlist_ids.
+
+    Jobs are keyed by playlist, so the changes made before a job runs
+    share it. Workers see the jobs once the transaction commits.
+    """
+    for playlist_id in set(playlist_ids):
+        enqueue(
+            update_signature,
+            key=_job_key(playlist_id),
+            playlist_id=playlist_id,
+        )
+
+
+@task(name='core.update_signature')
+def update_signature(playlist_id):
+    """Recompute the signature of playlist playlist_id."""
+    # Free the key before reading the links, so a change from now on
+    # queues a new job instead of finding this one running. A change
+    # enqueueing meanwhile holds the job row until it commits.
+    Job.objects.filter(
+        key=_job_key(playlist_id),
+        status=Job.RUNNING,
+    ).update(key=None)
+    update_signatures([playlist_id])
+
+
+@task(name='core.rebuild_signatures')
+def rebuild_signatures(after=0, batch_size=1000):
+    """Recompute the signatures of all playlists, a batch per job.
+
+    Queued by migration 0023 for the playlists existing before it.
+    """
+    batch = list(
+        Playlist.objects.filter(pk__gt=after).order_by('pk').values_list(
+            'pk',
+            flat=True,
+        )[:batch_size]
+    )
+    if batch:
+        update_signatures(batch)
+        enqueue(rebuild_signatures, after=batch[-1], batch_size=batch_size)
+
+
+def similar(playlist, limit):
+    """Return (id, similarity) of the playlists most like playlist.
+
+    Only playlists of the same user sharing an LSH bucket with it are
+    compared, by the estimated Jaccard similarity of their songs and
+    tags. Best matches come first.
+    """
+    try:
+        minhash = _load(playlist.signature.minhash)
+    except PlaylistSignature.DoesNotExist:
+        return []
+    candidates = PlaylistBucket.objects.filter(
+        user_id=playlist.user_id,
+        key__in=bucket_keys(minhash),
+    ).exclude(playlist_id=playlist.pk).values('playlist_id')
+    rows = list(
+        PlaylistSignature.objects.filter(
+            playlist_id__in=candidates,
+            playlist__deleted_at__isnull=True,
+        ).values_list('playlist_id', 'minhash')
+    )
+    if not rows:
+        return []
+    ids = np.array([playlist_id for playlist_id, _ in rows])
+    scores = (np.stack([_load(row) for _, row in rows]) == minhash).mean(
+        axis=1,
+    )
+    # By similarity, then newest first.
+    order = np.lexsort((-ids, -scores))[:limit]
+    return [(int(ids[index]), float(scores[index])) for index in order]
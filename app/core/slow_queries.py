@@ -0,0 +1,216 @@
+"""
+Log of slow queries, grouped by fingerprint, with their plans.
+
+install() adds record() to every database connection. Queries slower
+than settings.SLOW_QUERY_MS are aggregated in memory per process, at
+most settings.SLOW_QUERY_MAX_FINGERPRINTS of them, and added to the
+SlowQuery table every settings.SLOW_QUERY_FLUSH_SECONDS.
+"""
+import hashlib
+import logging
+import re
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+MAX_SITES = 10
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_ROWS_RE = re.compile(r'\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+')
+_SPACE_RE = re.compile(r'\s+')
+_TABLE_RE = re.compile(r'\b(?:FROM|JOIN|UPDATE|INTO)\s+"?(\w+)"?', re.I)
+_FULL_SCAN_RE = re.compile(r'Seq Scan on|^SCAN (?:TABLE )?\w+$', re.M)
+# Frames of the database wrappers, not where a query comes from.
+_WRAPPER_FILES = ('core/slow_queries.py', 'core/profiling.py')
+
+_entries = {}
+_lock = threading.Lock()
+_last_flush = time.monotonic()
+_busy = threading.local()
+
+
+def fingerprint(sql):
+    """Return sql with its values replaced, the same for every run."""
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql.replace('%s', '?'))
+    sql = _ROWS_RE.sub('(...)', _LIST_RE.sub('(...)', sql))
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+def explain(connection, sql, params, analyze=False):
+    """Return the plan of a SELECT, or '' for other statements."""
+    if not sql.lstrip().upper().startswith('SELECT'):
+        return ''
+    try:
+        try:
+            prefix = connection.ops.explain_query_prefix(analyze=analyze)
+        except ValueError:
+            # The backend has no ANALYZE.
+            prefix = connection.ops.explain_query_prefix()
+        # A savepoint, so a failure can't break a transaction.
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                cursor.execute(f'{prefix} {sql}', params)
+                return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+    except DatabaseError as error:
+        return f'EXPLAIN failed: {error}'
+
+
+def call_site():
+    """Describe the view, serializer and app code running a query."""
+    from django.views import View
+    from rest_framework.serializers import BaseSerializer, ListSerializer
+
+    view = serializer = line = None
+    frame = sys._getframe(1)
+    while frame is not None:
+        owner = frame.f_locals.get('self')
+        if isinstance(owner, View):
+            # The outermost one.
+            action = getattr(owner, 'action', None)
+            view = type(owner).__name__ + (f'.{action}' if action else '')
+        elif serializer is None and isinstance(owner, BaseSerializer):
+            if isinstance(owner, ListSerializer):
+                owner = owner.child
+            serializer = type(owner).__name__
+        filename = frame.f_code.co_filename
+        if (line is None and filename.startswith(str(settings.BASE_DIR))
+                and not filename.endswith(_WRAPPER_FILES)):
+            line = (
+                f'{filename[len(str(settings.BASE_DIR)) + 1:]}:'
+                f'{frame.f_lineno} in {frame.f_code.co_name}'
+            )
+        frame = frame.f_back
+    return ' / '.join(part for part in [view, serializer, line] if part)
+
+
+def record(execute, sql, params, many, context):
+    """Database execute wrapper remembering slow queries."""
+    if getattr(_busy, 'active', False):
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    result = execute(sql, params, many, context)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    if elapsed_ms >= settings.SLOW_QUERY_MS:
+        _busy.active = True
+        try:
+            _add(context['connection'], sql, params, many, elapsed_ms)
+        finally:
+            _busy.active = False
+        flush_if_due()
+    return result
+
+
+def _add(connection, sql, params, many, elapsed_ms):
+    key = fingerprint(sql)
+    site = call_site()
+    with _lock:
+        entry = _entries.get(key)
+        if entry is None:
+            if len(_entries) >= settings.SLOW_QUERY_MAX_FINGERPRINTS:
+                # Make room by dropping the one costing least so far.
+                del _entries[min(
+                    _entries,
+                    key=lambda other: _entries[other]['total_ms'],
+                )]
+            entry = _entries[key] = {
+                'count': 0,
+                'total_ms': 0.0,
+                'max_ms': 0.0,
+                'sites': {},
+                'explain': '',
+            }
+        entry['count'] += 1
+        entry['total_ms'] += elapsed_ms
+        if elapsed_ms >= entry['max_ms']:
+            entry['max_ms'] = elapsed_ms
+            entry['sql'] = sql
+            entry['params'] = repr(params)
+        if site in entry['sites'] or len(entry['sites']) < MAX_SITES:
+            entry['sites'][site] = entry['sites'].get(site, 0) + 1
+        needs_plan = not entry['explain'] and not many
+    if needs_plan:
+        plan = explain(
+            connection,
+            sql,
+            params,
+            analyze=settings.SLOW_QUERY_EXPLAIN_ANALYZE,
+        )
+        with _lock:
+            # The entry may have been flushed or dropped meanwhile.
+            if _entries.get(key) is entry and not entry['explain']:
+                entry['explain'] = plan
+
+
+def flush_if_due(**kwargs):
+    """Flush every SLOW_QUERY_FLUSH_SECONDS, outside of transactions.
+
+    Also connected to request_finished.
+    """
+    if (not _entries
+            or time.monotonic() - _last_flush
+            < settings.SLOW_QUERY_FLUSH_SECONDS
+            or connections['default'].in_atomic_block):
+        return
+    flush()
+
+
+def flush():
+    """Add the slow queries seen since the last flush to SlowQuery."""
+    from core.models import SlowQuery
+
+    global _last_flush
+    with _lock:
+        pending = dict(_entries)
+        _entries.clear()
+        _last_flush = time.monotonic()
+
+    _busy.active = True
+    try:
+        for key, entry in pending.items():
+            logger.warning(
+                'Slow query, %d times, %.0f ms max: %s',
+                entry['count'],
+                entry['max_ms'],
+                key,
+            )
+            with transaction.atomic():
+                slow, created = SlowQuery.objects.select_for_update(
+                ).get_or_create(
+                    digest=hashlib.sha256(key.encode()).hexdigest(),
+                    defaults={'fingerprint': key},
+                )
+                _merge(slow, entry)
+                slow.save()
+    finally:
+        _busy.active = False
+    return len(pending)
+
+
+def _merge(slow, entry):
+    slow.tables = ','.join(sorted(set(_TABLE_RE.findall(entry['sql']))))
+    slow.count += entry['count']
+    slow.total_ms += entry['total_ms']
+    if entry['max_ms'] >= slow.max_ms:
+        slow.max_ms = entry['max_ms']
+        slow.sample_sql = entry['sql']
+        slow.sample_params = entry['params']
+    for site, count in entry['sites'].items():
+        if site in slow.sites or len(slow.sites) < MAX_SITES:
+            slow.sites[site] = slow.sites.get(site, 0) + count
+    if entry['explain']:
+        slow.explain = entry['explain']
+        slow.full_scan = bool(_FULL_SCAN_RE.search(entry['explain']))
+
+
+def install(connection, **kwargs):
+    """Add record() to a new connection, for connection_created."""
+    if record not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record)
@@ -0,0 +1,141 @@
+"""
+Library statistics, maintained incrementally by core.signals.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from core.models import (
+    GenreStats,
+    LibraryStats,
+    Playlist,
+    PlaylistSong,
+    Song,
+    Tag,
+)
+
+
+def _bump(model, lookup, **deltas):
+    """Add deltas to the counters of the row matching lookup.
+
+    A missing row is only created when a playlist is added, so stats of
+    a user that is being deleted are never recreated.
+    """
+    changes = {field: F(field) + delta for field, delta in deltas.items()}
+    if model.objects.filter(**lookup).update(**changes):
+        return
+    if deltas.get('playlist_count', 0) <= 0:
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **deltas)
+    except IntegrityError:
+        # Created concurrently, add to that row instead.
+        model.objects.filter(**lookup).update(**changes)
+
+
+def count_playlist(user_id, genre, minutes, sign=1):
+    """Add (sign=1) or remove (sign=-1) a playlist from the stats."""
+    _bump(
+        LibraryStats,
+        {'user_id': user_id},
+        playlist_count=sign,
+        total_minutes=sign * minutes,
+    )
+    _bump(
+        GenreStats,
+        {'user_id': user_id, 'genre': genre},
+        playlist_count=sign,
+        total_minutes=sign * minutes,
+    )
+
+
+def change_playlist(before, after):
+    """Move a playlist from its `before` to its `after` stats.
+
+    Both are ``(user_id, genre, minutes)`` tuples.
+    """
+    if before == after:
+        return
+    if before[:2] != after[:2]:
+        count_playlist(*before, sign=-1)
+        count_playlist(*after)
+        return
+    user_id, genre, minutes = after
+    delta = minutes - before[2]
+    _bump(LibraryStats, {'user_id': user_id}, total_minutes=delta)
+    _bump(
+        GenreStats,
+        {'user_id': user_id, 'genre': genre},
+        total_minutes=delta,
+    )
+
+
+def count_links(queryset, delta):
+    """Add delta to the playlist count of the tags or songs in queryset."""
+    queryset.update(playlist_count=F('playlist_count') + delta)
+
+
+def rebuild_stats(user_ids=None):
+    """Recompute the stats of `user_ids`, or of every user, in bulk."""
+    playlists = Playlist.objects.order_by()
+    library_stats = LibraryStats.objects.all()
+    genre_stats = GenreStats.objects.all()
+    tags = Tag.objects.all()
+    songs = Song.objects.all()
+    if user_ids is not None:
+        playlists = playlists.filter(user_id__in=user_ids)
+        library_stats = library_stats.filter(user_id__in=user_ids)
+        genre_stats = genre_stats.filter(user_id__in=user_ids)
+        tags = tags.filter(user_id__in=user_ids)
+        songs = songs.filter(user_id__in=user_ids)
+
+    totals = {
+        'playlist_count': Count('id'),
+        'total_minutes': Coalesce(Sum('time_minutes'), 0),
+    }
+    # The user narrows the links to one partition, see PlaylistLink.
+    tag_links = Playlist.tags.through.objects.filter(
+        user_id=OuterRef('user_id'),
+        tag_id=OuterRef('pk'),
+        playlist__deleted_at__isnull=True,
+    ).order_by().values('tag_id').annotate(count=Count('playlist_id'))
+    song_links = PlaylistSong.objects.filter(
+        user_id=OuterRef('user_id'),
+        song_id=OuterRef('pk'),
+        playlist__deleted_at__isnull=True,
+    ).order_by().values('song_id').annotate(count=Count('playlist_id'))
+
+    with transaction.atomic():
+        library_stats.delete()
+        genre_stats.delete()
+        LibraryStats.objects.bulk_create(
+            [
+                LibraryStats(**row)
+                for row in playlists.values('user_id').annotate(**totals)
+            ],
+            batch_size=1000,
+        )
+        GenreStats.objects.bulk_create(
+            [
+                GenreStats(
+                    user_id=row['user_id'],
+                    genre=row['general_genre'],
+                    playlist_count=row['playlist_count'],
+                    total_minutes=row['total_minutes'],
+                )
+                for row in playlists.values(
+                    'user_id',
+                    'general_genre',
+                ).annotate(**totals)
+            ],
+            batch_size=1000,
+        )
+        tags.update(playlist_count=Coalesce(
+            Subquery(tag_links.values('count')),
+            0,
+        ))
+        songs.update(playlist_count=Coalesce(
+            Subquery(song_links.values('count')),
+            0,
+        ))
@@ -0,0 +1,149 @@
+"""
+Database backed background jobs.
+
+Functions decorated with ``@task()`` can be enqueued by name and are run
+by the run_workers command. Jobs are rows in the database, enqueued in
+the caller's transaction, so no broker is needed.
+"""
+import logging
+import traceback
+from datetime import timedelta
+
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from core import stats
+from core.models import Job
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+def task(name=None, max_attempts=3):
+    """Register a function as a task, under name or its dotted path."""
+    def register(func):
+        func.task_name = name or f'{func.__module__}.{func.__name__}'
+        func.max_attempts = max_attempts
+        _registry[func.task_name] = func
+        return func
+    return register
+
+
+def enqueue(func, key=None, delay=None, **kwargs):
+    """Add a job calling task func with kwargs and return it.
+
+    With a key the job is only added once: enqueueing it again returns
+    the job while it is queued or running, and queues it again with the
+    new kwargs once it has finished. Workers see the job once the caller
+    commits.
+    """
+    name = getattr(func, 'task_name', func)
+    if name not in _registry:
+        raise LookupError(f'Unknown task {name!r}')
+    fields = {
+        'name': name,
+        'kwargs': kwargs,
+        'max_attempts': _registry[name].max_attempts,
+        'run_after': timezone.now() + (delay or timedelta()),
+    }
+    if key is None:
+        return Job.objects.create(**fields)
+    try:
+        with transaction.atomic():
+            return Job.objects.create(key=key, **fields)
+    except IntegrityError:
+        pass
+    with transaction.atomic():
+        job = Job.objects.select_for_update().get(key=key)
+        if job.status in (Job.QUEUED, Job.RUNNING):
+            return job
+        fields.update(
+            status=Job.QUEUED,
+            attempts=0,
+            last_error='',
+            finished_at=None,
+        )
+        for field, value in fields.items():
+            setattr(job, field, value)
+        job.save(update_fields=fields)
+        return job
+
+
+def claim_jobs(limit, visibility_timeout):
+    """Claim up to limit due jobs for this worker.
+
+    Claimed jobs stay hidden from other workers for visibility_timeout.
+    If the worker dies the job is claimed again after that, unless it
+    is out of attempts.
+    """
+    now = timezone.now()
+    claimed = []
+    with transaction.atomic():
+        jobs = list(
+            Job.objects.select_for_update(skip_locked=True).filter(
+                status__in=[Job.QUEUED, Job.RUNNING],
+                run_after__lte=now,
+            ).order_by('run_after', 'id')[:limit]
+        )
+        for job in jobs:
+            if job.attempts >= job.max_attempts:
+                job.status = Job.FAILED
+                job.finished_at = now
+                job.last_error = 'Visibility timeout expired.'
+            else:
+                job.status = Job.RUNNING
+                job.attempts += 1
+                job.run_after = now + visibility_timeout
+                claimed.append(job)
+        Job.objects.bulk_update(
+            jobs,
+            ['status', 'attempts', 'run_after', 'finished_at', 'last_error'],
+        )
+    return claimed
+
+
+def run_job(job):
+    """Run a claimed job and record the outcome.
+
+    Failed jobs are retried with exponential backoff until they run out
+    of attempts.
+    """
+    func = _registry.get(job.name)
+    try:
+        if func is None:
+            raise LookupError(f'Unknown task {job.name!r}')
+        func(**job.kwargs)
+    except Exception:
+        logger.exception('Job %s failed', job)
+        changes = {'last_error': traceback.format_exc()}
+        if job.attempts < job.max_attempts:
+            changes['status'] = Job.QUEUED
+            changes['run_after'] = timezone.now() + timedelta(
+                seconds=2 ** job.attempts,
+            )
+        else:
+            changes['status'] = Job.FAILED
+            changes['finished_at'] = timezone.now()
+    else:
+        changes = {'status': Job.DONE, 'finished_at': timezone.now()}
+    # Skip the update if the job timed out and was claimed again.
+    Job.objects.filter(
+        pk=job.pk,
+        status=Job.RUNNING,
+        attempts=job.attempts,
+    ).update(**changes)
+
+
+def execute_job(job_id):
+    """Run claimed job job_id in a worker thread or process."""
+    try:
+        run_job(Job.objects.get(pk=job_id))
+    finally:
+        connection.close()
+
+
+@task(name='core.rebuild_stats')
+def rebuild_stats(user_ids=None):
+    """Recompute library stats in the background."""
+    stats.rebuild_stats(user_ids)
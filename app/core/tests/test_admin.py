@@ -1,7 +1,11 @@
+from unittest.mock import patch
+
 from django.test import TestCase, Client
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
+from core import admin, models
+
 
 class AdminSiteTests(TestCase):
     def setUp(self):
@@ -36,3 +40,116 @@ class AdminSiteTests(TestCase):
         res = self.client.get(url)
 
         self.assertEqual(res.status_code, 200)
+
+
+class LargeTableAdminTests(TestCase):
+    """Test the change lists of the big tables."""
+
+    def setUp(self):
+        self.client = Client()
+        self.admin_user = get_user_model().objects.create_superuser(
+            email="admin@example.com",
+            password="test123"
+        )
+        self.client.force_login(self.admin_user)
+        self.playlists = [
+            models.Playlist.objects.create(
+                user=self.admin_user,
+                title=f"Playlist {index}",
+                time_minutes=5,
+            )
+            for index in range(5)
+        ]
+
+    @patch.object(admin.PlaylistAdmin, "list_per_page", 2)
+    def test_keyset_pages(self):
+        """Test pages follow the id of the last row shown."""
+        url = reverse("admin:core_playlist_changelist")
+
+        res = self.client.get(url)
+
+        self.assertEqual(
+            list(res.context["cl"].result_list),
+            self.playlists[:2:-1],
+        )
+        self.assertContains(res, "About 5 playlists")
+        next_url = res.context["cl"].next_page_url
+        self.assertEqual(next_url, f"?id__lt={self.playlists[3].id}")
+
+        res = self.client.get(url + next_url)
+        self.assertEqual(
+            list(res.context["cl"].result_list),
+            self.playlists[2:0:-1],
+        )
+
+        res = self.client.get(url + res.context["cl"].next_page_url)
+        self.assertEqual(
+            list(res.context["cl"].result_list),
+            self.playlists[:1],
+        )
+        self.assertIsNone(res.context["cl"].next_page_url)
+        self.assertContains(res, "First page")
+
+    def test_filtered_lists(self):
+        """Test only searches and filters count as filtering, not pages."""
+        url = reverse("admin:core_playlist_changelist")
+        cases = [
+            ({}, False),
+            ({"id__lt": self.playlists[3].id}, False),
+            ({"q": "Road"}, True),
+            ({"user__id__exact": self.admin_user.id}, True),
+        ]
+        for params, filtered in cases:
+            with self.subTest(params=params):
+                res = self.client.get(url, params)
+
+                self.assertEqual(res.context["cl"].is_filtered(), filtered)
+
+        res = self.client.get(url, {"id__lt": self.playlists[3].id})
+        self.assertContains(res, "About 5 playlists")
+
+    def test_search_prefix(self):
+        """Test searching matches a title prefix."""
+        models.Playlist.objects.create(
+            user=self.admin_user,
+            title="Road trip",
+            time_minutes=5,
+        )
+        url = reverse("admin:core_playlist_changelist")
+
+        res = self.client.get(url, {"q": "Road"})
+
+        self.assertEqual(
+            [p.title for p in res.context["cl"].result_list],
+            ["Road trip"],
+        )
+
+    def test_song_list_queries(self):
+        """Test the song list doesn't query per row."""
+        for index in range(5):
+            models.Song.objects.create(
+                user=self.admin_user,
+                name=f"Song {index}",
+                artist=f"Artist {index}",
+            )
+        url = reverse("admin:core_song_changelist")
+        self.client.get(url)
+
+        # Session, user, the page and its bounded count.
+        with self.assertNumQueries(4):
+            res = self.client.get(url)
+
+        self.assertContains(res, "Artist 4")
+
+    def test_playlist_change_page(self):
+        """Test the change page uses raw id widgets for the user and tags."""
+        url = reverse(
+            "admin:core_playlist_change",
+            args=[self.playlists[0].id],
+        )
+
+        res = self.client.get(url)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertContains(res, 'class="vForeignKeyRawIdAdminField"')
+        self.assertContains(res, 'name="playlisttag_set-TOTAL_FORMS"')
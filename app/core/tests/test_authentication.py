@@ -0,0 +1,64 @@
+"""
+Tests for expiring token authentication.
+"""
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core import authentication
+from core.models import AuthToken
+
+ME_URL = reverse('user:me')
+
+
+@override_settings(AUTH_TOKEN_LAST_USED_FLUSH_SECONDS=3600)
+class LastUsedTests(TestCase):
+    """Test last use times are buffered and written in batches."""
+
+    def setUp(self):
+        authentication.flush_last_used()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'password123',
+        )
+        self.client = APIClient()
+
+    def test_requests_dont_write(self):
+        """Test authenticating only reads the token."""
+        token = AuthToken.objects.issue(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.client.get(ME_URL)
+
+        # Token with the user, then the user's throttle cost is free.
+        with self.assertNumQueries(1):
+            self.client.get(ME_URL)
+
+        token.refresh_from_db()
+        self.assertIsNone(token.last_used_at)
+
+    def test_flush_writes_batch(self):
+        """Test buffered uses of several tokens are written at once."""
+        tokens = [AuthToken.objects.issue(self.user) for _ in range(3)]
+        for token in tokens:
+            self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+            self.client.get(ME_URL)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(authentication.flush_last_used(), 3)
+
+        for token in tokens:
+            token.refresh_from_db()
+            self.assertIsNotNone(token.last_used_at)
+
+    @override_settings(AUTH_TOKEN_LAST_USED_FLUSH_SECONDS=0)
+    def test_flush_when_due(self):
+        """Test the buffer is flushed by a request once it is due."""
+        token = AuthToken.objects.issue(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        self.client.get(ME_URL)
+
+        token.refresh_from_db()
+        self.assertIsNotNone(token.last_used_at)
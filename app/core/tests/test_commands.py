@@ -1,34 +1,323 @@
 """
 Test custom Django management commands.
 """
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from subprocess import CompletedProcess
 from unittest.mock import patch
 
-from psycopg2 import OperationalError as Psycopg2OpError
-
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
-from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.core.management.base import CommandError
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from django.utils.connection import ConnectionDoesNotExist
+
+from core.models import (
+    AuthToken,
+    LibraryStats,
+    Playlist,
+    Song,
+    Tag,
+)
+from core.management.commands.startup_profile import (
+    group_by_package,
+    parse_importtime,
+)
 
 
-@patch('core.management.commands.wait_for_db.Command.check')
+@patch('core.management.commands.wait_for_db.connections')
+@patch('core.management.commands.wait_for_db.check_database')
 class CommandTests(SimpleTestCase):
     """Test commands."""
 
-    def test_wait_for_db_ready(self, patched_check):
+    def test_wait_for_db_ready(self, patched_check, patched_connections):
         """Test waiting for database if database ready."""
         patched_check.return_value = True
 
-        call_command('wait_for_db')
+        call_command('wait_for_db', stdout=StringIO())
 
-        patched_check.assert_called_once_with(databases=['default'])
+        patched_check.assert_called_once_with('default')
 
     @patch('time.sleep')
-    def test_wait_for_db_delay(self, patched_sleep, patched_check):
-        """Test waiting for database when getting OperationalError."""
-        patched_check.side_effect = [Psycopg2OpError] * 2 + \
-                                    [OperationalError] * 3 + [True]
+    def test_wait_for_db_delay(self, patched_sleep, patched_check,
+                               patched_connections):
+        """Test waiting for database when it is unavailable."""
+        patched_check.side_effect = [False] * 5 + [True]
 
-        call_command('wait_for_db')
+        call_command('wait_for_db', stdout=StringIO())
 
         self.assertEqual(patched_check.call_count, 6)
-        patched_check.assert_called_with(databases=['default'])
+        patched_check.assert_called_with('default')
+        delays = [call.args[0] for call in patched_sleep.call_args_list]
+        self.assertTrue(all(0 <= delay <= 5 for delay in delays))
+
+    @patch('time.sleep')
+    def test_wait_for_db_timeout(self, patched_sleep, patched_check,
+                                 patched_connections):
+        """Test an error is raised once the timeout is exceeded."""
+        patched_check.return_value = False
+
+        with self.assertRaises(CommandError):
+            call_command('wait_for_db', timeout=0, stdout=StringIO())
+
+        patched_sleep.assert_not_called()
+
+    def test_wait_for_multiple_databases(self, patched_check,
+                                         patched_connections):
+        """Test waiting for several database aliases."""
+        patched_check.return_value = True
+
+        call_command(
+            'wait_for_db',
+            '--database', 'default',
+            '--database', 'replica',
+            stdout=StringIO(),
+        )
+
+        checked = {call.args[0] for call in patched_check.call_args_list}
+        self.assertEqual(checked, {'default', 'replica'})
+
+    def test_wait_for_unknown_database(self, patched_check,
+                                       patched_connections):
+        """Test an unknown alias is an error before anything is polled."""
+        patched_connections.__getitem__.side_effect = ConnectionDoesNotExist
+
+        with self.assertRaisesMessage(CommandError, 'Unknown database "nope"'):
+            call_command(
+                'wait_for_db',
+                '--database', 'nope',
+                stdout=StringIO(),
+            )
+
+        patched_check.assert_not_called()
+
+
+class BuildSchemaCommandTests(SimpleTestCase):
+    """Test pre-generating the OpenAPI schema."""
+
+    def test_build_schema_writes_file(self):
+        """Test the schema is written to the given file."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'schema.json')
+
+            call_command('build_schema', file=path, stdout=StringIO())
+
+            with open(path) as schema_file:
+                content = json.load(schema_file)
+
+        self.assertIn('openapi', content)
+        self.assertIn('/api/playlist/playlists/', content['paths'])
+
+    @override_settings(SCHEMA_CACHE_FILE=None)
+    def test_build_schema_requires_file(self):
+        """Test an error is raised without somewhere to write to."""
+        with self.assertRaises(CommandError):
+            call_command('build_schema', stdout=StringIO())
+
+    @override_settings(API_ONLY=True)
+    def test_build_schema_refused_for_api_role(self):
+        """Test API only processes don't build the schema full ones serve."""
+        with self.assertRaises(CommandError):
+            call_command('build_schema', file='unused.json', stdout=StringIO())
+
+
+class StartupProfileCommandTests(SimpleTestCase):
+    """Test profiling process startup."""
+
+    def test_parse_importtime(self):
+        """Test parsing -X importtime output."""
+        output = '\n'.join([
+            'import time: self [us] | cumulative | imported package',
+            'import time:       120 |        120 |     PIL._version',
+            'import time:       300 |        420 |   PIL',
+            'import time:      1000 |       1000 | django.contrib.admin',
+            'unrelated line',
+        ])
+
+        timings = parse_importtime(output)
+
+        self.assertEqual(timings, {
+            'PIL._version': 120,
+            'PIL': 300,
+            'django.contrib.admin': 1000,
+        })
+
+    def test_group_by_package(self):
+        """Test module timings are summed under the longest package."""
+        timings = {
+            'django.db': 10,
+            'django.contrib.admin.sites': 20,
+            'django.contrib.admin': 5,
+            'rest_framework.authtoken.models': 7,
+        }
+
+        totals = group_by_package(
+            timings,
+            ['django.contrib.admin', 'rest_framework.authtoken'],
+        )
+
+        self.assertEqual(totals['django.contrib.admin'], (2, 25))
+        self.assertEqual(totals['rest_framework.authtoken'], (1, 7))
+        self.assertEqual(totals['django'], (1, 10))
+
+    @patch('core.management.commands.startup_profile.subprocess.run')
+    def test_startup_profile_report(self, patched_run):
+        """Test the report lists phases and the slowest packages."""
+        patched_run.return_value = CompletedProcess(
+            args=[],
+            returncode=0,
+            stdout=json.dumps({
+                'setup_ms': 100.0,
+                'urlconf_ms': 50.0,
+                'total_ms': 150.0,
+                'max_rss_kb': 51200,
+            }),
+            stderr='import time:     2000 |       2000 | drf_spectacular\n',
+        )
+        out = StringIO()
+
+        call_command('startup_profile', role='api', stdout=out)
+
+        env = patched_run.call_args.kwargs['env']
+        self.assertEqual(env['APP_ROLE'], 'api')
+        self.assertIn('-X', patched_run.call_args.args[0])
+        self.assertIn('150.0 ms', out.getvalue())
+        self.assertIn('50.0 MB', out.getvalue())
+        self.assertIn('drf_spectacular', out.getvalue())
+
+
+class BenchmarkCommandTests(TestCase):
+    """Test benchmarking on a generated library."""
+
+    def test_benchmark_filters(self):
+        """Test the filters suite reports every case and rolls back."""
+        out = StringIO()
+
+        call_command(
+            'benchmark',
+            'filters',
+            playlists=20,
+            tags=5,
+            songs=10,
+            tags_per_playlist=2,
+            songs_per_playlist=3,
+            repeat=1,
+            stdout=out,
+        )
+
+        self.assertIn('tags, match=all', out.getvalue())
+        self.assertIn('songs, join + distinct', out.getvalue())
+        self.assertFalse(Playlist.objects.exists())
+
+    def test_benchmark_logins(self):
+        """Test the logins suite reports a rate and rolls back."""
+        out = StringIO()
+
+        call_command('benchmark', 'logins', logins=4, threads=2, stdout=out)
+
+        self.assertIn('/s per core', out.getvalue())
+        self.assertFalse(get_user_model().objects.exists())
+
+
+class CleanupTokensCommandTests(TestCase):
+    """Test deleting expired tokens."""
+
+    def test_cleanup_tokens(self):
+        """Test expired tokens are deleted in chunks, others kept."""
+        user = get_user_model().objects.create_user(
+            'user@example.com',
+            'password123',
+        )
+        valid = AuthToken.objects.issue(user)
+        for _ in range(5):
+            AuthToken.objects.issue(user)
+        AuthToken.objects.exclude(pk=valid.pk).update(
+            expires_at=timezone.now() - timedelta(days=1),
+        )
+        out = StringIO()
+
+        call_command('cleanup_tokens', batch_size=2, stdout=out)
+
+        self.assertEqual(list(AuthToken.objects.all()), [valid])
+        self.assertIn('5 expired tokens deleted', out.getvalue())
+
+
+class SeedLibraryCommandTests(TestCase):
+    """Test generating synthetic libraries."""
+
+    def seed(self, *args):
+        """Seed in a rolled back transaction, return what was added."""
+        with transaction.atomic():
+            call_command(
+                'seed_library',
+                '--users=5',
+                '--catalog=50',
+                '--artists=5',
+                '--processes=0',
+                '--playlists=uniform:1:4',
+                '--songs=10',
+                *args,
+                stdout=StringIO(),
+            )
+            library = [
+                (
+                    playlist.user.email,
+                    playlist.title,
+                    playlist.time_minutes,
+                    playlist.general_genre,
+                    sorted(tag.name for tag in playlist.tags.all()),
+                    [song.name for song in playlist.ordered_songs],
+                )
+                for playlist in Playlist.objects.order_by('user__email', 'id')
+            ]
+            transaction.set_rollback(True)
+        return library
+
+    def test_deterministic(self):
+        """Test the same seed gives the same data, however it's split."""
+        library = self.seed('--seed=7', '--chunk-size=1')
+
+        self.assertTrue(library)
+        self.assertEqual(self.seed('--seed=7', '--chunk-size=3'), library)
+        self.assertNotEqual(self.seed('--seed=8'), library)
+
+    def test_counters_kept(self):
+        """Test usage counters and stats match the generated rows."""
+        call_command(
+            'seed_library',
+            '--users=3',
+            '--catalog=20',
+            '--artists=2',
+            '--processes=0',
+            stdout=StringIO(),
+        )
+
+        for tag in Tag.objects.all():
+            self.assertEqual(tag.playlist_count, tag.playlist_set.count())
+        for song in Song.objects.all():
+            self.assertEqual(song.playlist_count, song.playlist_set.count())
+        for user in get_user_model().objects.all():
+            self.assertEqual(
+                LibraryStats.objects.get(user=user).playlist_count,
+                Playlist.objects.filter(user=user).count(),
+            )
+
+    def test_seed_twice_error(self):
+        """Test seeding the same seed again is refused."""
+        call_command('seed_library', '--users=1', '--catalog=5',
+                     '--processes=0', stdout=StringIO())
+
+        with self.assertRaises(CommandError):
+            call_command('seed_library', '--users=1', '--catalog=5',
+                         '--processes=0', stdout=StringIO())
+
+    def test_bad_distribution_error(self):
+        """Test counts must be N, uniform:LOW:HIGH or exp:MEAN."""
+        with self.assertRaises(CommandError):
+            call_command('seed_library', '--playlists=normal:5',
+                         '--processes=0', stdout=StringIO())
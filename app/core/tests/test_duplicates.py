@@ -0,0 +1,181 @@
+"""
+Tests for finding and merging duplicate songs.
+"""
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+
+from core import models
+from core.duplicates import find_duplicates
+
+
+def create_user(email="user@example.com", password="password123"):
+    """Create and return a new user."""
+    return get_user_model().objects.create_user(email, password)
+
+
+class MatchNameTests(SimpleTestCase):
+    """Test names are reduced to what tells songs apart."""
+
+    def test_release_suffixes_dropped(self):
+        """Test remaster and version suffixes are removed."""
+        for name in [
+            "Don't Stop (Remastered)",
+            "Don't Stop - 2011 Remaster",
+            "Dont  Stop [Mono Version] (Remastered 2009)",
+        ]:
+            self.assertEqual(models.match_name(name), "dont stop")
+
+    def test_other_suffixes_kept(self):
+        """Test suffixes telling recordings apart are kept."""
+        self.assertEqual(models.match_name("Song (Live)"), "song live")
+        self.assertEqual(models.match_name("Song - Acoustic"), "song acoustic")
+
+    def test_accents_and_symbols(self):
+        """Test accents and symbols are normalized."""
+        self.assertEqual(models.match_name("Café & Bar!"), "cafe and bar")
+
+
+class FindDuplicatesTests(TestCase):
+    """Test duplicate songs of a library are grouped."""
+
+    def setUp(self):
+        self.user = create_user()
+
+    def create_song(self, name, artist="Band"):
+        return models.Song.objects.create(
+            user=self.user,
+            name=name,
+            artist=artist,
+        )
+
+    def test_track_match_key(self):
+        """Test the catalog keeps variants apart but with one match key."""
+        first = models.Track.objects.resolve("Song (Remastered)", "Band")
+        second = models.Track.objects.resolve("song", "band")
+
+        self.assertNotEqual(first.key, second.key)
+        self.assertEqual(first.match_key, second.match_key)
+
+    def test_groups(self):
+        """Test variants and typos are grouped, other songs are not."""
+        song = self.create_song("Dont Stop Believin")
+        remaster = self.create_song("Don't Stop Believin' (Remastered)")
+        typo = self.create_song("Dont Stop Beleivin")
+        self.create_song("Dont Stop Believin", artist="Other band")
+        self.create_song("Symphony No. 5")
+        self.create_song("Symphony No. 6")
+        self.create_song("Intro")
+        self.create_song("Outro")
+        other_user_song = models.Song.objects.create(
+            user=create_user("other@example.com"),
+            name="Dont Stop Believin",
+            artist="Band",
+        )
+
+        groups = find_duplicates(self.user)
+
+        self.assertEqual(
+            [[s.id for s in group] for group in groups],
+            [[song.id, remaster.id, typo.id]],
+        )
+        self.assertNotIn(other_user_song, groups[0])
+
+    def test_numbered_songs(self):
+        """Test only real numbers and roman numerals tell songs apart."""
+        part1 = self.create_song("Symphony Part II")
+        self.create_song("Symphony Part III")
+        civil_war = self.create_song("Civil War Anthem")
+        typo = self.create_song("Civel War Anthem")
+        self.create_song("Civil War (Live)")
+        summer = self.create_song("Summer Mix Anthem")
+        summer_typo = self.create_song("Sumer Mix Anthem")
+
+        groups = find_duplicates(self.user)
+
+        self.assertEqual(
+            sorted([s.id for s in group] for group in groups),
+            [[civil_war.id, typo.id], [summer.id, summer_typo.id]],
+        )
+        self.assertNotIn(part1.id, [s.id for group in groups for s in group])
+
+    def test_keep_most_used_first(self):
+        """Test the song on most playlists comes first."""
+        first = self.create_song("Song")
+        used = self.create_song("Song (Remastered)")
+        playlist = models.Playlist.objects.create(
+            user=self.user,
+            title="Sample",
+            time_minutes=5,
+        )
+        playlist.songs.add(used)
+
+        [group] = find_duplicates(self.user)
+
+        self.assertEqual([s.id for s in group], [used.id, first.id])
+
+
+class MergeSongsTests(TestCase):
+    """Test merging songs moves their playlist links."""
+
+    def setUp(self):
+        self.user = create_user()
+        self.keep, self.dup1, self.dup2, self.other = [
+            models.Song.objects.create(user=self.user, name=name)
+            for name in ["Song", "Song (Remastered)", "Song!", "Other"]
+        ]
+
+    def create_playlist(self, *songs):
+        playlist = models.Playlist.objects.create(
+            user=self.user,
+            title="Sample",
+            time_minutes=5,
+        )
+        for song in songs:
+            playlist.songs.add(
+                song,
+                through_defaults={"position": playlist.next_song_position()},
+            )
+        return playlist
+
+    def song_ids(self, playlist):
+        return list(playlist.ordered_songs.values_list("id", flat=True))
+
+    def test_merge(self):
+        """Test links move, keep their place and are never doubled."""
+        with_keep = self.create_playlist(self.dup1, self.keep, self.dup2)
+        without = self.create_playlist(self.other, self.dup2, self.dup1)
+        models.ChangeLog.objects.all().delete()
+
+        self.keep.merge([self.dup1.id, self.dup2.id])
+
+        self.assertEqual(self.song_ids(with_keep), [self.keep.id])
+        self.assertEqual(
+            self.song_ids(without),
+            [self.other.id, self.keep.id],
+        )
+        self.keep.refresh_from_db()
+        self.assertEqual(self.keep.playlist_count, 2)
+        self.assertFalse(
+            models.Song.objects.filter(id__in=[self.dup1.id, self.dup2.id]),
+        )
+        self.assertEqual(
+            models.Song.all_objects.get(id=self.dup1.id).playlist_count,
+            0,
+        )
+        self.assertTrue(
+            models.ChangeLog.objects.filter(
+                kind="playlist",
+                object_id=without.id,
+            ).exists()
+        )
+
+    def test_merge_other_users_song_ignored(self):
+        """Test songs of other users are left alone."""
+        other_song = models.Song.objects.create(
+            user=create_user("other@example.com"),
+            name="Song",
+        )
+
+        self.keep.merge([other_song.id])
+
+        self.assertTrue(models.Song.objects.filter(id=other_song.id))
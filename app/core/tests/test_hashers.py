@@ -0,0 +1,48 @@
+"""
+Tests for the configurable password hashers.
+"""
+import threading
+
+from django.contrib.auth.hashers import (
+    check_password,
+    get_hasher,
+    make_password,
+)
+from django.test import SimpleTestCase, override_settings
+
+from core import hashers
+
+
+@override_settings(
+    PASSWORD_HASHERS=['core.hashers.PBKDF2PasswordHasher'],
+    PASSWORD_HASH_ITERATIONS=1000,
+)
+class PBKDF2PasswordHasherTests(SimpleTestCase):
+    """Test the PBKDF2 hasher with a configured cost."""
+
+    def test_iterations_from_settings(self):
+        """Test passwords are hashed with the configured iterations."""
+        encoded = make_password("secret")
+
+        self.assertTrue(encoded.startswith("pbkdf2_sha256$1000$"))
+        self.assertTrue(check_password("secret", encoded))
+        self.assertFalse(check_password("wrong", encoded))
+
+    def test_other_iterations_rehashed(self):
+        """Test hashes with another cost verify and need an update."""
+        encoded = get_hasher().encode("secret", "salt" * 6, 500)
+        rehashed = []
+
+        self.assertTrue(check_password("secret", encoded, rehashed.append))
+        self.assertEqual(rehashed, ["secret"])
+
+    def test_hashing_in_pool(self):
+        """Test hashing runs on the bounded pool's threads."""
+        threads = []
+
+        def hash_password():
+            threads.append(threading.current_thread().name)
+            return "hashed"
+
+        self.assertEqual(hashers.run_hashing(hash_password), "hashed")
+        self.assertTrue(threads[0].startswith("password-hash"))
@@ -0,0 +1,50 @@
+"""
+Tests for the health probe endpoints.
+"""
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.health import check_database
+
+LIVE_URL = reverse('core:live')
+READY_URL = reverse('core:ready')
+
+
+class HealthApiTests(TestCase):
+    """Test the liveness and readiness probes."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_live(self):
+        """Test liveness does not need authentication."""
+        res = self.client.get(LIVE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), {'status': 'ok'})
+
+    def test_ready(self):
+        """Test readiness reports reachable databases."""
+        res = self.client.get(READY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json()['databases'], {'default': True})
+
+    @patch('core.views.check_database')
+    def test_ready_database_unavailable(self, patched_check):
+        """Test readiness fails when a database is unreachable."""
+        patched_check.return_value = False
+
+        res = self.client.get(READY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res.json()['status'], 'unavailable')
+
+    def test_check_database(self):
+        """Test the probe itself succeeds against the test database."""
+        self.assertTrue(check_database('default'))
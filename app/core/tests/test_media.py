@@ -0,0 +1,162 @@
+"""
+Tests for content addressed media and gc_media.
+"""
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from core.models import MediaBlob, Playlist
+
+
+def create_playlist(user, **params):
+    """Create and return a sample playlist."""
+    return Playlist.objects.create(
+        user=user,
+        title='Sample',
+        time_minutes=10,
+        **params,
+    )
+
+
+@override_settings(STORAGES={
+    'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'},
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+})
+class MediaBlobTests(TestCase):
+    """Test images are stored once and released when unused."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+
+    def set_image(self, playlist, content, name='cover.jpg'):
+        playlist.image = ContentFile(content, name=name)
+        playlist.save()
+        return playlist.image.name
+
+    def gc_media(self, *args):
+        out = StringIO()
+        call_command('gc_media', '--grace', '0', *args, stdout=out)
+        return out.getvalue()
+
+    def test_identical_images_share_a_blob(self):
+        """Test the same content uploaded twice is stored once."""
+        first = self.set_image(create_playlist(self.user), b'image')
+        second = self.set_image(create_playlist(self.user), b'image', 'b.JPG')
+
+        self.assertEqual(first, second)
+        self.assertTrue(first.startswith('blobs/'))
+        blob = MediaBlob.objects.get()
+        self.assertEqual(blob.name, first)
+        self.assertEqual(blob.ref_count, 2)
+        self.assertEqual(blob.size, 5)
+
+    def test_replace_and_delete_release_references(self):
+        """Test replacing or deleting an image decrements its count."""
+        playlist = create_playlist(self.user)
+        other = create_playlist(self.user)
+        old = self.set_image(playlist, b'old')
+        self.set_image(other, b'old')
+
+        new = self.set_image(playlist, b'new')
+        self.assertEqual(MediaBlob.objects.get(name=old).ref_count, 1)
+        self.assertEqual(MediaBlob.objects.get(name=new).ref_count, 1)
+
+        playlist.soft_delete()
+        self.assertEqual(MediaBlob.objects.get(name=new).ref_count, 1)
+        Playlist.all_objects.filter(pk=playlist.pk).get().delete()
+        other.delete()
+        self.assertEqual(MediaBlob.objects.get(name=new).ref_count, 0)
+        self.assertEqual(MediaBlob.objects.get(name=old).ref_count, 0)
+
+    def test_saving_other_fields_keeps_references(self):
+        """Test saving a playlist without a new image changes no count."""
+        playlist = create_playlist(self.user)
+        name = self.set_image(playlist, b'image')
+
+        playlist.title = 'Renamed'
+        playlist.save()
+
+        self.assertEqual(MediaBlob.objects.get(name=name).ref_count, 1)
+
+    def test_gc_media_deletes_unreferenced_blobs(self):
+        """Test gc_media deletes blobs and files nothing points at."""
+        playlist = create_playlist(self.user)
+        old = self.set_image(playlist, b'old')
+        new = self.set_image(playlist, b'new')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            out = self.gc_media()
+
+        self.assertIn('1 files deleted.', out)
+        self.assertFalse(MediaBlob.objects.filter(name=old).exists())
+        self.assertFalse(default_storage.exists(old))
+        self.assertTrue(default_storage.exists(new))
+
+    def test_gc_media_waits_for_the_grace_period(self):
+        """Test recently released blobs are kept."""
+        playlist = create_playlist(self.user)
+        old = self.set_image(playlist, b'old')
+        self.set_image(playlist, b'new')
+
+        call_command('gc_media', stdout=StringIO())
+
+        self.assertTrue(MediaBlob.objects.filter(name=old).exists())
+        self.assertTrue(default_storage.exists(old))
+
+    def test_gc_media_keeps_blobs_still_used(self):
+        """Test a blob with a wrong count is kept while referenced."""
+        name = self.set_image(create_playlist(self.user), b'image')
+        MediaBlob.objects.update(ref_count=0)
+
+        self.gc_media()
+
+        self.assertTrue(MediaBlob.objects.filter(name=name).exists())
+
+    def test_stored_again_after_collection(self):
+        """Test an upload of collected content stores the file again."""
+        playlist = create_playlist(self.user)
+        name = self.set_image(playlist, b'image')
+        playlist.delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.gc_media()
+
+        again = self.set_image(create_playlist(self.user), b'image')
+
+        self.assertEqual(again, name)
+        self.assertTrue(default_storage.exists(name))
+        self.assertEqual(MediaBlob.objects.get().ref_count, 1)
+
+    def test_scan_storage_deletes_stray_files(self):
+        """Test --scan-storage deletes files without a blob or playlist."""
+        kept = self.set_image(create_playlist(self.user), b'kept')
+        legacy = default_storage.save(
+            'uploads/playlist/legacy.jpg',
+            ContentFile(b'legacy'),
+        )
+        create_playlist(self.user, image=legacy)
+        stray = default_storage.save('blobs/ab/stray.jpg', ContentFile(b'x'))
+        old_upload = default_storage.save(
+            'uploads/playlist/old.jpg',
+            ContentFile(b'y'),
+        )
+        MediaBlob.objects.update(
+            ref_changed_at=timezone.now() - timedelta(days=1),
+        )
+
+        self.gc_media('--scan-storage')
+
+        self.assertFalse(default_storage.exists(stray))
+        self.assertFalse(default_storage.exists(old_upload))
+        self.assertTrue(default_storage.exists(kept))
+        self.assertTrue(default_storage.exists(legacy))
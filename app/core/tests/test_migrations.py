@@ -0,0 +1,95 @@
+"""
+Tests for migrations with hand written SQL.
+"""
+from unittest import skipUnless
+
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+BEFORE = [('core', '0021_playlist_links_user')]
+PARTITIONED = [('core', '0022_partition_playlist_links')]
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Postgres only')
+class PartitionLinksMigrationTests(TransactionTestCase):
+    """Test the link tables are partitioned by user and back."""
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        self.migrate(executor.loader.graph.leaf_nodes())
+
+    def partitions(self, table):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT count(*) FROM pg_inherits '
+                'WHERE inhparent = %s::regclass',
+                [table],
+            )
+            return cursor.fetchone()[0]
+
+    def test_partition_and_back(self):
+        """Test rows, ids and constraints survive both directions."""
+        apps = self.migrate(BEFORE)
+        user = apps.get_model('core', 'User').objects.create(
+            email='user@example.com',
+        )
+        playlist = apps.get_model('core', 'Playlist').objects.create(
+            user=user,
+            title='Sample',
+            time_minutes=5,
+        )
+        song, other_song = [
+            apps.get_model('core', 'Song').objects.create(
+                user=user,
+                track=apps.get_model('core', 'Track').objects.create(
+                    name=name,
+                    key=name,
+                ),
+            )
+            for name in ['Song', 'Other song']
+        ]
+        apps.get_model('core', 'PlaylistSong').objects.create(
+            user=user,
+            playlist=playlist,
+            song=song,
+        )
+
+        apps = self.migrate(PARTITIONED)
+
+        self.assertEqual(self.partitions('core_playlist_songs'), 16)
+        self.assertEqual(self.partitions('core_playlist_tags'), 16)
+        links = apps.get_model('core', 'PlaylistSong').objects
+        self.assertEqual(links.get().song_id, song.id)
+        link = links.create(
+            user_id=user.id,
+            playlist_id=playlist.id,
+            song_id=other_song.id,
+            position=1,
+        )
+        self.assertGreater(link.id, links.order_by('id').first().id)
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor,
+                'core_playlist_songs',
+            )
+        self.assertTrue(constraints['core_playlistsong_unique']['unique'])
+        self.assertIn(
+            ('core_song', 'id'),
+            [c['foreign_key'] for c in constraints.values()],
+        )
+        link.delete()
+
+        self.migrate(BEFORE)
+
+        self.assertEqual(self.partitions('core_playlist_songs'), 0)
+        self.assertEqual(
+            apps.get_model('core', 'PlaylistSong').objects.count(),
+            1,
+        )
@@ -83,6 +83,136 @@ class ModelTests(TestCase):
 
         self.assertEqual(str(song), song.name)
 
+    def test_songs_share_catalog_track(self):
+        """Test the same song of different users is stored once."""
+        user1 = create_user()
+        user2 = create_user(email="user2@example.com")
+        song1 = models.Song.objects.create(
+            user=user1,
+            name="Song1",
+            artist="Artist1",
+        )
+        song2 = models.Song.objects.create(
+            user=user2,
+            name=" song1 ",
+            artist="ARTIST1",
+        )
+
+        self.assertNotEqual(song1.id, song2.id)
+        self.assertEqual(song1.track, song2.track)
+        self.assertEqual(models.Track.objects.count(), 1)
+        self.assertEqual(song2.name, "Song1")
+
+    def test_tracks_share_artist(self):
+        """Test spelling variants of an artist resolve to one artist."""
+        user = create_user()
+        song1 = models.Song.objects.create(
+            user=user,
+            name="Song1",
+            artist="The  Band",
+        )
+        song2 = models.Song.objects.create(
+            user=user,
+            name="Song2",
+            artist="the band",
+        )
+        song3 = models.Song.objects.create(user=user, name="Song3")
+
+        self.assertEqual(song1.track.artist, song2.track.artist)
+        self.assertEqual(models.Artist.objects.count(), 1)
+        self.assertIsNone(song3.track.artist)
+        self.assertEqual(song3.artist, "")
+
+    def test_playlist_links_store_user(self):
+        """Test links get the user of their playlist, however added."""
+        user = create_user()
+        playlist = models.Playlist.objects.create(
+            user=user,
+            title="Sample",
+            time_minutes=5,
+        )
+        tag = models.Tag.objects.create(user=user, name="Tag1")
+        song1 = models.Song.objects.create(user=user, name="Song1")
+        song2 = models.Song.objects.create(user=user, name="Song2")
+
+        playlist.tags.add(tag)
+        playlist.songs.add(song1)
+        models.PlaylistSong.objects.create(playlist=playlist, song=song2)
+
+        self.assertEqual(
+            list(models.PlaylistTag.objects.values_list("user", flat=True)),
+            [user.id],
+        )
+        self.assertEqual(
+            list(models.PlaylistSong.objects.values_list("user", flat=True)),
+            [user.id, user.id],
+        )
+        self.assertEqual(
+            list(playlist.ordered_songs.values_list("id", flat=True)),
+            [song1.id, song2.id],
+        )
+
+    def test_playlist_links_follow_owner(self):
+        """Test changing the owner of a playlist moves its links."""
+        user = create_user()
+        playlist = models.Playlist.objects.create(
+            user=user,
+            title="Sample",
+            time_minutes=5,
+        )
+        playlist.tags.add(models.Tag.objects.create(user=user, name="Tag1"))
+        song = models.Song.objects.create(user=user, name="Song1")
+        playlist.songs.add(song)
+        new_owner = create_user("new@example.com")
+
+        playlist.user = new_owner
+        playlist.save()
+
+        for model in (models.PlaylistTag, models.PlaylistSong):
+            self.assertEqual(
+                list(model.objects.values_list("user", flat=True)),
+                [new_owner.id],
+            )
+        self.assertEqual(list(playlist.ordered_songs), [song])
+        self.assertTrue(
+            models.ChangeLog.objects.filter(
+                user=user,
+                object_id=playlist.id,
+                action=models.ChangeLog.DELETE,
+            ).exists()
+        )
+
+    def test_stale_save_keeps_playlist_deleted(self):
+        """Test saving a playlist loaded before its deletion is skipped."""
+        user = create_user()
+        playlist = models.Playlist.objects.create(
+            user=user,
+            title="Sample",
+            time_minutes=5,
+        )
+        tag = models.Tag.objects.create(user=user, name="Tag1")
+        stale_playlist = models.Playlist.objects.get(pk=playlist.pk)
+        stale_tag = models.Tag.objects.get(pk=tag.pk)
+        playlist.soft_delete()
+        tag.soft_delete()
+
+        stale_playlist.title = "Renamed"
+        stale_playlist.save()
+        stale_tag.save()
+
+        self.assertFalse(models.Playlist.objects.exists())
+        self.assertFalse(models.Tag.objects.exists())
+        self.assertEqual(
+            models.Playlist.all_objects.get().title,
+            "Sample",
+        )
+        self.assertEqual(user.library_stats.playlist_count, 0)
+        self.assertEqual(
+            models.ChangeLog.objects.filter(object_id=playlist.id).last()
+            .action,
+            models.ChangeLog.DELETE,
+        )
+
     @patch('core.models.uuid.uuid4')
     def test_playlist_file_name_uuid(self, mock_uuid):
         """Test generating image path."""
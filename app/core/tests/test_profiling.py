@@ -0,0 +1,137 @@
+"""
+Tests for profiling requests.
+"""
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import profiling
+from core.models import Playlist, ProfileRecord, Tag
+
+PLAYLISTS_URL = reverse('playlist:playlist-list')
+PROFILES_URL = reverse('core:profiles')
+TOKEN_URL = reverse('core:profile-token')
+
+
+def profile_url(profile_id):
+    return reverse('core:profile', args=[profile_id])
+
+
+class ProfilingTests(TestCase):
+    """Test requests are profiled only when asked to."""
+
+    def setUp(self):
+        self.admin = get_user_model().objects.create_superuser(
+            'admin@example.com',
+            'testpass123',
+        )
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        playlist = Playlist.objects.create(
+            user=self.user,
+            title='Sample',
+            time_minutes=5,
+        )
+        playlist.tags.add(Tag.objects.create(user=self.user, name='Tag'))
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get_playlists(self, **headers):
+        return self.client.get(PLAYLISTS_URL, **headers)
+
+    def test_not_profiled_by_default(self):
+        """Test requests without a token are not recorded."""
+        res = self.get_playlists()
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn('X-Profile-Id', res)
+        self.assertFalse(ProfileRecord.objects.exists())
+
+    def test_profiled_with_token(self):
+        """Test a request with a token is recorded in detail."""
+        token = profiling.issue_token(self.admin)
+
+        res = self.get_playlists(HTTP_X_PROFILE=token)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        record = ProfileRecord.objects.get(pk=res['X-Profile-Id'])
+        self.assertEqual(record.user, self.user)
+        self.assertEqual(record.path, PLAYLISTS_URL)
+        self.assertEqual(record.status_code, 200)
+        self.assertGreater(record.query_count, 0)
+        self.assertEqual(len(record.queries), record.query_count)
+        self.assertIn('playlist', record.queries[0]['sql'].lower())
+        self.assertEqual(record.fields['PlaylistSerializer.tags']['calls'], 1)
+        self.assertIn('PlaylistSerializer.title', record.fields)
+        self.assertIn('function calls', record.stats)
+
+    def test_profiled_response_unchanged(self):
+        """Test profiling gives the same data as a normal request."""
+        res = self.get_playlists()
+        profiled = self.get_playlists(
+            HTTP_X_PROFILE=profiling.issue_token(self.admin),
+        )
+
+        self.assertEqual(profiled.json(), res.json())
+
+    def test_bad_or_expired_token_ignored(self):
+        """Test tokens not signed here or too old don't profile."""
+        self.get_playlists(HTTP_X_PROFILE='forged')
+        with override_settings(PROFILING_TOKEN_MAX_AGE=-1):
+            self.get_playlists(
+                HTTP_X_PROFILE=profiling.issue_token(self.admin),
+            )
+
+        self.assertFalse(ProfileRecord.objects.exists())
+
+    @override_settings(PROFILING_EXPLAIN_MS=0)
+    def test_slow_queries_explained(self):
+        """Test slow SELECT queries get their plan."""
+        self.get_playlists(HTTP_X_PROFILE=profiling.issue_token(self.admin))
+
+        record = ProfileRecord.objects.get()
+        selects = [
+            query for query in record.queries
+            if query['sql'].startswith('SELECT')
+        ]
+        self.assertTrue(selects)
+        for query in selects:
+            self.assertTrue(query['explain'])
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_sampled(self):
+        """Test requests picked by the sample rate are profiled."""
+        res = self.get_playlists()
+
+        self.assertIn('X-Profile-Id', res)
+
+    def test_profile_endpoints_superuser_only(self):
+        """Test other users can't get tokens or see profiles."""
+        res = self.client.post(TOKEN_URL)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+        res = self.client.get(PROFILES_URL)
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_superuser_profiles_a_request(self):
+        """Test a superuser can get a token and read the profile it made."""
+        self.client.force_authenticate(self.admin)
+        res = self.client.post(TOKEN_URL)
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['header'], 'X-Profile')
+
+        self.client.force_authenticate(self.user)
+        profiled = self.get_playlists(HTTP_X_PROFILE=res.data['token'])
+
+        self.client.force_authenticate(self.admin)
+        res = self.client.get(PROFILES_URL, {'user': self.user.pk})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data), 1)
+        self.assertNotIn('queries', res.data[0])
+        res = self.client.get(profile_url(profiled['X-Profile-Id']))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn('PlaylistSerializer.songs', res.data['fields'])
+        self.assertTrue(res.data['queries'])
@@ -0,0 +1,102 @@
+"""
+Tests for the cached OpenAPI schema.
+"""
+import gzip
+import json
+import os
+import tempfile
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import schema
+
+SCHEMA_URL = reverse('api-schema')
+
+
+class SchemaApiTests(TestCase):
+    """Test serving the schema from the cache."""
+
+    def setUp(self):
+        self.client = APIClient()
+        schema.clear_schema_cache()
+        self.addCleanup(schema.clear_schema_cache)
+
+    def test_schema_generated_once(self):
+        """Test the schema is only introspected on the first request."""
+        with patch(
+            'core.schema.generate_schema',
+            wraps=schema.generate_schema,
+        ) as patched_generate:
+            res1 = self.client.get(SCHEMA_URL)
+            res2 = self.client.get(SCHEMA_URL)
+
+        self.assertEqual(res1.status_code, status.HTTP_200_OK)
+        self.assertEqual(res1.content, res2.content)
+        patched_generate.assert_called_once()
+
+    def test_schema_not_modified(self):
+        """Test a matching If-None-Match returns 304."""
+        res = self.client.get(SCHEMA_URL)
+        etag = res['ETag']
+
+        res = self.client.get(SCHEMA_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res.content, b'')
+
+    def test_schema_gzip(self):
+        """Test the schema is compressed when the client accepts gzip."""
+        plain = self.client.get(SCHEMA_URL, {'format': 'json'})
+        res = self.client.get(
+            SCHEMA_URL,
+            {'format': 'json'},
+            HTTP_ACCEPT_ENCODING='gzip, deflate',
+        )
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', res['Vary'])
+        self.assertNotEqual(res['ETag'], plain['ETag'])
+        self.assertEqual(gzip.decompress(res.content), plain.content)
+
+    def test_schema_unknown_version(self):
+        """Test versions outside SCHEMA_VERSIONS are refused uncached."""
+        res = self.client.get(SCHEMA_URL, {'version': 'nope'})
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(schema._schemas, {})
+        self.assertEqual(schema._documents, {})
+
+    @override_settings(SCHEMA_VERSIONS=['v2'])
+    def test_schema_allowed_version(self):
+        """Test versions in SCHEMA_VERSIONS are served."""
+        res = self.client.get(SCHEMA_URL, {'version': 'v2'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertIn(('v2', None), schema._schemas)
+
+    def test_schema_loaded_from_prebuilt_file(self):
+        """Test a schema written by build_schema is served as is."""
+        prebuilt = {'openapi': '3.0.3', 'info': {'title': 'Prebuilt'}}
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'schema.json')
+            with open(path, 'w') as schema_file:
+                json.dump(prebuilt, schema_file)
+
+            with override_settings(SCHEMA_CACHE_FILE=path), \
+                    patch('core.schema.generate_schema') as patched_generate:
+                res = self.client.get(SCHEMA_URL, {'format': 'json'})
+
+        self.assertEqual(json.loads(res.content), prebuilt)
+        patched_generate.assert_not_called()
+
+    def test_warm_schema_cache_raises(self):
+        """Test warming up propagates errors generating the schema."""
+        with patch('core.schema.generate_schema') as patched_generate:
+            patched_generate.side_effect = RuntimeError
+            with self.assertRaises(RuntimeError):
+                schema.warm_schema_cache()
@@ -0,0 +1,197 @@
+"""
+Tests for serving media and static files.
+"""
+import gzip
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.test import SimpleTestCase, override_settings
+
+from core.serving import parse_range
+from core.storage import CompressedManifestStaticFilesStorage
+
+IN_MEMORY = {
+    'default': {'BACKEND': 'django.core.files.storage.InMemoryStorage'},
+    'staticfiles': {'BACKEND': 'django.core.files.storage.InMemoryStorage'},
+}
+DIGEST = 'ab' * 32
+BLOB = f'blobs/ab/{DIGEST}.jpg'
+
+
+class ParseRangeTests(SimpleTestCase):
+    """Test parsing Range headers."""
+
+    def test_ranges(self):
+        """Test the byte ranges of a 100 byte file."""
+        self.assertEqual(parse_range('bytes=0-9', 100), (0, 9))
+        self.assertEqual(parse_range('bytes=90-', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=-10', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=50-500', 100), (50, 99))
+        self.assertEqual(parse_range('bytes=-500', 100), (0, 99))
+
+    def test_whole_file(self):
+        """Test missing, invalid and multiple ranges send everything."""
+        headers = ['', 'bytes=5-1', 'bytes=-', 'items=0-1', 'bytes=0-1,5-6']
+        for header in headers:
+            with self.subTest(header=header):
+                self.assertIsNone(parse_range(header, 100))
+
+    def test_unsatisfiable(self):
+        """Test ranges outside the file raise ValueError."""
+        for header in ['bytes=100-', 'bytes=-0']:
+            with self.subTest(header=header):
+                with self.assertRaises(ValueError):
+                    parse_range(header, 100)
+
+
+@override_settings(STORAGES=IN_MEMORY)
+class ServeMediaTests(SimpleTestCase):
+    """Test the media view."""
+
+    def setUp(self):
+        default_storage.save(BLOB, ContentFile(b'0123456789'))
+        self.url = f'/static/media/{BLOB}'
+
+    def tearDown(self):
+        default_storage.delete(BLOB)
+
+    def test_blob_is_immutable(self):
+        """Test blobs are cached for good, with the digest as ETag."""
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(b''.join(res.streaming_content), b'0123456789')
+        self.assertEqual(res['ETag'], f'"{DIGEST}"')
+        self.assertIn('immutable', res['Cache-Control'])
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+        self.assertEqual(res['Accept-Ranges'], 'bytes')
+
+    def test_if_none_match(self):
+        """Test a cached copy is confirmed without the body."""
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH=f'"{DIGEST}"')
+
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res['ETag'], f'"{DIGEST}"')
+        self.assertIn('immutable', res['Cache-Control'])
+
+    def test_range(self):
+        """Test a byte range is sent as partial content."""
+        res = self.client.get(self.url, HTTP_RANGE='bytes=2-5')
+
+        self.assertEqual(res.status_code, 206)
+        self.assertEqual(b''.join(res.streaming_content), b'2345')
+        self.assertEqual(res['Content-Range'], 'bytes 2-5/10')
+        self.assertEqual(res['Content-Length'], '4')
+
+    def test_range_with_stale_if_range(self):
+        """Test a range for an older version sends the whole file."""
+        res = self.client.get(
+            self.url,
+            HTTP_RANGE='bytes=2-5',
+            HTTP_IF_RANGE='"other"',
+        )
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(b''.join(res.streaming_content), b'0123456789')
+
+    def test_unsatisfiable_range(self):
+        """Test a range past the end is refused."""
+        res = self.client.get(self.url, HTTP_RANGE='bytes=10-')
+
+        self.assertEqual(res.status_code, 416)
+        self.assertEqual(res['Content-Range'], 'bytes */10')
+
+    def test_missing_and_outside_files(self):
+        """Test unknown names and paths out of the storage are not found."""
+        for path in ['blobs/missing.jpg', '../settings.py']:
+            with self.subTest(path=path):
+                res = self.client.get(f'/static/media/{path}')
+                self.assertEqual(res.status_code, 404)
+
+    @override_settings(MEDIA_ACCEL_REDIRECT='/internal/media/')
+    def test_accel_redirect(self):
+        """Test the proxy is asked to send the file."""
+        res = self.client.get(self.url)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.content, b'')
+        self.assertEqual(res['X-Accel-Redirect'], f'/internal/media/{BLOB}')
+        self.assertIn('immutable', res['Cache-Control'])
+
+    def test_post_not_allowed(self):
+        """Test media can only be read."""
+        res = self.client.post(self.url)
+
+        self.assertEqual(res.status_code, 405)
+
+
+@override_settings(STORAGES=IN_MEMORY)
+class ServeStaticTests(SimpleTestCase):
+    """Test the static view."""
+
+    def setUp(self):
+        self.content = b'body { color: red; }' * 10
+        staticfiles_storage.save('app.0123456789ab.css',
+                                 ContentFile(self.content))
+        staticfiles_storage.save('app.0123456789ab.css.gz',
+                                 ContentFile(gzip.compress(self.content)))
+        staticfiles_storage.save('plain.css', ContentFile(self.content))
+
+    def tearDown(self):
+        for name in ['app.0123456789ab.css', 'app.0123456789ab.css.gz',
+                     'plain.css']:
+            staticfiles_storage.delete(name)
+
+    def test_precompressed(self):
+        """Test the gzipped copy is sent to clients accepting it."""
+        res = self.client.get(
+            '/static/static/app.0123456789ab.css',
+            HTTP_ACCEPT_ENCODING='gzip, br',
+        )
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        self.assertEqual(res['Content-Type'], 'text/css')
+        self.assertIn('Accept-Encoding', res['Vary'])
+        self.assertIn('immutable', res['Cache-Control'])
+        body = gzip.decompress(b''.join(res.streaming_content))
+        self.assertEqual(body, self.content)
+
+    def test_uncompressed(self):
+        """Test clients not accepting gzip get the file itself."""
+        res = self.client.get('/static/static/app.0123456789ab.css')
+
+        self.assertNotIn('Content-Encoding', res)
+        self.assertIn('Accept-Encoding', res['Vary'])
+        self.assertEqual(b''.join(res.streaming_content), self.content)
+
+    def test_unhashed_name_revalidates(self):
+        """Test names without a content hash are checked on each use."""
+        res = self.client.get('/static/static/plain.css')
+
+        self.assertEqual(res['Cache-Control'], 'no-cache')
+
+
+class CompressedStaticStorageTests(SimpleTestCase):
+    """Test collected static files get gzipped copies."""
+
+    def test_post_process_compresses_text(self):
+        """Test hashed text files are compressed, small ones skipped."""
+        with tempfile.TemporaryDirectory() as location:
+            storage = CompressedManifestStaticFilesStorage(location=location)
+            storage.save('app.css', ContentFile(b'a { color: red; }' * 50))
+            storage.save('tiny.js', ContentFile(b'1'))
+            paths = {name: (storage, name) for name in ['app.css', 'tiny.js']}
+
+            list(storage.post_process(paths))
+
+            hashed = storage.stored_name('app.css')
+            with storage.open(f'{hashed}.gz') as file:
+                self.assertEqual(
+                    gzip.decompress(file.read()),
+                    b'a { color: red; }' * 50,
+                )
+            self.assertFalse(
+                storage.exists(f'{storage.stored_name("tiny.js")}.gz'),
+            )
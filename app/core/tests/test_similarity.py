@@ -0,0 +1,240 @@
+"""
+Tests for the playlist MinHash signatures.
+"""
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from core import models, similarity
+from core.similarity import update_signatures
+from core.tasks import claim_jobs, enqueue, run_job
+
+
+def create_user(email="user@example.com", password="password123"):
+    """Create and return a new user."""
+    return get_user_model().objects.create_user(email, password)
+
+
+def create_playlist(user, **params):
+    """Create and return a sample playlist."""
+    defaults = {"title": "Sample playlist", "time_minutes": 10}
+    defaults.update(params)
+    return models.Playlist.objects.create(user=user, **defaults)
+
+
+def run_jobs():
+    """Run the queued jobs, and those they queue, until none are left."""
+    while True:
+        jobs = claim_jobs(100, timedelta(minutes=5))
+        if not jobs:
+            break
+        for job in jobs:
+            run_job(job)
+
+
+def estimate(first, second):
+    return float((first == second).mean())
+
+
+class SignatureTests(SimpleTestCase):
+    """Test signatures estimate the Jaccard similarity."""
+
+    def test_same_sets_match(self):
+        """Test the same songs and tags give the same signature."""
+        self.assertEqual(
+            similarity.signature([3, 1, 2], [7]).tolist(),
+            similarity.signature([1, 2, 3], [7]).tolist(),
+        )
+
+    def test_estimates_overlap(self):
+        """Test the share of equal values is close to the overlap."""
+        first = similarity.signature(range(0, 200), [])
+        second = similarity.signature(range(100, 300), [])
+        other = similarity.signature(range(1000, 1200), [])
+
+        # The sets share a third of their union.
+        self.assertAlmostEqual(estimate(first, second), 1 / 3, delta=0.12)
+        self.assertLess(estimate(first, other), 0.05)
+
+    def test_songs_and_tags_differ(self):
+        """Test a song and a tag with the same id are different items."""
+        self.assertLess(
+            estimate(
+                similarity.signature([5], []),
+                similarity.signature([], [5]),
+            ),
+            0.1,
+        )
+
+    def test_empty(self):
+        """Test playlists without links have no signature."""
+        self.assertIsNone(similarity.signature([], []))
+
+    def test_bucket_key_per_band(self):
+        """Test equal bands in different places get different keys."""
+        keys = similarity.bucket_keys(
+            similarity.signature([1], []).clip(0, 0),
+        )
+
+        self.assertEqual(len(keys), similarity.BANDS)
+        self.assertEqual(len(set(keys)), similarity.BANDS)
+
+
+class SignatureUpdateTests(TestCase):
+    """Test signatures follow the playlist links."""
+
+    def setUp(self):
+        self.user = create_user()
+        self.songs = [
+            models.Song.objects.create(user=self.user, name=f"Song {index}")
+            for index in range(4)
+        ]
+        self.tag = models.Tag.objects.create(user=self.user, name="Loud")
+
+    def signature_of(self, playlist):
+        row = models.PlaylistSignature.objects.get(playlist=playlist)
+        return similarity._load(row.minhash).tolist()
+
+    def test_updated_in_background(self):
+        """Test changed links queue one signature job per playlist."""
+        playlist = create_playlist(self.user)
+
+        playlist.songs.add(*self.songs[:2])
+        playlist.tags.add(self.tag)
+
+        self.assertFalse(models.PlaylistSignature.objects.exists())
+        self.assertEqual(
+            models.Job.objects.get().key,
+            f"playlist-signature:{playlist.id}",
+        )
+        run_jobs()
+        self.assertEqual(
+            self.signature_of(playlist),
+            similarity.signature(
+                [song.id for song in self.songs[:2]],
+                [self.tag.id],
+            ).tolist(),
+        )
+        self.assertEqual(
+            models.PlaylistBucket.objects.filter(
+                playlist=playlist,
+                user=self.user,
+            ).count(),
+            similarity.BANDS,
+        )
+
+    def test_removed_links_update(self):
+        """Test removing links or deleting a tag updates the signature."""
+        playlist = create_playlist(self.user)
+        playlist.songs.add(*self.songs[:2])
+        playlist.tags.add(self.tag)
+        run_jobs()
+
+        playlist.songs.remove(self.songs[0])
+        self.tag.delete()
+        run_jobs()
+
+        self.assertEqual(
+            self.signature_of(playlist),
+            similarity.signature([self.songs[1].id], []).tolist(),
+        )
+
+    def test_cleared_playlist_unsigned(self):
+        """Test a playlist left without links loses its signature."""
+        playlist = create_playlist(self.user)
+        playlist.songs.add(self.songs[0])
+        run_jobs()
+
+        playlist.songs.clear()
+        run_jobs()
+
+        self.assertFalse(
+            models.PlaylistSignature.objects.filter(playlist=playlist),
+        )
+        self.assertFalse(
+            models.PlaylistBucket.objects.filter(playlist=playlist),
+        )
+
+    def test_similar_ranked(self):
+        """Test similar playlists come by overlap, without the others."""
+        target = create_playlist(self.user)
+        close = create_playlist(self.user)
+        far = create_playlist(self.user)
+        unrelated = create_playlist(self.user)
+        hidden = create_playlist(self.user)
+        other_user = create_playlist(create_user("other@example.com"))
+        target.songs.add(*self.songs)
+        close.songs.add(*self.songs)
+        far.songs.add(self.songs[0])
+        hidden.songs.add(*self.songs)
+        unrelated.tags.add(self.tag)
+        other_user.songs.add(*self.songs)
+        run_jobs()
+        hidden.soft_delete()
+
+        ranked = similarity.similar(target, 10)
+
+        self.assertEqual([pk for pk, _ in ranked][:1], [close.id])
+        self.assertEqual(ranked[0][1], 1.0)
+        self.assertNotIn(target.id, dict(ranked))
+        self.assertNotIn(unrelated.id, dict(ranked))
+        self.assertNotIn(hidden.id, dict(ranked))
+        self.assertNotIn(other_user.id, dict(ranked))
+
+    def test_change_while_running_queues_again(self):
+        """Test a change made while the job runs gets a job of its own."""
+        playlist = create_playlist(self.user)
+        playlist.songs.add(self.songs[0])
+        job = claim_jobs(1, timedelta(minutes=5))[0]
+
+        def change_links(playlist_ids):
+            update_signatures(playlist_ids)
+            playlist.songs.add(self.songs[1])
+
+        with patch.object(similarity, "update_signatures", change_links):
+            run_job(job)
+        run_jobs()
+
+        self.assertEqual(
+            self.signature_of(playlist),
+            similarity.signature(
+                [self.songs[0].id, self.songs[1].id],
+                [],
+            ).tolist(),
+        )
+
+    def test_rebuild_task(self):
+        """Test the rebuild queued by migration signs every playlist."""
+        playlists = [create_playlist(self.user) for _ in range(3)]
+        models.PlaylistSong.objects.bulk_create([
+            models.PlaylistSong(playlist=playlist, song=self.songs[0])
+            for playlist in playlists
+        ])
+
+        enqueue(similarity.rebuild_signatures, batch_size=2)
+        run_jobs()
+
+        self.assertEqual(
+            models.PlaylistSignature.objects.count(),
+            len(playlists),
+        )
+
+    def test_rebuild_command(self):
+        """Test the command signs playlists whose links skipped signals."""
+        playlist = create_playlist(self.user)
+        models.PlaylistSong.objects.bulk_create([
+            models.PlaylistSong(playlist=playlist, song=self.songs[0]),
+        ])
+        out = StringIO()
+
+        call_command("rebuild_signatures", stdout=out)
+
+        self.assertEqual(
+            self.signature_of(playlist),
+            similarity.signature([self.songs[0].id], []).tolist(),
+        )
+        self.assertIn("1 playlists", out.getvalue())
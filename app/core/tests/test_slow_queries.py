@@ -0,0 +1,141 @@
+"""
+Tests for the slow query log.
+"""
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from core import slow_queries
+from core.models import Playlist, SlowQuery, Tag
+
+PLAYLISTS_URL = reverse('playlist:playlist-list')
+
+
+class FingerprintTests(SimpleTestCase):
+    """Test queries are grouped by their shape."""
+
+    def test_values_replaced(self):
+        """Test literals, placeholders and lists are replaced."""
+        sql = (
+            'SELECT "core_tag"."id" FROM "core_tag" WHERE "core_tag"."id" '
+            "IN (%s, %s, %s) AND name = 'it''s'\n  LIMIT 21"
+        )
+
+        self.assertEqual(
+            slow_queries.fingerprint(sql),
+            'SELECT "core_tag"."id" FROM "core_tag" WHERE "core_tag"."id" '
+            'IN (...) AND name = ? LIMIT ?',
+        )
+
+    def test_rows_collapsed(self):
+        """Test inserts of any number of rows share a fingerprint."""
+        one = 'INSERT INTO "core_tag" ("name") VALUES (%s)'
+        many = 'INSERT INTO "core_tag" ("name") VALUES (%s), (%s), (%s)'
+
+        self.assertEqual(
+            slow_queries.fingerprint(one),
+            slow_queries.fingerprint(many),
+        )
+
+
+@override_settings(SLOW_QUERY_MS=0)
+class SlowQueryLogTests(TestCase):
+    """Test slow queries are aggregated and stored."""
+
+    def setUp(self):
+        # Only installed at startup when SLOW_QUERY_MS is set.
+        slow_queries.install(connection)
+        self.addCleanup(
+            connection.execute_wrappers.remove,
+            slow_queries.record,
+        )
+        slow_queries._entries.clear()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        playlist = Playlist.objects.create(
+            user=self.user,
+            title='Sample',
+            time_minutes=5,
+        )
+        playlist.tags.add(Tag.objects.create(user=self.user, name='Tag'))
+        slow_queries._entries.clear()
+
+    def tearDown(self):
+        slow_queries._entries.clear()
+
+    def test_request_queries_stored(self):
+        """Test queries of a request are grouped with call site and plan."""
+        client = APIClient()
+        client.force_authenticate(self.user)
+        client.get(PLAYLISTS_URL)
+        client.get(PLAYLISTS_URL)
+
+        with self.assertLogs('core.slow_queries', 'WARNING'):
+            self.assertGreater(slow_queries.flush(), 0)
+
+        tags = SlowQuery.objects.get(
+            tables__contains='core_playlist_tags',
+            fingerprint__startswith='SELECT',
+        )
+        self.assertEqual(tags.count, 2)
+        self.assertIn('IN (...)', tags.fingerprint)
+        self.assertTrue(tags.explain)
+        [site] = tags.sites
+        self.assertIn('PlaylistViewSet.list', site)
+        self.assertIn('PlaylistSerializer', site)
+        self.assertIn('playlist/views.py', site)
+
+    def test_flush_adds_to_stored_counts(self):
+        """Test later flushes add to the same rows."""
+        for _ in range(2):
+            list(Playlist.objects.filter(time_minutes=5))
+            with self.assertLogs('core.slow_queries', 'WARNING'):
+                slow_queries.flush()
+        self.assertFalse(slow_queries._entries)
+
+        slow = SlowQuery.objects.get(
+            tables='core_playlist',
+            fingerprint__contains='"time_minutes" = ?',
+        )
+        self.assertEqual(slow.count, 2)
+        self.assertTrue(slow.full_scan)
+        self.assertIn('core/tests/test_slow_queries.py', list(slow.sites)[0])
+
+    def test_fast_queries_ignored(self):
+        """Test queries under the threshold are not kept."""
+        with self.settings(SLOW_QUERY_MS=10000):
+            list(Playlist.objects.all())
+
+        self.assertFalse(slow_queries._entries)
+
+    @override_settings(SLOW_QUERY_MAX_FINGERPRINTS=2)
+    def test_bounded(self):
+        """Test only so many fingerprints are kept in memory."""
+        list(Playlist.objects.filter(title='a'))
+        list(Tag.objects.filter(name='a'))
+        list(Playlist.objects.filter(time_minutes=1))
+
+        self.assertEqual(len(slow_queries._entries), 2)
+
+    def test_plan_of_flushed_entry_dropped(self):
+        """Test a plan finished after its entry was flushed is not kept."""
+        def flushed_meanwhile(*args, **kwargs):
+            stale.update(slow_queries._entries)
+            slow_queries._entries.clear()
+            return 'plan'
+
+        stale = {}
+        with patch('core.slow_queries.explain', flushed_meanwhile):
+            list(Playlist.objects.filter(title='a'))
+
+        self.assertFalse(slow_queries._entries)
+        self.assertEqual(
+            [entry['explain'] for entry in stale.values()],
+            [''],
+        )
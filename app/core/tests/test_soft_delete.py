@@ -0,0 +1,119 @@
+"""
+Tests for soft deletes and purging deleted rows.
+"""
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from core import models
+
+
+def create_user(email="user@example.com", password="password123"):
+    """Create and return a new user."""
+    return get_user_model().objects.create_user(email, password)
+
+
+def create_playlist(user, **params):
+    """Create and return a sample playlist."""
+    defaults = {"title": "Sample playlist", "time_minutes": 10}
+    defaults.update(params)
+    return models.Playlist.objects.create(user=user, **defaults)
+
+
+class SoftDeleteTests(TestCase):
+    """Test soft deleted objects are hidden but kept."""
+
+    def setUp(self):
+        self.user = create_user()
+        self.playlist = create_playlist(self.user)
+        self.tag = models.Tag.objects.create(user=self.user, name="Tag1")
+        self.song = models.Song.objects.create(user=self.user, name="Song1")
+        self.playlist.tags.add(self.tag)
+        self.playlist.songs.add(self.song)
+
+    def test_soft_delete_hides_object(self):
+        """Test deleted objects and their links are hidden."""
+        self.tag.soft_delete()
+        self.song.soft_delete()
+
+        self.assertFalse(models.Tag.objects.exists())
+        self.assertTrue(models.Tag.all_objects.exists())
+        self.assertFalse(self.playlist.tags.exists())
+        self.assertFalse(self.playlist.ordered_songs.exists())
+        self.assertEqual(
+            models.Playlist.tags.through.objects.count(),
+            1,
+        )
+
+    def test_soft_delete_playlist_updates_stats(self):
+        """Test a deleted playlist leaves the stats at once, and only once."""
+        self.playlist.soft_delete()
+        self.playlist.soft_delete()
+
+        stats = models.LibraryStats.objects.get(user=self.user)
+        self.assertEqual(stats.playlist_count, 0)
+        self.tag.refresh_from_db()
+        self.assertEqual(self.tag.playlist_count, 0)
+
+        call_command("purge_deleted", stdout=StringIO())
+
+        stats.refresh_from_db()
+        self.assertEqual(stats.playlist_count, 0)
+        self.song.refresh_from_db()
+        self.assertEqual(self.song.playlist_count, 0)
+
+    def test_song_can_be_added_again(self):
+        """Test a deleted song does not block adding it back."""
+        self.song.soft_delete()
+
+        song = models.Song.objects.create(user=self.user, name="Song1")
+
+        self.assertNotEqual(song.id, self.song.id)
+
+    def test_purge_deleted(self):
+        """Test purging removes deleted rows and their links."""
+        other = create_playlist(self.user, title="Other")
+        other.songs.add(self.song)
+        self.song.soft_delete()
+        self.playlist.soft_delete()
+        out = StringIO()
+
+        call_command("purge_deleted", stdout=out)
+
+        self.assertFalse(models.Playlist.all_objects.filter(
+            pk=self.playlist.pk,
+        ).exists())
+        self.assertFalse(models.Song.all_objects.exists())
+        self.assertFalse(models.PlaylistSong.objects.exists())
+        self.assertTrue(models.Tag.objects.exists())
+        self.assertTrue(models.Playlist.objects.filter(pk=other.pk).exists())
+        self.assertIn("Deleting playlist songs: 2", out.getvalue())
+
+    def test_purge_deleted_user(self):
+        """Test purging a deleted user removes all of its data."""
+        self.user.soft_delete()
+
+        call_command("purge_deleted", batch_size=1, stdout=StringIO())
+
+        self.assertFalse(get_user_model().objects.exists())
+        self.assertFalse(models.Playlist.all_objects.exists())
+        self.assertFalse(models.Tag.all_objects.exists())
+        self.assertFalse(models.Song.all_objects.exists())
+        self.assertFalse(models.ChangeLog.objects.exists())
+
+    def test_purge_resumes(self):
+        """Test a purge picks up the rows an interrupted run left."""
+        for index in range(3):
+            create_playlist(self.user, title=f"Playlist {index}")
+        for playlist in models.Playlist.objects.all():
+            playlist.soft_delete()
+        # An interrupted run deleted the links of one playlist only.
+        models.PlaylistSong.objects.filter(playlist=self.playlist).delete()
+
+        out = StringIO()
+        call_command("purge_deleted", batch_size=2, stdout=out)
+
+        self.assertFalse(models.Playlist.all_objects.exists())
+        self.assertIn("Deleting playlists: 4", out.getvalue())
@@ -0,0 +1,155 @@
+"""
+Tests for the incrementally maintained library stats.
+"""
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from core import models
+from core.stats import rebuild_stats
+
+
+def create_user(email="user@example.com", password="password123"):
+    """Create and return a new user."""
+    return get_user_model().objects.create_user(email, password)
+
+
+def create_playlist(user, **params):
+    """Create and return a sample playlist."""
+    defaults = {
+        "title": "Sample playlist",
+        "time_minutes": 10,
+        "general_genre": "rock",
+    }
+    defaults.update(params)
+    return models.Playlist.objects.create(user=user, **defaults)
+
+
+class StatsTests(TestCase):
+    """Test the stats follow playlist and tag changes."""
+
+    def setUp(self):
+        self.user = create_user()
+
+    def assertStats(self, playlist_count, total_minutes, genres):
+        stats = models.LibraryStats.objects.get(user=self.user)
+        self.assertEqual(
+            (stats.playlist_count, stats.total_minutes),
+            (playlist_count, total_minutes),
+        )
+        self.assertEqual(
+            dict(
+                models.GenreStats.objects.filter(
+                    user=self.user,
+                    playlist_count__gt=0,
+                ).values_list("genre", "total_minutes")
+            ),
+            genres,
+        )
+
+    def assertTagCounts(self, *tags):
+        for tag, expected in tags:
+            tag.refresh_from_db()
+            self.assertEqual(tag.playlist_count, expected, tag.name)
+
+    def test_playlist_create_update_delete(self):
+        """Test stats follow a playlist through its lifetime."""
+        playlist = create_playlist(self.user)
+        create_playlist(self.user, time_minutes=5, general_genre="")
+        self.assertStats(2, 15, {"rock": 10, "": 5})
+
+        playlist.time_minutes = 20
+        playlist.save()
+        self.assertStats(2, 25, {"rock": 20, "": 5})
+
+        playlist.general_genre = "jazz"
+        playlist.save()
+        self.assertStats(2, 25, {"jazz": 20, "": 5})
+
+        playlist.delete()
+        self.assertStats(1, 5, {"": 5})
+
+    def test_tag_counts(self):
+        """Test tag counts follow links added and removed either way."""
+        playlist1 = create_playlist(self.user)
+        playlist2 = create_playlist(self.user)
+        tag1 = models.Tag.objects.create(user=self.user, name="Tag1")
+        tag2 = models.Tag.objects.create(user=self.user, name="Tag2")
+
+        playlist1.tags.add(tag1, tag2)
+        playlist1.tags.add(tag1)
+        tag1.playlist_set.add(playlist2)
+        self.assertTagCounts((tag1, 2), (tag2, 1))
+
+        playlist2.tags.remove(tag1, tag2)
+        self.assertTagCounts((tag1, 1), (tag2, 1))
+
+        playlist1.tags.clear()
+        self.assertTagCounts((tag1, 0), (tag2, 0))
+
+        tag1.playlist_set.add(playlist1, playlist2)
+        tag1.playlist_set.remove(playlist1)
+        self.assertTagCounts((tag1, 1))
+
+        playlist2.delete()
+        self.assertTagCounts((tag1, 0))
+
+    def test_duplicate_and_merge(self):
+        """Test copying links with raw SQL keeps the counts."""
+        tag = models.Tag.objects.create(user=self.user, name="Tag1")
+        song = models.Song.objects.create(user=self.user, name="Song1")
+        source = create_playlist(self.user)
+        source.tags.add(tag)
+        source.songs.add(song)
+        target = create_playlist(self.user, general_genre="jazz")
+
+        source.duplicate()
+        target.merge([source.id], delete_sources=True)
+
+        self.assertTagCounts((tag, 2))
+        song.refresh_from_db()
+        self.assertEqual(song.playlist_count, 2)
+        self.assertStats(2, 20, {"rock": 10, "jazz": 10})
+
+    def test_delete_user(self):
+        """Test deleting a user does not recreate its stats."""
+        create_playlist(self.user)
+
+        self.user.delete()
+
+        self.assertFalse(models.LibraryStats.objects.exists())
+        self.assertFalse(models.GenreStats.objects.exists())
+
+    def test_rebuild_matches_incremental(self):
+        """Test a rebuild gives the same stats as the signals."""
+        tag = models.Tag.objects.create(user=self.user, name="Tag1")
+        create_playlist(self.user).tags.add(tag)
+        create_playlist(self.user, time_minutes=3, general_genre="jazz")
+        other = create_user(email="other@example.com")
+        create_playlist(other)
+        models.LibraryStats.objects.filter(user=self.user).update(
+            playlist_count=0,
+            total_minutes=0,
+        )
+        models.Tag.objects.update(playlist_count=7)
+
+        rebuild_stats([self.user.id])
+
+        self.assertStats(2, 13, {"rock": 10, "jazz": 3})
+        self.assertTagCounts((tag, 1))
+        self.assertEqual(
+            models.LibraryStats.objects.get(user=other).playlist_count,
+            1,
+        )
+
+    def test_rebuild_stats_command(self):
+        """Test the command recounts every user."""
+        create_playlist(self.user)
+        models.LibraryStats.objects.all().delete()
+        models.GenreStats.objects.all().delete()
+
+        call_command("rebuild_stats", stdout=StringIO())
+
+        self.assertStats(1, 10, {"rock": 10})
@@ -0,0 +1,145 @@
+"""
+Tests for the background job queue.
+"""
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from core.models import Job
+from core.tasks import claim_jobs, enqueue, run_job, task
+
+TIMEOUT = timedelta(minutes=5)
+calls = []
+
+
+@task(name='tests.record', max_attempts=2)
+def record(value):
+    """Task remembering the values it was called with."""
+    calls.append(value)
+
+
+@task(name='tests.fail', max_attempts=2)
+def fail():
+    """Task that always fails."""
+    raise RuntimeError('Boom')
+
+
+class TaskTests(TestCase):
+    """Test enqueueing, claiming and running jobs."""
+
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_idempotent(self):
+        """Test enqueueing with a known key returns the existing job."""
+        job1 = enqueue(record, key='once', value=1)
+        job2 = enqueue(record, key='once', value=2)
+
+        self.assertEqual(job1.id, job2.id)
+        self.assertEqual(Job.objects.count(), 1)
+        self.assertEqual(job1.kwargs, {'value': 1})
+
+    def test_enqueue_finished_requeued(self):
+        """Test enqueueing a finished job's key queues it again."""
+        job = enqueue(record, key='once', value=1)
+        run_job(claim_jobs(10, TIMEOUT)[0])
+
+        again = enqueue(record, key='once', value=2)
+
+        self.assertEqual(again.id, job.id)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertEqual(job.attempts, 0)
+        self.assertIsNone(job.finished_at)
+        run_job(claim_jobs(10, TIMEOUT)[0])
+        self.assertEqual(calls, [1, 2])
+
+    def test_enqueue_unknown_task(self):
+        """Test enqueueing a task that is not registered fails."""
+        with self.assertRaises(LookupError):
+            enqueue('tests.missing')
+
+    def test_run_job(self):
+        """Test a claimed job runs once and is marked done."""
+        enqueue(record, value=1)
+
+        jobs = claim_jobs(10, TIMEOUT)
+        self.assertEqual(claim_jobs(10, TIMEOUT), [])
+        run_job(jobs[0])
+
+        self.assertEqual(calls, [1])
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(job.attempts, 1)
+
+    def test_failed_job_retried(self):
+        """Test a failed job is retried later, then given up on."""
+        enqueue(fail)
+
+        with self.assertLogs('core.tasks', level='ERROR'):
+            run_job(claim_jobs(1, TIMEOUT)[0])
+
+        job = Job.objects.get()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertIn('Boom', job.last_error)
+        self.assertGreater(job.run_after, timezone.now())
+
+        Job.objects.update(run_after=timezone.now())
+        with self.assertLogs('core.tasks', level='ERROR'):
+            run_job(claim_jobs(1, TIMEOUT)[0])
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    def test_delayed_job_not_claimed(self):
+        """Test a job is not claimed before it is due."""
+        enqueue(record, delay=timedelta(minutes=1), value=1)
+
+        self.assertEqual(claim_jobs(10, TIMEOUT), [])
+
+    def test_visibility_timeout(self):
+        """Test a job that never finished is claimed again, then failed."""
+        enqueue(record, value=1)
+        stale = claim_jobs(1, timedelta())[0]
+
+        retry = claim_jobs(1, timedelta())[0]
+        run_job(stale)
+
+        self.assertEqual(retry.attempts, 2)
+        self.assertEqual(Job.objects.get().status, Job.RUNNING)
+        self.assertEqual(claim_jobs(1, TIMEOUT), [])
+        self.assertEqual(Job.objects.get().status, Job.FAILED)
+
+
+class RunWorkersCommandTests(TransactionTestCase):
+    """Test running jobs with the run_workers command."""
+
+    def setUp(self):
+        calls.clear()
+
+    def test_run_workers_once(self):
+        """Test every due job is run before the command exits."""
+        for value in range(5):
+            enqueue(record, value=value)
+        out = StringIO()
+
+        call_command('run_workers', once=True, concurrency=1, stdout=out)
+
+        self.assertEqual(sorted(calls), list(range(5)))
+        self.assertEqual(Job.objects.filter(status=Job.DONE).count(), 5)
+        self.assertIn('5 jobs run.', out.getvalue())
+
+    @patch('core.management.commands.rebuild_stats.rebuild_stats')
+    def test_rebuild_stats_background(self, patched_rebuild):
+        """Test the stats rebuild can be left to the workers."""
+        call_command('rebuild_stats', background=True, stdout=StringIO())
+        patched_rebuild.assert_not_called()
+
+        call_command('run_workers', once=True, stdout=StringIO())
+
+        self.assertEqual(Job.objects.get().status, Job.DONE)
@@ -0,0 +1,154 @@
+"""
+Tests for rate limiting and request coalescing.
+"""
+import threading
+import time
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import models
+from core.coalescing import coalesce
+
+PLAYLISTS_URL = reverse('playlist:playlist-list')
+TAGS_URL = reverse('playlist:tag-list')
+
+SMALL_BUCKETS = {
+    'default': {'capacity': 3, 'refill': 1},
+    'playlists': {'capacity': 4, 'refill': 2},
+}
+
+
+def create_user(email="user@example.com", password="password123"):
+    """Create and return a new user."""
+    return get_user_model().objects.create_user(email, password)
+
+
+@override_settings(RATE_LIMITS=SMALL_BUCKETS, PLAYLIST_LIST_COST_UNIT=2)
+@patch('core.throttling.TokenBucketThrottle.timer')
+class ThrottleTests(TestCase):
+    """Test the token bucket throttle."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_bucket_empties_and_refills(self, timer):
+        """Test requests are limited once the bucket is empty."""
+        timer.return_value = 1000.0
+        for _ in range(3):
+            res = self.client.get(TAGS_URL)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(res["Retry-After"], "1")
+
+        timer.return_value = 1001.0
+        res = self.client.get(TAGS_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_buckets_per_user_and_scope(self, timer):
+        """Test users and scopes don't share a bucket."""
+        timer.return_value = 1000.0
+        for _ in range(3):
+            self.client.get(TAGS_URL)
+
+        res = self.client.get(PLAYLISTS_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        other = APIClient()
+        other.force_authenticate(create_user(email="user2@example.com"))
+        res = other.get(TAGS_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_list_cost_follows_library_size(self, timer):
+        """Test listing a bigger library takes more tokens."""
+        timer.return_value = 1000.0
+        for index in range(4):
+            models.Playlist.objects.create(
+                user=self.user,
+                title=f"Playlist {index}",
+                time_minutes=5,
+            )
+
+        # Three tokens each out of four.
+        res = self.client.get(PLAYLISTS_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        res = self.client.get(PLAYLISTS_URL)
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        timer.return_value = 1001.0
+        res = self.client.get(PLAYLISTS_URL)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+
+class CoalesceTests(SimpleTestCase):
+    """Test identical concurrent computations run once."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_concurrent_callers_share_result(self):
+        """Test callers arriving during a computation get its result."""
+        calls = []
+        started = threading.Event()
+
+        def compute():
+            calls.append(1)
+            started.set()
+            time.sleep(0.3)
+            return len(calls)
+
+        results = []
+        leader = threading.Thread(
+            target=lambda: results.append(coalesce("key", compute)),
+        )
+        leader.start()
+        started.wait()
+        followers = [
+            threading.Thread(
+                target=lambda: results.append(coalesce("key", compute)),
+            )
+            for _ in range(3)
+        ]
+        for thread in followers:
+            thread.start()
+        for thread in [leader, *followers]:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [1, 1, 1, 1])
+
+    def test_later_callers_compute_again(self):
+        """Test a finished result is not served to later callers."""
+        self.assertEqual(coalesce("key", lambda: 1), 1)
+        self.assertEqual(coalesce("key", lambda: 2), 2)
+
+    def test_leader_failure_followers_compute(self):
+        """Test callers waiting on a failed computation run their own."""
+        started = threading.Event()
+
+        def fail():
+            started.set()
+            time.sleep(0.2)
+            raise ValueError("failed")
+
+        def lead():
+            with self.assertRaises(ValueError):
+                coalesce("key", fail)
+
+        leader = threading.Thread(target=lead)
+        leader.start()
+        started.wait()
+
+        self.assertEqual(coalesce("key", lambda: 2), 2)
+        leader.join()
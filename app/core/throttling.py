@@ -0,0 +1,65 @@
+"""
+Token bucket rate limiting for the API.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Limit each user, or client IP when anonymous, per throttle scope.
+
+    Buckets are configured in settings.RATE_LIMITS by the view's
+    `throttle_scope`, falling back to 'default'. A request takes the
+    tokens returned by the view's `get_throttle_cost(request)`, or one.
+    Buckets live in the default cache, so it has to be shared between
+    processes for the limits to hold across all of them.
+    """
+    cache = cache
+    timer = time.time
+
+    def get_bucket(self, view):
+        """Return the scope and its bucket config, or None if unlimited."""
+        scope = getattr(view, 'throttle_scope', None) or 'default'
+        limits = getattr(settings, 'RATE_LIMITS', {})
+        return scope, limits.get(scope, limits.get('default'))
+
+    def get_cache_key(self, request, scope):
+        if request.user and request.user.is_authenticated:
+            ident = f'user:{request.user.pk}'
+        else:
+            ident = f'ip:{self.get_ident(request)}'
+        return f'throttle:{scope}:{ident}'
+
+    def get_cost(self, request, view):
+        get_cost = getattr(view, 'get_throttle_cost', None)
+        return get_cost(request) if get_cost else 1
+
+    def allow_request(self, request, view):
+        scope, bucket = self.get_bucket(view)
+        self.retry_after = None
+        if bucket is None:
+            return True
+        capacity, refill = bucket['capacity'], bucket['refill']
+        # A request costing more than the whole bucket could never run.
+        cost = min(self.get_cost(request, view), capacity)
+        key = self.get_cache_key(request, scope)
+        now = self.timer()
+
+        # Not atomic, concurrent requests can overdraw by a request or
+        # two. That is fine for keeping one client from taking over.
+        tokens, updated = self.cache.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * refill)
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        else:
+            self.retry_after = (cost - tokens) / refill
+        # The bucket is full again once it expires.
+        self.cache.set(key, (tokens, now), (capacity - tokens) / refill + 1)
+        return allowed
+
+    def wait(self):
+        return self.retry_after
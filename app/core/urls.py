@@ -0,0 +1,22 @@
+# URL mappings for service health probes and request profiles
+from django.urls import path
+
+from core import views
+
+app_name = "core"
+
+urlpatterns = [
+    path("health/live/", views.live, name="live"),
+    path("health/ready/", views.ready, name="ready"),
+    path("profiles/", views.ListProfilesView.as_view(), name="profiles"),
+    path(
+        "profiles/<int:pk>/",
+        views.RetrieveProfileView.as_view(),
+        name="profile",
+    ),
+    path(
+        "profiles/token/",
+        views.CreateProfileTokenView.as_view(),
+        name="profile-token",
+    ),
+]
@@ -0,0 +1,89 @@
+"""
+Views for service health probes and request profiles.
+"""
+from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_safe
+from drf_spectacular.utils import extend_schema
+from rest_framework import generics, permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core import profiling
+from core.authentication import ExpiringTokenAuthentication
+from core.health import check_database
+from core.models import ProfileRecord
+from core.serializers import (
+    ProfileRecordDetailSerializer,
+    ProfileRecordSerializer,
+    ProfileTokenSerializer,
+)
+
+
+@never_cache
+@require_safe
+def live(request):
+    """Liveness probe, the process is up and serving requests."""
+    return JsonResponse({'status': 'ok'})
+
+
+@never_cache
+@require_safe
+def ready(request):
+    """Readiness probe, every configured database is reachable."""
+    databases = {
+        alias: check_database(alias) for alias in settings.DATABASES
+    }
+    ok = all(databases.values())
+
+    return JsonResponse(
+        {'status': 'ok' if ok else 'unavailable', 'databases': databases},
+        status=200 if ok else 503,
+    )
+
+
+class IsSuperuser(permissions.BasePermission):
+    """Allow superusers only, is_staff is on for every user by default."""
+
+    def has_permission(self, request, view):
+        return bool(request.user and request.user.is_superuser)
+
+
+class ProfileMixin:
+    """Profiled requests, for superusers only."""
+    authentication_classes = [ExpiringTokenAuthentication]
+    permission_classes = [IsSuperuser]
+    queryset = ProfileRecord.objects.order_by('-id')
+
+
+class ListProfilesView(ProfileMixin, generics.ListAPIView):
+    """List the latest profiled requests, optionally of one ?user=."""
+    serializer_class = ProfileRecordSerializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.query_params.get('user')
+        if user and user.isdigit():
+            queryset = queryset.filter(user_id=user)
+        return queryset[:100]
+
+
+class RetrieveProfileView(ProfileMixin, generics.RetrieveDestroyAPIView):
+    """Show or delete a profiled request."""
+    serializer_class = ProfileRecordDetailSerializer
+
+
+class CreateProfileTokenView(APIView):
+    """Issue a token profiling the requests sent with it."""
+    authentication_classes = [ExpiringTokenAuthentication]
+    permission_classes = [IsSuperuser]
+
+    @extend_schema(request=None, responses=ProfileTokenSerializer)
+    def post(self, request):
+        serializer = ProfileTokenSerializer({
+            'header': profiling.HEADER,
+            'token': profiling.issue_token(request.user),
+            'expires_in': settings.PROFILING_TOKEN_MAX_AGE,
+        })
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
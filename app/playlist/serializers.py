@@ -1,31 +1,137 @@
 # Serializer for playlist API
 
+from django.db import IntegrityError, transaction
+from django.utils.translation import gettext as _
 from rest_framework import serializers
-from core.models import Playlist, Tag, Song
+from core.models import (
+    Artist,
+    GenreStats,
+    LibraryStats,
+    Playlist,
+    PlaylistSong,
+    Tag,
+    Song,
+    Track,
+)
+from core.profiling import ProfiledFieldsMixin
 
 
 class SongSerializer(serializers.ModelSerializer):
     """Serializer for songs."""
+    name = serializers.CharField(max_length=255)
+    artist = serializers.CharField(max_length=255)
+    usage_count = serializers.IntegerField(
+        source="playlist_count",
+        read_only=True,
+    )
 
     class Meta:
         model = Song
-        fields = ["id", "name", "artist"]
+        fields = ["id", "name", "artist", "usage_count"]
         read_only_fields = ["id"]
 
+    def update(self, instance, validated_data):
+        """Point the song at the catalog track for its new name/artist."""
+        instance.track = Track.objects.resolve(
+            validated_data.get("name", instance.name),
+            validated_data.get("artist", instance.artist),
+        )
+        try:
+            with transaction.atomic():
+                instance.save()
+        except IntegrityError:
+            raise serializers.ValidationError(
+                _("This song is already in your library.")
+            )
+
+        return instance
+
+
+class DuplicateSongsSerializer(serializers.Serializer):
+    """Songs that look like the same one, the one to keep first."""
+    songs = SongSerializer(many=True, read_only=True)
+
+
+class SongMergeSerializer(serializers.Serializer):
+    """Serializer for merging duplicate songs into another one."""
+    songs = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+    )
+
+    def validate_songs(self, value):
+        """Check the songs exist and belong to the user."""
+        ids = set(value)
+        if self.instance.id in ids:
+            raise serializers.ValidationError(
+                "A song can't be merged into itself."
+            )
+        found = set(
+            Song.objects.filter(
+                user=self.context['request'].user,
+                id__in=ids,
+            ).values_list('id', flat=True)
+        )
+        missing = ids - found
+        if missing:
+            raise serializers.ValidationError(
+                f'Invalid songs: {sorted(missing)}'
+            )
+
+        return sorted(ids)
+
+    def update(self, instance, validated_data):
+        """Merge the duplicate songs into the kept one."""
+        instance.merge(validated_data['songs'])
+
+        return instance
+
+
+class ArtistSerializer(serializers.ModelSerializer):
+    """Serializer for artists in the user's library."""
+    song_count = serializers.IntegerField(read_only=True)
+    playlist_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Artist
+        fields = ["id", "name", "song_count", "playlist_count"]
+        read_only_fields = fields
+
+
+class ArtistDetailSerializer(ArtistSerializer):
+    """Serializer for artist detail view."""
+    songs = serializers.SerializerMethodField()
+
+    class Meta(ArtistSerializer.Meta):
+        fields = ArtistSerializer.Meta.fields + ["songs"]
+        read_only_fields = fields
+
+    def get_songs(self, artist) -> list:
+        """Songs of the artist in the user's library."""
+        songs = Song.objects.filter(
+            user=self.context["request"].user,
+            track__artist=artist,
+        ).select_related("track__artist").order_by("track__name")
+        return SongSerializer(songs, many=True).data
+
 
 class TagSerializer(serializers.ModelSerializer):
     """Serializer for tags."""
+    usage_count = serializers.IntegerField(
+        source="playlist_count",
+        read_only=True,
+    )
 
     class Meta:
         model = Tag
-        fields = ["id", "name"]
+        fields = ["id", "name", "usage_count"]
         read_only_fields = ["id"]
 
 
-class PlaylistSerializer(serializers.ModelSerializer):
+class PlaylistSerializer(ProfiledFieldsMixin, serializers.ModelSerializer):
     # serializer for playlists
-    tags = TagSerializer(many=True, required=False)
-    songs = SongSerializer(many=True, required=False)
+    tags = TagSerializer(many=True, required=False, source="linked_tags")
+    songs = SongSerializer(many=True, required=False, source="ordered_songs")
 
     class Meta:
         model = Playlist
@@ -44,19 +150,24 @@ class PlaylistSerializer(serializers.ModelSerializer):
             playlist.tags.add(tag_obj)
 
     def _get_or_crete_songs(self, songs, playlist):
-        """Handle getting or creating songs as needed."""
+        """Handle getting or creating songs as needed, in order."""
         auth_user = self.context["request"].user
+        position = playlist.next_song_position()
         for song in songs:
             song_obj, create = Song.objects.get_or_create(
                 user=auth_user,
                 **song,
             )
-            playlist.songs.add(song_obj)
+            playlist.songs.add(
+                song_obj,
+                through_defaults={"position": position},
+            )
+            position += PlaylistSong.POSITION_GAP
 
     def create(self, validated_data):
         """Create a playlist."""
-        tags = validated_data.pop("tags", [])
-        songs = validated_data.pop("songs", [])
+        tags = validated_data.pop("linked_tags", [])
+        songs = validated_data.pop("ordered_songs", [])
         playlist = Playlist.objects.create(**validated_data)
         self._get_or_create_tags(tags, playlist)
         self._get_or_crete_songs(songs, playlist)
@@ -65,8 +176,8 @@ class PlaylistSerializer(serializers.ModelSerializer):
 
     def update(self, instance, validated_data):
         """Update playlist"""
-        tags = validated_data.pop('tags', None)
-        songs = validated_data.pop('songs', None)
+        tags = validated_data.pop('linked_tags', None)
+        songs = validated_data.pop('ordered_songs', None)
         if tags is not None:
             instance.tags.clear()
             self._get_or_create_tags(tags, instance)
@@ -82,6 +193,15 @@ class PlaylistSerializer(serializers.ModelSerializer):
         return instance
 
 
+class SimilarPlaylistSerializer(PlaylistSerializer):
+    """Playlist with its estimated similarity to another one."""
+    similarity = serializers.FloatField(read_only=True)
+
+    class Meta(PlaylistSerializer.Meta):
+        fields = PlaylistSerializer.Meta.fields + ["similarity"]
+        read_only_fields = fields
+
+
 class PlaylistDetailSerializer(PlaylistSerializer):
     """Serializer for playlist detail view."""
 
@@ -97,3 +217,180 @@ class PlaylistImageSerializer(serializers.ModelSerializer):
         fields = ['id', 'image']
         read_only_fields = ['id']
         extra_kwargs = {'image': {'required': 'True'}}
+
+
+class PlaylistSongMoveSerializer(serializers.Serializer):
+    """Serializer for moving a song within a playlist."""
+    song = serializers.IntegerField()
+    before = serializers.IntegerField(required=False)
+    after = serializers.IntegerField(required=False)
+
+    def validate(self, attrs):
+        if "before" in attrs and "after" in attrs:
+            raise serializers.ValidationError(
+                "Only one of before and after can be given."
+            )
+
+        return attrs
+
+    def update(self, instance, validated_data):
+        """Move the song, the playlist must contain both songs."""
+        try:
+            instance.move_song(
+                validated_data["song"],
+                before=validated_data.get("before"),
+                after=validated_data.get("after"),
+            )
+        except PlaylistSong.DoesNotExist:
+            raise serializers.ValidationError(
+                "Songs must be in the playlist."
+            )
+
+        return instance
+
+
+class PlaylistDuplicateSerializer(serializers.Serializer):
+    """Serializer for duplicating a playlist."""
+    title = serializers.CharField(max_length=255, required=False)
+
+    def create(self, validated_data):
+        """Copy the source playlist with its tags and songs."""
+        source = validated_data.pop('source')
+        return source.duplicate(**validated_data)
+
+
+class PlaylistMergeSerializer(serializers.Serializer):
+    """Serializer for merging playlists into another one."""
+    playlists = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+    )
+    delete_sources = serializers.BooleanField(default=False)
+
+    def validate_playlists(self, value):
+        """Check the playlists exist and belong to the user."""
+        ids = set(value)
+        if self.instance.id in ids:
+            raise serializers.ValidationError(
+                "A playlist can't be merged into itself."
+            )
+        found = set(
+            Playlist.objects.filter(
+                user=self.context['request'].user,
+                id__in=ids,
+            ).values_list('id', flat=True)
+        )
+        missing = ids - found
+        if missing:
+            raise serializers.ValidationError(
+                f'Invalid playlists: {sorted(missing)}'
+            )
+
+        return sorted(ids)
+
+    def update(self, instance, validated_data):
+        """Merge the source playlists into the target."""
+        instance.merge(
+            validated_data['playlists'],
+            delete_sources=validated_data['delete_sources'],
+        )
+
+        return instance
+
+
+class GenreStatsSerializer(serializers.ModelSerializer):
+    """Serializer for the stats of a genre."""
+
+    class Meta:
+        model = GenreStats
+        fields = ["genre", "playlist_count", "total_minutes"]
+        read_only_fields = fields
+
+
+class TagUsageSerializer(serializers.ModelSerializer):
+    """Serializer for how often a tag is used."""
+
+    class Meta:
+        model = Tag
+        fields = ["id", "name", "playlist_count"]
+        read_only_fields = fields
+
+
+class LibraryStatsSerializer(serializers.ModelSerializer):
+    """Serializer for the library stats of a user."""
+    TOP_TAGS = 10
+
+    genres = serializers.SerializerMethodField()
+    top_tags = serializers.SerializerMethodField()
+
+    class Meta:
+        model = LibraryStats
+        fields = ["playlist_count", "total_minutes", "genres", "top_tags"]
+        read_only_fields = fields
+
+    def get_genres(self, stats) -> GenreStatsSerializer(many=True):
+        """Genres of the user's playlists, most used first."""
+        genres = GenreStats.objects.filter(
+            user_id=stats.user_id,
+            playlist_count__gt=0,
+        ).order_by("-playlist_count", "genre")
+        return GenreStatsSerializer(genres, many=True).data
+
+    def get_top_tags(self, stats) -> TagUsageSerializer(many=True):
+        """Tags of the user on the most playlists."""
+        tags = Tag.objects.filter(
+            user_id=stats.user_id,
+            playlist_count__gt=0,
+        ).order_by("-playlist_count", "id")[:self.TOP_TAGS]
+        return TagUsageSerializer(tags, many=True).data
+
+
+class SyncPlaylistSerializer(serializers.ModelSerializer):
+    """Serializer for a changed playlist, with its links as IDs."""
+    tags = serializers.PrimaryKeyRelatedField(
+        many=True,
+        read_only=True,
+        source="linked_tags",
+    )
+    songs = serializers.PrimaryKeyRelatedField(
+        many=True,
+        read_only=True,
+        source="ordered_songs",
+    )
+
+    class Meta:
+        model = Playlist
+        fields = ["id", "title", "description", "time_minutes",
+                  "general_genre", "link", "image", "tags", "songs"]
+        read_only_fields = fields
+
+
+class SyncTagSerializer(TagSerializer):
+    """Serializer for a changed tag."""
+
+    class Meta(TagSerializer.Meta):
+        fields = ["id", "name"]
+
+
+class SyncSongSerializer(SongSerializer):
+    """Serializer for a changed song."""
+
+    class Meta(SongSerializer.Meta):
+        fields = ["id", "name", "artist"]
+
+
+class DeletedSerializer(serializers.Serializer):
+    """Serializer for the IDs of deleted objects."""
+    playlists = serializers.ListField(child=serializers.IntegerField())
+    tags = serializers.ListField(child=serializers.IntegerField())
+    songs = serializers.ListField(child=serializers.IntegerField())
+
+
+class ChangeSetSerializer(serializers.Serializer):
+    """Serializer for the library changes after a cursor."""
+    cursor = serializers.IntegerField()
+    has_more = serializers.BooleanField()
+    playlists = SyncPlaylistSerializer(many=True)
+    tags = SyncTagSerializer(many=True)
+    songs = SyncSongSerializer(many=True)
+    deleted = DeletedSerializer()
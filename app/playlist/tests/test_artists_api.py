@@ -0,0 +1,135 @@
+"""
+Tests for the artists API.
+"""
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.test import TestCase
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Song,
+    Playlist,
+)
+
+ARTISTS_URL = reverse('playlist:artist-list')
+
+
+def detail_url(artist_id):
+    """Create and return artist detail URL"""
+    return reverse("playlist:artist-detail", args=[artist_id])
+
+
+def create_user(email='user@example.com', password='testpass123'):
+    """Create and return user."""
+    return get_user_model().objects.create_user(email=email, password=password)
+
+
+def create_playlist(user, *songs):
+    """Create and return a playlist containing songs."""
+    playlist = Playlist.objects.create(
+        user=user,
+        title="Sample playlist",
+        time_minutes=22,
+    )
+    for position, song in enumerate(songs, start=1):
+        playlist.songs.add(song, through_defaults={"position": position})
+    return playlist
+
+
+class PublicArtistsApiTests(TestCase):
+    """Test unauthenticated API requests."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_auth_required(self):
+        """Test auth is required for retrieving artists."""
+        res = self.client.get(ARTISTS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateArtistsApiTests(TestCase):
+    """Test authenticated API requests."""
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_list_artists_with_counts(self):
+        """Test listing the user's artists with song and playlist counts."""
+        breed = Song.objects.create(user=self.user, name="Breed",
+                                    artist="Nirvana")
+        polly = Song.objects.create(user=self.user, name="Polly",
+                                    artist="nirvana")
+        Song.objects.create(user=self.user, name="Rooster",
+                            artist="Alice in Chains")
+        Song.objects.create(user=self.user, name="Untitled")
+        create_playlist(self.user, breed, polly)
+        create_playlist(self.user, polly)
+
+        res = self.client.get(ARTISTS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(a["name"], a["song_count"], a["playlist_count"])
+             for a in res.data],
+            [("Alice in Chains", 1, 0), ("Nirvana", 2, 2)],
+        )
+
+    def test_artists_limited_to_user(self):
+        """Test artists and counts only cover the user's library."""
+        user2 = create_user(email="user2@example.com")
+        other = Song.objects.create(user=user2, name="Drain you",
+                                    artist="Nirvana")
+        create_playlist(user2, other)
+        Song.objects.create(user=user2, name="Them Bones",
+                            artist="Alice in Chains")
+        Song.objects.create(user=self.user, name="Polly", artist="Nirvana")
+
+        res = self.client.get(ARTISTS_URL)
+
+        self.assertEqual(len(res.data), 1)
+        self.assertEqual(res.data[0]["song_count"], 1)
+        self.assertEqual(res.data[0]["playlist_count"], 0)
+
+    def test_artists_query_count(self):
+        """Test the list is one query however many artists there are."""
+        for index in range(5):
+            Song.objects.create(user=self.user, name=f"Song {index}",
+                                artist=f"Artist {index}")
+
+        with self.assertNumQueries(1):
+            res = self.client.get(ARTISTS_URL)
+
+        self.assertEqual(len(res.data), 5)
+
+    def test_artist_detail(self):
+        """Test the detail lists the artist's songs in the library."""
+        song = Song.objects.create(user=self.user, name="Polly",
+                                   artist="Nirvana")
+        user2 = create_user(email="user2@example.com")
+        Song.objects.create(user=user2, name="Breed", artist="Nirvana")
+
+        res = self.client.get(detail_url(song.track.artist_id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["name"], "Nirvana")
+        self.assertEqual(
+            res.data["songs"],
+            [{"id": song.id, "name": "Polly", "artist": "Nirvana",
+              "usage_count": 0}],
+        )
+
+    def test_artist_detail_other_user_not_found(self):
+        """Test artists outside the user's library are not found."""
+        user2 = create_user(email="user2@example.com")
+        song = Song.objects.create(user=user2, name="Breed",
+                                   artist="Nirvana")
+
+        res = self.client.get(detail_url(song.track.artist_id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
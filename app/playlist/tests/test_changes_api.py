@@ -0,0 +1,237 @@
+"""
+Tests for the delta sync API.
+"""
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.urls import reverse
+from django.test import TestCase
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    ChangeFeed,
+    ChangeLog,
+    Playlist,
+    Song,
+    Tag,
+)
+from playlist.views import ChangesView
+
+CHANGES_URL = reverse('playlist:changes')
+
+
+def create_user(email='user@example.com', password='testpass123'):
+    """Create and return user."""
+    return get_user_model().objects.create_user(email=email, password=password)
+
+
+def create_playlist(user, **params):
+    """Create and return a sample playlist."""
+    defaults = {
+        "title": "Sample playlist",
+        "time_minutes": 10,
+    }
+    defaults.update(params)
+    return Playlist.objects.create(user=user, **defaults)
+
+
+class PublicChangesApiTests(TestCase):
+    """Test unauthenticated API requests."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_auth_required(self):
+        """Test auth is required for syncing."""
+        res = self.client.get(CHANGES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateChangesApiTests(TestCase):
+    """Test authenticated API requests."""
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get_cursor(self):
+        return self.client.get(CHANGES_URL).data["cursor"]
+
+    def test_without_cursor(self):
+        """Test the current cursor is returned without any changes."""
+        create_playlist(self.user)
+
+        res = self.client.get(CHANGES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data["cursor"],
+            ChangeLog.objects.get(user=self.user).seq,
+        )
+        self.assertEqual(res.data["playlists"], [])
+
+    def test_changes_since_cursor(self):
+        """Test only objects changed after the cursor are returned."""
+        create_playlist(self.user, title="Old")
+        cursor = self.get_cursor()
+        tag = Tag.objects.create(user=self.user, name="Gym")
+        song = Song.objects.create(user=self.user, name="TNT")
+        playlist = create_playlist(self.user, title="New")
+        playlist.tags.add(tag)
+        playlist.songs.add(song)
+        playlist.title = "Newer"
+        playlist.save()
+
+        res = self.client.get(CHANGES_URL, {"since": cursor})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data["playlists"]), 1)
+        self.assertEqual(res.data["playlists"][0]["title"], "Newer")
+        self.assertEqual(res.data["playlists"][0]["tags"], [tag.id])
+        self.assertEqual(res.data["playlists"][0]["songs"], [song.id])
+        self.assertEqual(res.data["tags"], [{"id": tag.id, "name": "Gym"}])
+        self.assertEqual(res.data["songs"][0]["id"], song.id)
+        self.assertFalse(res.data["has_more"])
+
+        res = self.client.get(CHANGES_URL, {"since": res.data["cursor"]})
+
+        self.assertEqual(res.data["playlists"], [])
+
+    def test_deletes_are_tombstoned(self):
+        """Test deleted objects are reported, and their playlists."""
+        song = Song.objects.create(user=self.user, name="TNT")
+        playlist = create_playlist(self.user)
+        playlist.songs.add(song)
+        other = create_playlist(self.user)
+        cursor = self.get_cursor()
+        song_id, other_id = song.id, other.id
+
+        song.delete()
+        other.delete()
+
+        res = self.client.get(CHANGES_URL, {"since": cursor})
+
+        self.assertEqual(res.data["deleted"], {
+            "playlists": [other_id],
+            "tags": [],
+            "songs": [song_id],
+        })
+        self.assertEqual(res.data["playlists"][0]["id"], playlist.id)
+        self.assertEqual(res.data["playlists"][0]["songs"], [])
+
+    def test_song_moves_are_logged(self):
+        """Test reordering songs reports the playlist."""
+        playlist = create_playlist(self.user)
+        song1 = Song.objects.create(user=self.user, name="TNT")
+        song2 = Song.objects.create(user=self.user, name="Thunderstruck")
+        playlist.songs.add(song1, through_defaults={"position": 1})
+        playlist.songs.add(song2, through_defaults={"position": 2})
+        cursor = self.get_cursor()
+
+        playlist.move_song(song2.id, before=song1.id)
+
+        res = self.client.get(CHANGES_URL, {"since": cursor})
+
+        self.assertEqual(
+            res.data["playlists"][0]["songs"],
+            [song2.id, song1.id],
+        )
+
+    def test_changes_paged(self):
+        """Test changes come in batches until has_more is false."""
+        cursor = self.get_cursor()
+        for index in range(5):
+            create_playlist(self.user, title=f"Playlist {index}")
+
+        titles = []
+        with patch.object(ChangesView, "page_size", 2):
+            has_more = True
+            while has_more:
+                res = self.client.get(CHANGES_URL, {"since": cursor})
+                cursor = res.data["cursor"]
+                has_more = res.data["has_more"]
+                titles += [p["title"] for p in res.data["playlists"]]
+
+        self.assertEqual(titles, [f"Playlist {index}" for index in range(5)])
+
+    def test_changes_limited_to_user(self):
+        """Test other users' changes are not returned."""
+        cursor = self.get_cursor()
+        create_playlist(create_user(email="other@example.com"))
+
+        res = self.client.get(CHANGES_URL, {"since": cursor})
+
+        self.assertEqual(res.data["playlists"], [])
+        self.assertEqual(res.data["cursor"], cursor)
+
+    def test_invalid_cursor(self):
+        """Test a cursor that is not a number returns a 400."""
+        res = self.client.get(CHANGES_URL, {"since": "yesterday"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_deleted_user_log_removed(self):
+        """Test the change log of a deleted user is removed."""
+        create_playlist(self.user)
+
+        self.user.delete()
+
+        self.assertFalse(ChangeLog.objects.exists())
+
+    def test_cursor_counts_user_changes(self):
+        """Test each user's changes are numbered on their own."""
+        other = create_user(email="other@example.com")
+        create_playlist(other)
+        playlist = create_playlist(self.user)
+        create_playlist(other)
+
+        res = self.client.get(CHANGES_URL, {"since": 0})
+
+        self.assertEqual(res.data["cursor"], 1)
+        self.assertEqual(res.data["playlists"][0]["id"], playlist.id)
+        self.assertEqual(ChangeFeed.objects.get(user=other).last_seq, 2)
+
+    def test_prune_and_expired_cursor(self):
+        """Test old entries are pruned and cursors before them expire."""
+        cursor = self.get_cursor()
+        old = create_playlist(self.user, title="Old")
+        new = create_playlist(self.user, title="New")
+        ChangeLog.objects.filter(object_id=old.id).update(
+            created_at=timezone.now() - timedelta(days=100),
+        )
+        out = StringIO()
+
+        call_command("prune_changes", stdout=out)
+
+        self.assertIn("1 old changes deleted", out.getvalue())
+        self.assertFalse(ChangeLog.objects.filter(object_id=old.id))
+        self.assertTrue(ChangeLog.objects.filter(object_id=new.id))
+        res = self.client.get(CHANGES_URL, {"since": cursor})
+        self.assertEqual(res.status_code, status.HTTP_410_GONE)
+
+        res = self.client.get(CHANGES_URL, {"since": cursor + 1})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["playlists"][0]["title"], "New")
+
+    def test_prune_expires_own_cursors_only(self):
+        """Test pruning another user's changes keeps cursors valid."""
+        cursor = self.get_cursor()
+        create_playlist(self.user)
+        create_playlist(create_user(email="other@example.com"))
+        ChangeLog.objects.exclude(user=self.user).update(
+            created_at=timezone.now() - timedelta(days=100),
+        )
+
+        call_command("prune_changes", stdout=StringIO())
+
+        res = self.client.get(CHANGES_URL, {"since": cursor})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data["playlists"]), 1)
@@ -1,6 +1,11 @@
 # test playlist api
+from datetime import timedelta
+from unittest.mock import patch
+
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
@@ -13,10 +18,12 @@ from PIL import Image
 
 from core.models import (
     Playlist,
+    PlaylistSong,
     Tag,
     Song,
 )
 
+from core.tasks import claim_jobs, run_job
 from playlist.serializers import (
     PlaylistSerializer,
     PlaylistDetailSerializer,
@@ -30,6 +37,26 @@ def detail_url(playlist_id):
     return reverse("playlist:playlist-detail", args=[playlist_id])
 
 
+def duplicate_url(playlist_id):
+    """Create and return playlist duplicate URL."""
+    return reverse("playlist:playlist-duplicate", args=[playlist_id])
+
+
+def merge_url(playlist_id):
+    """Create and return playlist merge URL."""
+    return reverse("playlist:playlist-merge", args=[playlist_id])
+
+
+def move_url(playlist_id):
+    """Create and return playlist song move URL."""
+    return reverse("playlist:playlist-move", args=[playlist_id])
+
+
+def similar_url(playlist_id):
+    """Create and return similar playlists URL."""
+    return reverse("playlist:playlist-similar", args=[playlist_id])
+
+
 def image_upload_url(playlist_id):
     """Create and return image upload url"""
     return reverse("playlist:playlist-upload-image", args=[playlist_id])
@@ -305,8 +332,8 @@ class PrivatePlaylistAPITest(TestCase):
         self.assertEqual(playlist.songs.count(), 2)
         for song in payload["songs"]:
             exists = playlist.songs.filter(
-                name=song["name"],
-                artist=song["artist"],
+                track__name=song["name"],
+                track__artist__name=song["artist"],
                 user=self.user,
             ).exists()
             self.assertTrue(exists)
@@ -332,8 +359,8 @@ class PrivatePlaylistAPITest(TestCase):
         self.assertIn(song, playlist.songs.all())
         for song in payload['songs']:
             exists = playlist.songs.filter(
-                name=song["name"],
-                artist=song["artist"],
+                track__name=song["name"],
+                track__artist__name=song["artist"],
                 user=self.user,
             ).exists()
             self.assertTrue(exists)
@@ -347,7 +374,7 @@ class PrivatePlaylistAPITest(TestCase):
         res = self.client.patch(url, payload, format='json')
 
         self.assertEqual(res.status_code, status.HTTP_200_OK)
-        new_song = Song.objects.get(user=self.user, name='Limes')
+        new_song = Song.objects.get(user=self.user, track__name='Limes')
         self.assertIn(new_song, playlist.songs.all())
 
     def test_update_playlist_assign_song(self):
@@ -420,6 +447,422 @@ class PrivatePlaylistAPITest(TestCase):
         self.assertIn(s2.data, res.data)
         self.assertNotIn(s3.data, res.data)
 
+    def test_filter_any_lists_playlist_once(self):
+        """Test a playlist matching several tags is listed once."""
+        playlist = create_playlist(user=self.user)
+        tag1 = Tag.objects.create(user=self.user, name="Nostalgic")
+        tag2 = Tag.objects.create(user=self.user, name="Emotional")
+        playlist.tags.add(tag1, tag2)
+
+        params = {"tags": f"{tag1.id},{tag2.id}", "match": "any"}
+        res = self.client.get(PLAYLIST_URL, params)
+
+        self.assertEqual([p["id"] for p in res.data], [playlist.id])
+
+    def test_filter_match_all(self):
+        """Test match=all only lists playlists with every tag and song."""
+        p1 = create_playlist(user=self.user, title="Both")
+        p2 = create_playlist(user=self.user, title="One tag")
+        p3 = create_playlist(user=self.user, title="No song")
+        tag1 = Tag.objects.create(user=self.user, name="Nostalgic")
+        tag2 = Tag.objects.create(user=self.user, name="Emotional")
+        song = Song.objects.create(user=self.user, name="Rap God")
+        p1.tags.add(tag1, tag2)
+        p2.tags.add(tag1)
+        p3.tags.add(tag1, tag2)
+        p1.songs.add(song)
+        p2.songs.add(song)
+
+        params = {
+            "tags": f"{tag1.id},{tag2.id},{tag1.id}",
+            "songs": f"{song.id}",
+            "match": "all",
+        }
+        res = self.client.get(PLAYLIST_URL, params)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([p["id"] for p in res.data], [p1.id])
+
+    def test_link_queries_filter_on_user(self):
+        """Test every read of the link tables has the user, to prune them."""
+        playlist = create_playlist(user=self.user)
+        tag = Tag.objects.create(user=self.user, name="Nostalgic")
+        song = Song.objects.create(user=self.user, name="Rap God")
+        playlist.tags.add(tag)
+        playlist.songs.add(song)
+
+        params = {"tags": f"{tag.id}", "songs": f"{song.id}"}
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(PLAYLIST_URL, params)
+
+        self.assertEqual([p["id"] for p in res.data], [playlist.id])
+        for query in queries:
+            for table in ["core_playlist_tags", "core_playlist_songs"]:
+                if table in query["sql"]:
+                    self.assertRegex(
+                        query["sql"],
+                        rf'("{table}"|U\d)\."user_id" = {self.user.id}',
+                    )
+                    # The filtered link table is the one read, not a
+                    # second join of it.
+                    self.assertNotRegex(query["sql"], rf'"{table}" T\d')
+
+    def test_filter_invalid_ids(self):
+        """Test ids that are not integers return a 400."""
+        res = self.client.get(PLAYLIST_URL, {"tags": "1,abc"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("tags", res.data)
+
+    def test_filter_invalid_match(self):
+        """Test an unknown match mode returns a 400."""
+        res = self.client.get(PLAYLIST_URL, {"tags": "1", "match": "some"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("match", res.data)
+
+
+class PlaylistDuplicateMergeTests(TestCase):
+    """Tests for duplicating and merging playlists."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client.force_authenticate(self.user)
+
+    def _create_songs(self, count, prefix="Song"):
+        return [
+            Song.objects.create(user=self.user, name=f"{prefix} {i}")
+            for i in range(count)
+        ]
+
+    def test_duplicate_playlist(self):
+        """Test duplicating copies fields, tags and songs."""
+        playlist = create_playlist(user=self.user, title="Originals")
+        tag = Tag.objects.create(user=self.user, name="Chill")
+        playlist.tags.add(tag)
+        playlist.songs.add(*self._create_songs(3))
+
+        res = self.client.post(duplicate_url(playlist.id))
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        copy = Playlist.objects.get(id=res.data["id"])
+        self.assertNotEqual(copy.id, playlist.id)
+        self.assertEqual(copy.title, playlist.title)
+        self.assertEqual(copy.user, self.user)
+        self.assertEqual(list(copy.tags.all()), [tag])
+        self.assertEqual(
+            set(copy.songs.all()),
+            set(playlist.songs.all()),
+        )
+        self.assertEqual(playlist.songs.count(), 3)
+
+    def test_duplicate_playlist_with_title(self):
+        """Test the copy can be given a new title."""
+        playlist = create_playlist(user=self.user)
+
+        res = self.client.post(duplicate_url(playlist.id), {"title": "Copy"})
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data["title"], "Copy")
+
+    def test_duplicate_other_users_playlist(self):
+        """Test duplicating another users playlist gives error."""
+        other_user = create_user(email='other@example.com', password='test123')
+        playlist = create_playlist(user=other_user)
+
+        res = self.client.post(duplicate_url(playlist.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_duplicate_rolled_back_on_error(self):
+        """Test a copy whose links fail to copy is not left behind."""
+        playlist = create_playlist(user=self.user)
+
+        with patch.object(
+            Playlist,
+            "copy_links_from",
+            side_effect=RuntimeError,
+        ), self.assertRaises(RuntimeError):
+            playlist.duplicate()
+
+        self.assertEqual(Playlist.objects.count(), 1)
+
+    def test_duplicate_query_count_constant(self):
+        """Test duplicating costs the same number of queries at any size."""
+        small = create_playlist(user=self.user)
+        small.songs.add(*self._create_songs(2, "Small"))
+        large = create_playlist(user=self.user)
+        large.songs.add(*self._create_songs(30, "Large"))
+
+        with CaptureQueriesContext(connection) as small_queries:
+            self.client.post(duplicate_url(small.id))
+        with CaptureQueriesContext(connection) as large_queries:
+            self.client.post(duplicate_url(large.id))
+
+        self.assertEqual(len(small_queries), len(large_queries))
+
+    def test_merge_playlists(self):
+        """Test merging adds missing tags and songs once."""
+        shared, only_target, only_source = self._create_songs(3)
+        tag = Tag.objects.create(user=self.user, name="Loud")
+        target = create_playlist(user=self.user)
+        target.songs.add(shared, only_target)
+        source1 = create_playlist(user=self.user)
+        source1.songs.add(shared, only_source)
+        source1.tags.add(tag)
+        source2 = create_playlist(user=self.user)
+        source2.songs.add(only_source)
+
+        payload = {"playlists": [source1.id, source2.id]}
+        res = self.client.post(merge_url(target.id), payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted(song.id for song in target.songs.all()),
+            sorted([shared.id, only_target.id, only_source.id]),
+        )
+        self.assertEqual(list(target.tags.all()), [tag])
+        self.assertEqual(len(res.data["songs"]), 3)
+        self.assertTrue(Playlist.objects.filter(id=source1.id).exists())
+
+    def test_merge_delete_sources(self):
+        """Test merged playlists can be deleted afterwards."""
+        target = create_playlist(user=self.user)
+        source = create_playlist(user=self.user)
+        source.songs.add(*self._create_songs(2))
+
+        payload = {"playlists": [source.id], "delete_sources": True}
+        res = self.client.post(merge_url(target.id), payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(target.songs.count(), 2)
+        self.assertFalse(Playlist.objects.filter(id=source.id).exists())
+
+    def test_merge_rolled_back_on_error(self):
+        """Test merged links are undone when deleting a source fails."""
+        target = create_playlist(user=self.user)
+        source = create_playlist(user=self.user)
+        source.songs.add(*self._create_songs(2))
+
+        with patch.object(
+            Playlist,
+            "soft_delete",
+            side_effect=RuntimeError,
+        ), self.assertRaises(RuntimeError):
+            target.merge([source.id], delete_sources=True)
+
+        self.assertEqual(target.songs.count(), 0)
+
+    def test_merge_other_users_playlist_error(self):
+        """Test merging another users playlist is rejected."""
+        other_user = create_user(email='other@example.com', password='test123')
+        target = create_playlist(user=self.user)
+        source = create_playlist(user=other_user)
+
+        payload = {"playlists": [source.id]}
+        res = self.client.post(merge_url(target.id), payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_merge_into_itself_error(self):
+        """Test a playlist can't be merged into itself."""
+        target = create_playlist(user=self.user)
+
+        payload = {"playlists": [target.id]}
+        res = self.client.post(merge_url(target.id), payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class PlaylistSongOrderTests(TestCase):
+    """Tests for keeping songs of a playlist in order."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client.force_authenticate(self.user)
+        self.playlist = create_playlist(user=self.user)
+        names = ["One", "Two", "Three", "Four"]
+        res = self.client.patch(
+            detail_url(self.playlist.id),
+            {"songs": [{"name": name, "artist": "Band"} for name in names]},
+            format="json",
+        )
+        self.songs = {song["name"]: song["id"] for song in res.data["songs"]}
+
+    def _song_names(self):
+        res = self.client.get(detail_url(self.playlist.id))
+        return [song["name"] for song in res.data["songs"]]
+
+    def _move(self, song, **params):
+        payload = {"song": self.songs[song]}
+        payload.update({k: self.songs[v] for k, v in params.items()})
+        return self.client.post(
+            move_url(self.playlist.id), payload, format="json",
+        )
+
+    def test_songs_keep_given_order(self):
+        """Test songs are returned in the order they were given."""
+        self.assertEqual(self._song_names(), ["One", "Two", "Three", "Four"])
+
+    def test_move_song_after(self):
+        """Test moving a song after another one."""
+        res = self._move("One", after="Three")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [song["name"] for song in res.data["songs"]],
+            ["Two", "Three", "One", "Four"],
+        )
+        self.assertEqual(self._song_names(), ["Two", "Three", "One", "Four"])
+
+    def test_move_song_before(self):
+        """Test moving a song to the top of the playlist."""
+        res = self._move("Four", before="One")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._song_names(), ["Four", "One", "Two", "Three"])
+
+    def test_move_song_to_end(self):
+        """Test moving a song without an anchor moves it to the end."""
+        res = self._move("Two")
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self._song_names(), ["One", "Three", "Four", "Two"])
+
+    def test_move_updates_single_row(self):
+        """Test a move only changes the position of the moved song."""
+        before = dict(
+            PlaylistSong.objects.values_list("song_id", "position")
+        )
+
+        self._move("Four", after="One")
+
+        after = dict(PlaylistSong.objects.values_list("song_id", "position"))
+        changed = {k for k in before if before[k] != after[k]}
+        self.assertEqual(changed, {self.songs["Four"]})
+
+    def test_move_renumbers_when_out_of_room(self):
+        """Test repeated moves into the same gap keep the order right."""
+        for _ in range(20):
+            self._move("Four", after="One")
+            self._move("Three", after="One")
+
+        self.assertEqual(self._song_names(), ["One", "Three", "Four", "Two"])
+
+    def test_move_song_not_in_playlist(self):
+        """Test moving relative to a song outside the playlist fails."""
+        other = Song.objects.create(user=self.user, name="Other")
+
+        res = self.client.post(
+            move_url(self.playlist.id),
+            {"song": self.songs["One"], "after": other.id},
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_move_before_and_after_error(self):
+        """Test before and after can't be combined."""
+        res = self._move("One", before="Two", after="Three")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_duplicate_keeps_order(self):
+        """Test a duplicated playlist keeps the song order."""
+        self._move("One", after="Four")
+
+        res = self.client.post(duplicate_url(self.playlist.id))
+
+        self.assertEqual(
+            [song["name"] for song in res.data["songs"]],
+            ["Two", "Three", "Four", "One"],
+        )
+
+    def test_merge_appends_in_order(self):
+        """Test merged songs are appended after the existing ones."""
+        target = create_playlist(user=self.user)
+        target.songs.add(
+            Song.objects.create(user=self.user, name="First"),
+            through_defaults={"position": PlaylistSong.POSITION_GAP},
+        )
+
+        res = self.client.post(
+            merge_url(target.id),
+            {"playlists": [self.playlist.id]},
+            format="json",
+        )
+
+        self.assertEqual(
+            [song["name"] for song in res.data["songs"]],
+            ["First", "One", "Two", "Three", "Four"],
+        )
+
+    def test_list_query_count_constant(self):
+        """Test listing playlists does not query per playlist."""
+        with CaptureQueriesContext(connection) as few_queries:
+            self.client.get(PLAYLIST_URL)
+        for _ in range(5):
+            self.client.post(duplicate_url(self.playlist.id))
+        with CaptureQueriesContext(connection) as many_queries:
+            res = self.client.get(PLAYLIST_URL)
+
+        self.assertEqual(len(res.data), 6)
+        self.assertEqual(len(few_queries), len(many_queries))
+
+
+class PlaylistSimilarTests(TestCase):
+    """Test listing playlists similar to one."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = create_user(email='user@example.com', password='test123')
+        self.client.force_authenticate(self.user)
+
+    def _create(self, title, songs, tags=()):
+        res = self.client.post(
+            PLAYLIST_URL,
+            {
+                "title": title,
+                "time_minutes": 5,
+                "songs": [{"name": name, "artist": "Band"} for name in songs],
+                "tags": [{"name": name} for name in tags],
+            },
+            format="json",
+        )
+        # Signatures are updated by background jobs.
+        for job in claim_jobs(100, timedelta(minutes=5)):
+            run_job(job)
+        return res.data["id"]
+
+    def test_similar_playlists(self):
+        """Test playlists sharing songs and tags come first, scored."""
+        target = self._create("Target", ["A", "B", "C"], ["Loud"])
+        same = self._create("Same", ["A", "B", "C"], ["Loud"])
+        self._create("Other", ["X", "Y"], ["Quiet"])
+
+        res = self.client.get(similar_url(target))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data[0]["id"], same)
+        self.assertEqual(res.data[0]["similarity"], 1.0)
+        self.assertEqual(
+            [song["name"] for song in res.data[0]["songs"]],
+            ["A", "B", "C"],
+        )
+        self.assertNotIn(target, [p["id"] for p in res.data])
+
+    def test_similar_other_users_playlist(self):
+        """Test playlists of other users can't be compared."""
+        other = create_user(email='other@example.com', password='test123')
+        playlist = create_playlist(user=other)
+
+        res = self.client.get(similar_url(playlist.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
 class ImageUploadTests(TestCase):
     """Tests for the image upload API"""
 
@@ -16,6 +16,7 @@ from core.models import (
 from playlist.serializers import SongSerializer
 
 SONGS_URL = reverse('playlist:song-list')
+DUPLICATES_URL = reverse('playlist:song-duplicates')
 
 
 def detail_url(song_id):
@@ -23,6 +24,11 @@ def detail_url(song_id):
     return reverse("playlist:song-detail", args=[song_id])
 
 
+def merge_url(song_id):
+    """Create and return song merge URL."""
+    return reverse("playlist:song-merge", args=[song_id])
+
+
 def create_user(email='user@example.com', password='testpass123'):
     """Create and return user."""
     return get_user_model().objects.create_user(email=email, password=password)
@@ -56,7 +62,7 @@ class PrivateSongsApiTests(TestCase):
 
         res = self.client.get(SONGS_URL)
 
-        songs = Song.objects.all().order_by('-name')
+        songs = Song.objects.all().order_by('-track__name')
         serializer = SongSerializer(songs, many=True)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data, serializer.data)
@@ -89,6 +95,43 @@ class PrivateSongsApiTests(TestCase):
         song.refresh_from_db()
         self.assertEqual(song.name, payload["name"])
 
+    def test_update_song_keeps_other_users_song(self):
+        """Test renaming a song doesn't affect another users copy."""
+        user2 = create_user(email='user2@example.com')
+        other = Song.objects.create(user=user2, name="Beat it",
+                                    artist="Jackson")
+        song = Song.objects.create(user=self.user, name="Beat it",
+                                   artist="Jackson")
+
+        res = self.client.patch(detail_url(song.id), {"artist": "MJ"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["artist"], "MJ")
+        other.refresh_from_db()
+        self.assertEqual(other.artist, "Jackson")
+
+    def test_update_song_to_existing_song_error(self):
+        """Test renaming a song to one already in the library fails."""
+        Song.objects.create(user=self.user, name="Thriller",
+                            artist="Jackson")
+        song = Song.objects.create(user=self.user, name="Beat it",
+                                   artist="Jackson")
+
+        res = self.client.patch(detail_url(song.id), {"name": "thriller"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_update_song_blank_artist_error(self):
+        """Test the artist of a song can't be blanked."""
+        song = Song.objects.create(user=self.user, name="Beat it",
+                                   artist="Jackson")
+
+        res = self.client.patch(detail_url(song.id), {"artist": ""})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        song.refresh_from_db()
+        self.assertEqual(song.artist, "Jackson")
+
     def test_delete_song(self):
         """Test deleting song"""
         song = Song.objects.create(user=self.user, name="Shame",
@@ -115,6 +158,7 @@ class PrivateSongsApiTests(TestCase):
 
         res = self.client.get(SONGS_URL, {"assigned_only": 1})
 
+        song1.refresh_from_db()
         s1 = SongSerializer(song1)
         s2 = SongSerializer(song2)
         self.assertIn(s1.data, res.data)
@@ -142,3 +186,88 @@ class PrivateSongsApiTests(TestCase):
         res = self.client.get(SONGS_URL, {"assigned_only": 1})
 
         self.assertEqual(len(res.data), 1)
+
+    def test_filter_songs_unassigned(self):
+        """Test listing songs not in any playlist."""
+        song1 = Song.objects.create(user=self.user, name="Back in Black")
+        song2 = Song.objects.create(user=self.user, name="TNT")
+        playlist = Playlist.objects.create(
+            title="ACDC pack",
+            time_minutes=6,
+            user=self.user,
+        )
+        playlist.songs.add(song1)
+        playlist.songs.remove(song1)
+        playlist.songs.add(song2)
+
+        res = self.client.get(SONGS_URL, {"unassigned_only": 1})
+
+        self.assertEqual([s["id"] for s in res.data], [song1.id])
+
+    def test_songs_usage_count(self):
+        """Test songs report how many playlists they are on."""
+        song = Song.objects.create(user=self.user, name="TNT")
+        for title in ["ACDC pack", "Rock"]:
+            playlist = Playlist.objects.create(
+                title=title,
+                time_minutes=6,
+                user=self.user,
+            )
+            playlist.songs.add(song)
+        playlist.delete()
+
+        with self.assertNumQueries(1):
+            res = self.client.get(SONGS_URL)
+
+        self.assertEqual(res.data[0]["usage_count"], 1)
+
+    def test_list_duplicates(self):
+        """Test songs that look alike are listed together."""
+        song = Song.objects.create(user=self.user, name="Polly")
+        remaster = Song.objects.create(
+            user=self.user,
+            name="Polly (Remastered)",
+        )
+        Song.objects.create(user=self.user, name="Breed")
+
+        res = self.client.get(DUPLICATES_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [[s["id"] for s in group["songs"]] for group in res.data],
+            [[song.id, remaster.id]],
+        )
+
+    def test_merge_duplicates(self):
+        """Test merging moves the playlist links to the kept song."""
+        song = Song.objects.create(user=self.user, name="Polly")
+        remaster = Song.objects.create(
+            user=self.user,
+            name="Polly (Remastered)",
+        )
+        playlist = Playlist.objects.create(
+            title="Nevermind",
+            time_minutes=42,
+            user=self.user,
+        )
+        playlist.songs.add(remaster)
+
+        res = self.client.post(merge_url(song.id), {"songs": [remaster.id]})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["usage_count"], 1)
+        self.assertEqual(list(playlist.songs.all()), [song])
+        self.assertFalse(Song.objects.filter(id=remaster.id).exists())
+
+    def test_merge_other_users_song_error(self):
+        """Test songs of other users can't be merged."""
+        song = Song.objects.create(user=self.user, name="Polly")
+        other = Song.objects.create(
+            user=create_user(email="other@example.com"),
+            name="Polly",
+        )
+
+        res = self.client.post(merge_url(song.id), {"songs": [other.id]})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(Song.objects.filter(id=other.id).exists())
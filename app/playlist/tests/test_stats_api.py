@@ -0,0 +1,98 @@
+"""
+Tests for the library stats API.
+"""
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.test import TestCase
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import (
+    Playlist,
+    Tag,
+)
+
+STATS_URL = reverse('playlist:stats')
+
+
+def create_user(email='user@example.com', password='testpass123'):
+    """Create and return user."""
+    return get_user_model().objects.create_user(email=email, password=password)
+
+
+def create_playlist(user, **params):
+    """Create and return a sample playlist."""
+    defaults = {
+        "title": "Sample playlist",
+        "time_minutes": 10,
+        "general_genre": "rock",
+    }
+    defaults.update(params)
+    return Playlist.objects.create(user=user, **defaults)
+
+
+class PublicStatsApiTests(TestCase):
+    """Test unauthenticated API requests."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_auth_required(self):
+        """Test auth is required for retrieving stats."""
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateStatsApiTests(TestCase):
+    """Test authenticated API requests."""
+
+    def setUp(self):
+        self.user = create_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_empty_library(self):
+        """Test a user without playlists gets zero stats."""
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {
+            "playlist_count": 0,
+            "total_minutes": 0,
+            "genres": [],
+            "top_tags": [],
+        })
+
+    def test_stats(self):
+        """Test stats cover the user's playlists only."""
+        tag1 = Tag.objects.create(user=self.user, name="Tag1")
+        tag2 = Tag.objects.create(user=self.user, name="Tag2")
+        Tag.objects.create(user=self.user, name="Unused")
+        create_playlist(self.user).tags.add(tag1, tag2)
+        create_playlist(self.user, time_minutes=5).tags.add(tag2)
+        create_playlist(self.user, time_minutes=30, general_genre="jazz")
+        create_playlist(create_user(email="other@example.com"))
+
+        res = self.client.get(STATS_URL)
+
+        self.assertEqual(res.data["playlist_count"], 3)
+        self.assertEqual(res.data["total_minutes"], 45)
+        self.assertEqual(
+            [(g["genre"], g["playlist_count"], g["total_minutes"])
+             for g in res.data["genres"]],
+            [("rock", 2, 15), ("jazz", 1, 30)],
+        )
+        self.assertEqual(
+            [(t["name"], t["playlist_count"]) for t in res.data["top_tags"]],
+            [("Tag2", 2), ("Tag1", 1)],
+        )
+
+    def test_stats_query_count(self):
+        """Test reading stats does not depend on the library size."""
+        for index in range(5):
+            create_playlist(self.user, general_genre=f"genre {index}")
+
+        with self.assertNumQueries(3):
+            self.client.get(STATS_URL)
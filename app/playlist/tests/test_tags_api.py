@@ -111,6 +111,7 @@ class PrivateTagsApiTests(TestCase):
 
         res = self.client.get(TAGS_URL, {"assigned_only": 1})
 
+        tag1.refresh_from_db()
         s1 = TagSerializer(tag1)
         s2 = TagSerializer(tag2)
         self.assertIn(s1.data, res.data)
@@ -138,3 +139,63 @@ class PrivateTagsApiTests(TestCase):
         res = self.client.get(TAGS_URL, {"assigned_only": 1})
 
         self.assertEqual(len(res.data), 1)
+
+    def test_filter_tags_unassigned(self):
+        """Test listing tags not assigned to any playlist."""
+        tag1 = Tag.objects.create(user=self.user, name="Gym")
+        tag2 = Tag.objects.create(user=self.user, name="Morning")
+        playlist = Playlist.objects.create(
+            title="Time to work",
+            time_minutes=40,
+            user=self.user,
+        )
+        playlist.tags.add(tag1)
+
+        res = self.client.get(TAGS_URL, {"unassigned_only": 1})
+
+        self.assertEqual([t["id"] for t in res.data], [tag2.id])
+
+    def test_tags_usage_count(self):
+        """Test tags report how many playlists use them."""
+        tag = Tag.objects.create(user=self.user, name="Gym")
+        for title in ["Time to work", "Chill"]:
+            playlist = Playlist.objects.create(
+                title=title,
+                time_minutes=40,
+                user=self.user,
+            )
+            playlist.tags.add(tag)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(TAGS_URL)
+
+        self.assertEqual(res.data[0]["usage_count"], 2)
+
+    def test_filter_flags_invalid(self):
+        """Test bad or conflicting filter flags return a 400."""
+        for params in [
+            {"assigned_only": "yes"},
+            {"assigned_only": 1, "unassigned_only": 1},
+        ]:
+            res = self.client.get(TAGS_URL, params)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_delete_tag_hides_from_playlists(self):
+        """Test a deleted tag is kept for the purge but not shown."""
+        tag = Tag.objects.create(user=self.user, name="Gym")
+        playlist = Playlist.objects.create(
+            title="Time to work",
+            time_minutes=40,
+            user=self.user,
+        )
+        playlist.tags.add(tag)
+
+        res = self.client.delete(detail_url(tag.id))
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertTrue(Tag.all_objects.filter(id=tag.id).exists())
+        res = self.client.get(
+            reverse("playlist:playlist-detail", args=[playlist.id])
+        )
+        self.assertEqual(res.data["tags"], [])
@@ -11,9 +11,12 @@ router = DefaultRouter()
 router.register("playlists", views.PlaylistViewSet)
 router.register("tags", views.TagViewSet)
 router.register("songs", views.SongViewSet)
+router.register("artists", views.ArtistViewSet)
 
 app_name = "playlist"
 
 urlpatterns = [
+    path('stats/', views.LibraryStatsView.as_view(), name='stats'),
+    path('changes/', views.ChangesView.as_view(), name='changes'),
     path('', include(router.urls)),
 ]
@@ -5,20 +5,34 @@ from drf_spectacular.utils import (
     extend_schema_view,
     extend_schema,
     OpenApiParameter,
+    OpenApiResponse,
     OpenApiTypes,
 )
+from django.conf import settings
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from rest_framework import (
+    generics,
     viewsets,
     mixins,
     status,
 )
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 
+from core import profiling, similarity
+from core.authentication import ExpiringTokenAuthentication
+from core.coalescing import coalesce
+from core.duplicates import find_duplicates
 from core.models import (
+    Artist,
+    ChangeFeed,
+    ChangeLog,
+    LibraryStats,
     Playlist,
+    PlaylistSong,
     Tag,
     Song,
 )
@@ -38,6 +52,12 @@ from playlist import serializers
                 OpenApiTypes.STR,
                 description="Comma separated list of IDs to filter",
             ),
+            OpenApiParameter(
+                "match",
+                OpenApiTypes.STR, enum=["any", "all"],
+                description="Match playlists with any (default) or all "
+                            "of the given tags and songs.",
+            ),
         ]
     )
 )
@@ -45,28 +65,62 @@ class PlaylistViewSet(viewsets.ModelViewSet):
     """View for manage playlist APIs."""
     serializer_class = serializers.PlaylistDetailSerializer
     queryset = Playlist.objects.all()
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [ExpiringTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    throttle_scope = 'playlists'
 
-    def _params_to_ints(self, qs):
+    def _params_to_ints(self, qs, param):
         """Convert a list of strings to integer"""
-        return [int(str_id) for str_id in qs.split(",")]
+        try:
+            return [int(str_id) for str_id in qs.split(",")]
+        except ValueError:
+            raise ValidationError(
+                {param: "Must be a comma separated list of IDs."}
+            )
 
     def get_queryset(self):
         """Retrieve playlists for authenticated user."""
         tags = self.request.query_params.get('tags')
         songs = self.request.query_params.get('songs')
+        match = self.request.query_params.get('match', 'any')
+        if match not in ('any', 'all'):
+            raise ValidationError({'match': 'Must be "any" or "all".'})
+        user = self.request.user
         queryset = self.queryset
+        # Every read of the link tables has the user, so Postgres only
+        # reads the user's partition of them.
         if tags:
-            tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
+            tag_ids = self._params_to_ints(tags, 'tags')
+            queryset = queryset.with_tags(tag_ids, match == 'all', user)
         if songs:
-            song_ids = self._params_to_ints(songs)
-            queryset = queryset.filter(songs__id__in=song_ids)
+            song_ids = self._params_to_ints(songs, 'songs')
+            queryset = queryset.with_songs(song_ids, match == 'all', user)
 
         return queryset.filter(
-            user=self.request.user
-        ).order_by("-id").distinct()
+            user=user
+        ).order_by("-id").prefetch_links(user.pk)
+
+    def get_throttle_cost(self, request):
+        """Charge listing by the size of the user's library."""
+        if self.action != 'list' or not request.user.is_authenticated:
+            return 1
+        playlists = LibraryStats.objects.filter(
+            user=request.user,
+        ).values_list('playlist_count', flat=True).first() or 0
+        return 1 + playlists // settings.PLAYLIST_LIST_COST_UNIT
+
+    def list(self, request, *args, **kwargs):
+        """List playlists, computed once for identical requests."""
+        if profiling.current() is not None:
+            # Not shared, the profile has to see the work.
+            return super().list(request, *args, **kwargs)
+        data = coalesce(
+            f'playlists:{request.user.pk}:{request.build_absolute_uri()}',
+            lambda: super(PlaylistViewSet, self).list(
+                request, *args, **kwargs
+            ).data,
+        )
+        return Response(data)
 
     def get_serializer_class(self):
         """Return the serializer class for request."""
@@ -74,13 +128,36 @@ class PlaylistViewSet(viewsets.ModelViewSet):
             return serializers.PlaylistSerializer
         elif self.action == 'upload_image':
             return serializers.PlaylistImageSerializer
+        elif self.action == 'move':
+            return serializers.PlaylistSongMoveSerializer
+        elif self.action == 'duplicate':
+            return serializers.PlaylistDuplicateSerializer
+        elif self.action == 'merge':
+            return serializers.PlaylistMergeSerializer
+        elif self.action == 'similar':
+            return serializers.SimilarPlaylistSerializer
 
         return self.serializer_class
 
+    def _detail_response(self, playlist, status_code):
+        """Respond with the detail representation of a changed playlist."""
+        if getattr(playlist, '_prefetched_objects_cache', None):
+            # Links changed after they were prefetched.
+            playlist._prefetched_objects_cache = {}
+        serializer = serializers.PlaylistDetailSerializer(
+            playlist,
+            context=self.get_serializer_context(),
+        )
+        return Response(serializer.data, status=status_code)
+
     def perform_create(self, serializer):
         """Create a new playlist."""
         serializer.save(user=self.request.user)
 
+    def perform_destroy(self, instance):
+        """Hide the playlist, purge_deleted removes it later."""
+        instance.soft_delete()
+
     @action(methods=["POST"], detail=True, url_path="upload-image")
     def upload_image(self, request, pk=None):
         """Upload image to playlist."""
@@ -93,6 +170,61 @@ class PlaylistViewSet(viewsets.ModelViewSet):
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @extend_schema(responses=serializers.PlaylistDetailSerializer)
+    @action(methods=["POST"], detail=True)
+    def move(self, request, pk=None):
+        """Move a song before or after another one in the playlist."""
+        playlist = self.get_object()
+        serializer = self.get_serializer(playlist, data=request.data)
+
+        if serializer.is_valid():
+            serializer.save()
+            return self._detail_response(playlist, status.HTTP_200_OK)
+
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    @extend_schema(responses=serializers.PlaylistDetailSerializer)
+    @action(methods=["POST"], detail=True)
+    def duplicate(self, request, pk=None):
+        """Copy a playlist with its tags and songs."""
+        playlist = self.get_object()
+        serializer = self.get_serializer(data=request.data)
+
+        if serializer.is_valid():
+            copy = serializer.save(source=playlist)
+            return self._detail_response(copy, status.HTTP_201_CREATED)
+
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    @extend_schema(responses=serializers.PlaylistDetailSerializer)
+    @action(methods=["POST"], detail=True)
+    def merge(self, request, pk=None):
+        """Merge the tags and songs of other playlists into this one."""
+        playlist = self.get_object()
+        serializer = self.get_serializer(playlist, data=request.data)
+
+        if serializer.is_valid():
+            serializer.save()
+            return self._detail_response(playlist, status.HTTP_200_OK)
+
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(methods=["GET"], detail=True)
+    def similar(self, request, pk=None):
+        """List the playlists with the most songs and tags in common."""
+        playlist = self.get_object()
+        scores = dict(
+            similarity.similar(playlist, settings.SIMILAR_PLAYLISTS_LIMIT)
+        )
+        playlists = sorted(
+            self.get_queryset().filter(pk__in=scores),
+            key=lambda other: (-scores[other.pk], -other.pk),
+        )
+        for other in playlists:
+            other.similarity = scores[other.pk]
+        serializer = self.get_serializer(playlists, many=True)
+        return Response(serializer.data)
+
 
 @extend_schema_view(
     list=extend_schema(
@@ -102,6 +234,11 @@ class PlaylistViewSet(viewsets.ModelViewSet):
                 OpenApiTypes.INT, enum=[0, 1],
                 description="Filter by items assigned to playlists.",
             ),
+            OpenApiParameter(
+                "unassigned_only",
+                OpenApiTypes.INT, enum=[0, 1],
+                description="Filter by items not assigned to any playlist.",
+            ),
         ]
     )
 )
@@ -110,21 +247,40 @@ class BasePlaylistAttrViewSet(mixins.DestroyModelMixin,
                               mixins.ListModelMixin,
                               viewsets.GenericViewSet):
     """Base viewset of playlist attrs"""
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [ExpiringTokenAuthentication]
     permission_classes = [IsAuthenticated]
+    ordering = "-name"
+
+    def _flag(self, param):
+        """Return the boolean value of a 0/1 query param."""
+        value = self.request.query_params.get(param, "0")
+        if value not in ("0", "1"):
+            raise ValidationError({param: "Must be 0 or 1."})
+        return value == "1"
 
     def get_queryset(self):
         """Filter queryset to authenticated user."""
-        assigned_only = bool(
-            int(self.request.query_params.get("assigned_only", 0))
-        )
+        assigned_only = self._flag("assigned_only")
+        unassigned_only = self._flag("unassigned_only")
+        if assigned_only and unassigned_only:
+            raise ValidationError(
+                "assigned_only and unassigned_only are exclusive."
+            )
         queryset = self.queryset
+        # playlist_count is kept up to date by core.signals, so no join
+        # with the playlist links is needed.
         if assigned_only:
-            queryset = queryset.filter(playlist__isnull=False)
+            queryset = queryset.filter(playlist_count__gt=0)
+        elif unassigned_only:
+            queryset = queryset.filter(playlist_count=0)
 
         return queryset.filter(
             user=self.request.user
-        ).order_by('-name').distinct()
+        ).order_by(self.ordering)
+
+    def perform_destroy(self, instance):
+        """Hide the object, purge_deleted removes it later."""
+        instance.soft_delete()
 
 
 class TagViewSet(BasePlaylistAttrViewSet):
@@ -136,4 +292,210 @@ class TagViewSet(BasePlaylistAttrViewSet):
 class SongViewSet(BasePlaylistAttrViewSet):
     """Manage songs in the database."""
     serializer_class = serializers.SongSerializer
-    queryset = Song.objects.all()
+    queryset = Song.objects.select_related("track__artist")
+    ordering = "-track__name"
+
+    def get_serializer_class(self):
+        """Return the serializer class for request."""
+        if self.action == 'duplicates':
+            return serializers.DuplicateSongsSerializer
+        elif self.action == 'merge':
+            return serializers.SongMergeSerializer
+
+        return self.serializer_class
+
+    @action(methods=["GET"], detail=False)
+    def duplicates(self, request):
+        """List the groups of songs that look like the same song."""
+        serializer = self.get_serializer(
+            [{"songs": group} for group in find_duplicates(request.user)],
+            many=True,
+        )
+        return Response(serializer.data)
+
+    @extend_schema(responses=serializers.SongSerializer)
+    @action(methods=["POST"], detail=True)
+    def merge(self, request, pk=None):
+        """Merge duplicates into this song, moving their playlist links."""
+        song = self.get_object()
+        serializer = self.get_serializer(song, data=request.data)
+
+        if serializer.is_valid():
+            serializer.save()
+            song.refresh_from_db(fields=["playlist_count"])
+            return Response(
+                serializers.SongSerializer(song).data,
+                status=status.HTTP_200_OK,
+            )
+
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+def _count_per_artist(queryset, artist_field, count_field):
+    """Correlated subquery counting the rows of queryset for each artist."""
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{artist_field: OuterRef("pk")})
+            .order_by()
+            .values(artist_field)
+            .annotate(count=Count(count_field, distinct=True))
+            .values("count"),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+class ArtistViewSet(mixins.ListModelMixin,
+                    mixins.RetrieveModelMixin,
+                    viewsets.GenericViewSet):
+    """Browse the artists in the user's library."""
+    serializer_class = serializers.ArtistDetailSerializer
+    queryset = Artist.objects.all()
+    authentication_classes = [ExpiringTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        """Artists of the user's songs, with song and playlist counts.
+
+        Counts are correlated subqueries over the user's own songs and
+        playlist links, so each artist is counted through the indexed
+        foreign keys instead of grouping the whole library.
+        """
+        library = Song.objects.filter(user=self.request.user)
+        links = PlaylistSong.objects.filter(
+            user=self.request.user,
+            playlist__deleted_at__isnull=True,
+            song__deleted_at__isnull=True,
+        )
+
+        return self.queryset.filter(
+            id__in=library.values("track__artist"),
+        ).annotate(
+            song_count=_count_per_artist(library, "track__artist", "id"),
+            playlist_count=_count_per_artist(
+                links,
+                "song__track__artist",
+                "playlist",
+            ),
+        ).order_by("name")
+
+    def get_serializer_class(self):
+        """Return the serializer class for request."""
+        if self.action == 'list':
+            return serializers.ArtistSerializer
+
+        return self.serializer_class
+
+
+class LibraryStatsView(generics.RetrieveAPIView):
+    """Playlist, genre and tag stats of the authenticated user."""
+    serializer_class = serializers.LibraryStatsSerializer
+    authentication_classes = [ExpiringTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get_object(self):
+        """Return the stored stats, zero for a user without playlists."""
+        stats = LibraryStats.objects.filter(user=self.request.user).first()
+        return stats or LibraryStats(user=self.request.user)
+
+
+class ChangesView(generics.GenericAPIView):
+    """Changes to the user's library after a cursor, for syncing clients."""
+    serializer_class = serializers.ChangeSetSerializer
+    authentication_classes = [ExpiringTokenAuthentication]
+    permission_classes = [IsAuthenticated]
+    page_size = 500
+
+    def _change_set(self, cursor, has_more=False, changed=None, deleted=None):
+        changed = changed or {}
+        deleted = deleted or {}
+        user = self.request.user
+        return {
+            "cursor": cursor,
+            "has_more": has_more,
+            "playlists": Playlist.objects.filter(
+                user=user,
+                pk__in=changed.get("playlist", []),
+            ).order_by("id").prefetch_links(user.pk),
+            "tags": Tag.objects.filter(
+                user=user,
+                pk__in=changed.get("tag", []),
+            ).order_by("id"),
+            "songs": Song.objects.filter(
+                user=user,
+                pk__in=changed.get("song", []),
+            ).select_related("track__artist").order_by("id"),
+            "deleted": {
+                f"{kind}s": sorted(deleted.get(kind, []))
+                for kind in ["playlist", "tag", "song"]
+            },
+        }
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "since",
+                OpenApiTypes.INT,
+                description="Cursor of the last sync. Without it only "
+                            "the current cursor is returned.",
+            ),
+        ],
+        responses={
+            200: serializers.ChangeSetSerializer,
+            410: OpenApiResponse(
+                description="The cursor is older than the kept changes, "
+                            "the library must be synced again.",
+            ),
+        },
+    )
+    def get(self, request):
+        """Return a batch of changes, compacted to the latest per object."""
+        feed = ChangeFeed.objects.filter(user=request.user).first()
+        since = request.query_params.get("since")
+        if since is None:
+            change_set = self._change_set(feed.last_seq if feed else 0)
+            return Response(self.get_serializer(change_set).data)
+        try:
+            since = int(since)
+        except ValueError:
+            raise ValidationError({"since": "Must be a sync cursor."})
+
+        if feed is not None and since < feed.pruned_seq:
+            return Response(
+                {"detail": "Cursor expired, sync again without since."},
+                status=status.HTTP_410_GONE,
+            )
+
+        # Entries of a user are committed in seq order, the feed's lock
+        # keeps a later seq from showing up before an earlier one.
+        entries = list(
+            ChangeLog.objects.filter(
+                user=request.user,
+                seq__gt=since,
+            ).order_by("seq").values_list(
+                "seq",
+                "kind",
+                "object_id",
+                "action",
+            )[:self.page_size + 1]
+        )
+        has_more = len(entries) > self.page_size
+        entries = entries[:self.page_size]
+
+        latest = {}
+        for seq, kind, object_id, change in entries:
+            latest[kind, object_id] = change
+        changed = {}
+        deleted = {}
+        for (kind, object_id), change in latest.items():
+            target = deleted if change == ChangeLog.DELETE else changed
+            target.setdefault(kind, []).append(object_id)
+
+        change_set = self._change_set(
+            entries[-1][0] if entries else since,
+            has_more,
+            changed,
+            deleted,
+        )
+        return Response(self.get_serializer(change_set).data)
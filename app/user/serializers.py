@@ -8,6 +8,8 @@ from django.contrib.auth import (
 from django.utils.translation import gettext as _
 from rest_framework import serializers
 
+from core.models import AuthToken
+
 
 class UserSerializer(serializers.ModelSerializer):
     """Serializer for the user object."""
@@ -40,6 +42,12 @@ class AuthTokenSerializer(serializers.Serializer):
         style={"input_type": "password"},
         trim_whitespace=False,
     )
+    name = serializers.CharField(
+        required=False,
+        allow_blank=True,
+        max_length=255,
+        help_text="Name of the device the token is for.",
+    )
 
     def validate(self, attrs):
         email = attrs.get("email")
@@ -55,3 +63,21 @@ class AuthTokenSerializer(serializers.Serializer):
 
         attrs["user"] = user
         return attrs
+
+
+class IssuedTokenSerializer(serializers.ModelSerializer):
+    """Serializer for a newly issued token."""
+    token = serializers.CharField(source="key")
+
+    class Meta:
+        model = AuthToken
+        fields = ['token', 'expires_at']
+
+
+class DeviceTokenSerializer(serializers.ModelSerializer):
+    """Serializer for a token of one of the user's devices."""
+
+    class Meta:
+        model = AuthToken
+        fields = ['id', 'name', 'created_at', 'expires_at', 'last_used_at']
+        read_only_fields = fields
@@ -1,16 +1,27 @@
 """
 Tests for user API.
 """
+from datetime import timedelta
+
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from django.utils import timezone
 
 from rest_framework.test import APIClient
 from rest_framework import status
 
+from core.models import AuthToken
+
 CREATE_USER_URL = reverse("user:create")
 TOKEN_URL = reverse("user:token")
 ME_URL = reverse("user:me")
+TOKENS_URL = reverse("user:tokens")
+
+
+def revoke_url(token_id):
+    # create and return the url revoking a token
+    return reverse("user:token-revoke", args=[token_id])
 
 
 def create_user(**params):
@@ -150,3 +161,94 @@ class PrivateUserApiTest(TestCase):
         self.assertEqual(self.user.name, payload['name'])
         self.assertTrue(self.user.check_password(payload['password']))
         self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_delete_user(self):
+        """Test deleting the user deactivates it straight away."""
+        res = self.client.delete(ME_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertIsNotNone(self.user.deleted_at)
+        res = self.client.post(TOKEN_URL, {
+            'email': 'test@example.com',
+            'password': 'goodpass',
+        })
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TokenLifecycleApiTests(TestCase):
+    # test expiring tokens of several devices
+    def setUp(self):
+        self.user = create_user(email='test@example.com', password='goodpass')
+        self.client = APIClient()
+
+    def login(self, name=''):
+        res = self.client.post(TOKEN_URL, {
+            'email': 'test@example.com',
+            'password': 'goodpass',
+            'name': name,
+        })
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return res.data['token']
+
+    def get_me(self, key):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {key}')
+        return self.client.get(ME_URL)
+
+    def test_token_per_device(self):
+        """Test each login issues a separate expiring token."""
+        phone = self.login('phone')
+        laptop = self.login('laptop')
+
+        self.assertNotEqual(phone, laptop)
+        self.assertEqual(self.get_me(phone).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.get_me(laptop).status_code, status.HTTP_200_OK)
+        token = AuthToken.objects.get(key=phone)
+        self.assertEqual(token.name, 'phone')
+        self.assertGreater(token.expires_at, timezone.now())
+
+    def test_expired_token_rejected(self):
+        """Test a token no longer authenticates once it expired."""
+        key = self.login()
+        AuthToken.objects.filter(key=key).update(
+            expires_at=timezone.now() - timedelta(seconds=1),
+        )
+
+        res = self.get_me(key)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_list_and_revoke_device(self):
+        """Test revoking one device keeps the others logged in."""
+        phone = self.login('phone')
+        laptop = self.login('laptop')
+        self.get_me(laptop)
+
+        res = self.client.get(TOKENS_URL)
+
+        self.assertEqual([t['name'] for t in res.data], ['laptop', 'phone'])
+        self.assertIsNotNone(res.data[0]['last_used_at'])
+        self.assertNotIn('key', res.data[0])
+
+        phone_id = AuthToken.objects.get(key=phone).id
+        res = self.client.delete(revoke_url(phone_id))
+
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(
+            self.get_me(phone).status_code,
+            status.HTTP_401_UNAUTHORIZED,
+        )
+        self.assertEqual(self.get_me(laptop).status_code, status.HTTP_200_OK)
+
+    def test_revoke_other_users_token_not_found(self):
+        """Test tokens of other users can't be revoked."""
+        other = create_user(email='other@example.com', password='goodpass')
+        token = AuthToken.objects.issue(other)
+        key = self.login()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {key}')
+
+        res = self.client.delete(revoke_url(token.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertTrue(AuthToken.objects.filter(id=token.id).exists())
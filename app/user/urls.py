@@ -8,4 +8,10 @@ urlpatterns = [
     path("create/", views.CreateUserView.as_view(), name="create"),
     path("token/", views.CreateTokenView.as_view(), name="token"),
     path("me/", views.ManageUserView.as_view(), name="me"),
+    path("tokens/", views.ListTokensView.as_view(), name="tokens"),
+    path(
+        "tokens/<int:pk>/",
+        views.RevokeTokenView.as_view(),
+        name="token-revoke",
+    ),
 ]
@@ -1,8 +1,21 @@
-from rest_framework import generics, authentication, permissions
+from django.utils import timezone
+from drf_spectacular.utils import extend_schema
+from rest_framework import generics, permissions, status
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
 
-from .serializers import UserSerializer, AuthTokenSerializer
+from core.authentication import (
+    ExpiringTokenAuthentication,
+    flush_last_used,
+)
+from core.models import AuthToken
+from .serializers import (
+    AuthTokenSerializer,
+    DeviceTokenSerializer,
+    IssuedTokenSerializer,
+    UserSerializer,
+)
 
 
 class CreateUserView(generics.CreateAPIView):
@@ -10,17 +23,64 @@ class CreateUserView(generics.CreateAPIView):
 
 
 class CreateTokenView(ObtainAuthToken):
-    # create new auth token for user
+    # create a new expiring auth token for one of the user's devices
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
 
+    @extend_schema(responses=IssuedTokenSerializer)
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+        if serializer.is_valid():
+            token = AuthToken.objects.issue(
+                serializer.validated_data['user'],
+                name=serializer.validated_data.get('name', ''),
+            )
+            return Response(
+                IssuedTokenSerializer(token).data,
+                status=status.HTTP_200_OK,
+            )
+
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class ManageUserView(generics.RetrieveUpdateDestroyAPIView):
     # manage authenticated user
     serializer_class = UserSerializer
-    authentication_classes = [authentication.TokenAuthentication]
+    authentication_classes = [ExpiringTokenAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
         # retrieve and return authenticated user
         return self.request.user
+
+    def perform_destroy(self, instance):
+        # deactivate now, purge_deleted removes the user's data later
+        instance.soft_delete()
+
+
+class DeviceTokenMixin:
+    serializer_class = DeviceTokenSerializer
+    authentication_classes = [ExpiringTokenAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        # the user's tokens that did not expire yet
+        return AuthToken.objects.filter(
+            user=self.request.user,
+            expires_at__gt=timezone.now(),
+        ).order_by('-id')
+
+
+class ListTokensView(DeviceTokenMixin, generics.ListAPIView):
+    # list the devices the user is logged in on
+
+    def list(self, request, *args, **kwargs):
+        # show this process's latest uses too
+        flush_last_used()
+        return super().list(request, *args, **kwargs)
+
+
+class RevokeTokenView(DeviceTokenMixin, generics.DestroyAPIView):
+    # log one of the user's devices out
+    pass